@@ -0,0 +1,5 @@
+"""Single-question analyses over the crop data (`agri.analyses`) and their command line (`agri.cli`).
+
+Importing either needs only the standard library; the data, the backends and
+their dependencies load when an analysis first runs.
+"""
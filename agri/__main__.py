@@ -0,0 +1,5 @@
+import sys
+
+from agri.cli import main
+
+sys.exit(main())
@@ -0,0 +1,270 @@
+"""Named analyses over lazily loaded data, for answering one question at a time.
+
+Eda_agri.py and python_with_sql.py do everything when they run: read the
+workbook, build the engine, run every query, draw every chart. Here each
+analysis is a function registered by name in `ANALYSES`, and a `Workspace`
+loads only what that function touches, on first use:
+
+* `frame`: the wide workbook frame (served from the columnar cache);
+* `fact` / `star`: the compact long fact table, and the star schema with SQL names;
+* `aggregates`: the `CropCube` behind the EDA views;
+* `year_index`: the saved year-range prefix sums (year_index.py), which need
+  the workbook only when it changed since the index was saved;
+* `backend`: the query backend behind a `ResultCache`.
+
+For the embedded backends the cache version is the workbook fingerprint and
+the backend itself is built on the first cache miss. A question answered
+before is read back from disk without parsing the workbook or loading SQLite.
+
+Importing this module needs only the standard library. pandas, SQLAlchemy and
+the backends are imported by the workspace properties that use them, and
+matplotlib only when a chart is drawn (charts.py). `agri.cli` is the command
+line over `ANALYSES`:
+
+    agri run q6 --crop GROUNDNUT --limit 3
+    frame = run("top_districts", crop="RICE", state="West Bengal", n=5)
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import Callable
+
+DEFAULT_SOURCE = "District_Level_Data.xlsx"
+
+EDA_METRICS = {"area": "Area_1000_ha", "production": "Production_1000_t"}
+
+
+class _LazyBackend:
+    """Builds the real backend on the first query that reaches it."""
+
+    def __init__(self, build: Callable):
+        self._build = build
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def run_sql(self, q: str, params: dict = None):
+        with self._lock:
+            if self._backend is None:
+                self._backend = self._build()
+        return self._backend.run_sql(q, params)
+
+
+class Workspace:
+    """Data, backend and aggregates for the analyses, each built on first access.
+
+    `backend` is "sqlite" or "duckdb" (in-process over the workbook), "mysql",
+    or a SQLAlchemy URL; it defaults to $AGRI_BACKEND, else sqlite. `source`
+    may also be a synthetic .csv/.parquet dataset.
+    """
+
+    def __init__(self, source=DEFAULT_SOURCE, backend: str = None, cache_dir=None):
+        self.source = source
+        self.backend_kind = backend or os.environ.get("AGRI_BACKEND", "sqlite")
+        self.cache_dir = cache_dir
+
+    @property
+    def embedded(self) -> bool:
+        return self.backend_kind in ("sqlite", "duckdb")
+
+    @cached_property
+    def frame(self):
+        if Path(self.source).suffix.lower() == ".xlsx":
+            from data_cache import load_district_data
+            return load_district_data(self.source)
+        from synthetic_data import read_dataset
+        return read_dataset(self.source)
+
+    @cached_property
+    def dimensions(self) -> tuple:
+        """(dim_state, dim_district) with the workbook's column names."""
+        df = self.frame
+        return (df[["State Code", "State Name"]].drop_duplicates(),
+                df[["Dist Code", "Dist Name", "State Code"]].drop_duplicates())
+
+    @cached_property
+    def fact(self):
+        """Compact long fact table with the workbook's column names."""
+        from reshape import build_fact_table
+        return build_fact_table(self.frame, compact=True)
+
+    @cached_property
+    def star(self) -> tuple:
+        """(dim_state, dim_district, fact) with SQL column names."""
+        from reshape import SQL_NAMES
+        return tuple(frame.rename(columns=SQL_NAMES) for frame in (*self.dimensions, self.fact))
+
+    @cached_property
+    def aggregates(self):
+        from cube import CropCube
+        from reshape import METRICS, SQL_NAMES
+        fact = self.fact.rename(columns={m: SQL_NAMES[m] for m in METRICS})
+        return CropCube.from_fact(fact, *self.dimensions)
+
+    @cached_property
+    def year_index(self):
+        from year_index import open_year_index
+        return open_year_index(self.source, lambda: self.frame)
+
+    def _embedded_backend(self):
+        from backends import make_backend, star_schema_frames
+        return make_backend(self.backend_kind, star_schema_frames(*self.star))
+
+    @cached_property
+    def backend(self):
+        from result_cache import ResultCache
+        options = {"cache_dir": self.cache_dir} if self.cache_dir else {}
+        if self.embedded:
+            from data_cache import file_fingerprint
+            return ResultCache(_LazyBackend(self._embedded_backend),
+                               (self.backend_kind, file_fingerprint(self.source)), **options)
+
+        from backends import DEFAULT_MYSQL_URL, SQLAlchemyBackend
+        from schema import cache_version
+        url = DEFAULT_MYSQL_URL if self.backend_kind == "mysql" else self.backend_kind
+        backend = SQLAlchemyBackend.from_url(url)
+        return ResultCache(backend, lambda: cache_version(backend.engine), **options)
+
+
+@dataclass(frozen=True)
+class Analysis:
+    """`func(workspace, **params)` returns a DataFrame.
+
+    `params` maps each optional parameter to the converter for its command-line
+    string. `chart` is (kind, x, y) for a single-series ChartSpec, if any; a
+    y of None plots the last column (the metric the caller asked for), an x
+    of None the column before it.
+    """
+    name: str
+    func: Callable
+    description: str
+    params: dict = field(default_factory=dict)
+    chart: tuple = None
+
+    def chart_spec(self, frame):
+        from charts import ChartSpec
+
+        kind, x, y = self.chart
+        return ChartSpec(self.name, kind, frame, x=x or frame.columns[-2], y=y or frame.columns[-1],
+                         title=self.description, options={"rotation": 90} if kind == "bar" else {})
+
+
+ANALYSES = {}
+
+
+def analysis(name: str, description: str, chart: tuple = None, **params):
+    """Register the decorated function as analysis `name`."""
+    def register(func):
+        ANALYSES[name] = Analysis(name, func, description, params, chart)
+        return func
+    return register
+
+
+def run(name: str, workspace: Workspace = None, **params):
+    """Result frame of analysis `name`, on a fresh `Workspace()` unless one is given."""
+    if name not in ANALYSES:
+        raise KeyError(f"unknown analysis {name!r}; expected one of {sorted(ANALYSES)}")
+    entry = ANALYSES[name]
+    unknown = set(params) - set(entry.params)
+    if unknown:
+        raise ValueError(f"{name}: unknown parameters {sorted(unknown)}; accepts {sorted(entry.params)}")
+    return entry.func(workspace or Workspace(), **params)
+
+
+def _crop_list(value: str) -> list:
+    return [c.strip().upper() for c in value.split(",") if c.strip()]
+
+
+def _crop_or_crops(value: str):
+    crops = _crop_list(value)
+    return crops[0] if len(crops) == 1 else crops
+
+
+def _eda_metric(value: str) -> str:
+    if value not in EDA_METRICS:
+        raise ValueError(f"metric must be one of {sorted(EDA_METRICS)}")
+    return EDA_METRICS[value]
+
+
+# ---- SQL analyses: q1..q10 of python_with_sql.py, with the crop and limits as parameters
+
+def _legacy(name: str, description: str, chart: tuple = None, **params) -> None:
+    def query(workspace, **bound):
+        from query_templates import LEGACY, TEMPLATES
+
+        template, defaults = LEGACY[name]
+        return TEMPLATES[template].run(workspace.backend, **{**defaults, **bound})
+
+    ANALYSES[name] = Analysis(name, query, description, {"crop": str.upper, **params}, chart)
+
+
+_legacy("q1", "Top N states by production each year (default RICE, top 3)", top_n=int)
+_legacy("q2", "Districts with the largest yield increase over N years (default WHEAT)",
+        ("bar", "dist_name", "yield_increase"), years_back=int, limit=int)
+_legacy("q3", "States with the highest N-year production growth (default OILSEEDS)",
+        ("bar", "state_name", "growth_rate"), years_back=int, limit=int)
+_legacy("q5", "Yearly production of the top N states (default COTTON)", top_n=int)
+_legacy("q6", "Top districts by production in the latest year (default GROUNDNUT)",
+        ("bar", "dist_name", "production_latest"), limit=int)
+_legacy("q7", "Area-weighted average yield per year across all states (default MAIZE)",
+        ("line", "year", "avg_yield"))
+_legacy("q8", "Total cultivated area by state (default OILSEEDS)",
+        ("bar", "state_name", "total_area"))
+_legacy("q9", "Top districts by maximum yield (default RICE)",
+        ("bar", "dist_name", "max_yield"), limit=int)
+
+
+@analysis("q4", "District-wise area vs production correlation (default RICE, WHEAT, MAIZE)",
+          crops=_crop_list)
+def area_production_correlation(workspace, crops=("RICE", "WHEAT", "MAIZE")):
+    from grouped_stats import pearson_from_sums, pearson_sums_sql
+    from query_templates import QueryTemplate
+
+    sql = pearson_sums_sql(
+        keys=["d.dist_name", "f.crop"],
+        x="f.area_1000_ha",
+        y="f.production_1000_t",
+        from_clause="fact_crop_yearly_long f\nJOIN dim_district d ON f.dist_code = d.dist_code",
+        where="f.crop IN :crops",
+    )
+    sums = QueryTemplate("q4", sql).run(workspace.backend, crops=list(crops))
+    return pearson_from_sums(sums, ["dist_name", "crop"])
+
+
+@analysis("q10", "Wheat vs rice production for the top 5 states over the last 10 years")
+def wheat_vs_rice(workspace):
+    from rollups import route
+    return workspace.backend.run_sql(route("q10", use_rollups=workspace.backend_kind == "mysql"))
+
+
+# ---- EDA analyses: views of the dense cube, no database involved
+
+@analysis("top_states", "States with the largest total for a crop", ("bar", "State Name", None),
+          crop=_crop_or_crops, n=int, metric=_eda_metric)
+def top_states(workspace, crop="RICE", n=7, metric="Production_1000_t"):
+    return workspace.aggregates.top_n(crop, "state", metric, n)
+
+
+@analysis("top_districts", "Districts of one state with the largest total for a crop",
+          ("bar", "Dist Name", None), crop=_crop_or_crops, state=str, n=int, metric=_eda_metric)
+def top_districts(workspace, crop="RICE", state="West Bengal", n=None, metric="Production_1000_t"):
+    return workspace.aggregates.top_n(crop, "district", metric, n, state=state)
+
+
+@analysis("period_total", "Totals over a year range per state or district, from the prefix-sum index",
+          ("bar", None, None), crop=_crop_or_crops, start=int, end=int, last=int, level=str, n=int,
+          metric=_eda_metric)
+def period_total(workspace, crop="RICE", start=None, end=None, last=None, level="state", n=10,
+                 metric="Production_1000_t"):
+    index = workspace.year_index
+    if last is not None:
+        start, end = index.last_years(last)
+    frame = index.window(crop, start, end, level, metric).drop(columns="reported")
+    return frame.head(n) if n else frame
+
+
+@analysis("trend", "National yearly total for a crop (or several, summed)", ("line", "Year", None),
+          crop=_crop_or_crops, last=int, metric=_eda_metric)
+def trend(workspace, crop="SUGARCANE", last=None, metric="Production_1000_t"):
+    return workspace.aggregates.trend(crop, metric, last)
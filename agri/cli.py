@@ -0,0 +1,103 @@
+"""Command line for single analyses: loads only what the named analysis needs.
+
+    agri list
+    agri run q6 --crop GROUNDNUT --limit 3
+    agri run top_districts --crop RICE --state "West Bengal" --chart-dir charts/
+    agri run q4 --crops RICE,WHEAT --backend duckdb --output q4.csv
+
+`agri` is the console script installed with the project; `python -m agri`
+runs the same thing from a checkout. Options after the analysis name that are
+not listed below are the analysis' own parameters (`agri list` shows them). `--timing` reports the
+import time and the time to the first result on stderr.
+"""
+import time
+
+_started = time.perf_counter()
+
+import argparse  # noqa: E402
+import sys  # noqa: E402
+
+from agri.analyses import ANALYSES, DEFAULT_SOURCE, Workspace, run  # noqa: E402
+
+_imported = time.perf_counter()
+
+# Startup budgets in seconds, held by tests/test_cli.py and `benchmark.py --startup`:
+# importing this module, and a cached `agri run` including interpreter start
+IMPORT_BUDGET = 0.1
+FIRST_RESULT_BUDGET = 2.0
+
+
+def _params(parser: argparse.ArgumentParser, name: str, extra: list) -> dict:
+    """`--key value` / `--key=value` pairs converted with the analysis' parameter converters."""
+    accepted = ANALYSES[name].params
+    params = {}
+    tokens = iter(extra)
+    for token in tokens:
+        if not token.startswith("--"):
+            parser.error(f"unexpected argument {token!r}")
+        key, sep, value = token[2:].partition("=")
+        key = key.replace("-", "_")
+        if not sep:
+            value = next(tokens, None)
+        if key not in accepted:
+            parser.error(f"{name} has no parameter --{key}; accepts {sorted(accepted) or 'none'}")
+        if value is None:
+            parser.error(f"--{key} needs a value")
+        try:
+            params[key] = accepted[key](value)
+        except ValueError as exc:
+            parser.error(f"--{key}: {exc}")
+    return params
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="agri", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list the registered analyses and their parameters")
+    runner = commands.add_parser("run", help="run one analysis", allow_abbrev=False)
+    runner.add_argument("name", choices=sorted(ANALYSES))
+    runner.add_argument("--source", default=DEFAULT_SOURCE)
+    runner.add_argument("--backend", help="sqlite, duckdb, mysql or a SQLAlchemy URL (default $AGRI_BACKEND or sqlite)")
+    runner.add_argument("--cache-dir", help="result cache directory (default .agri_cache/results)")
+    runner.add_argument("--rows", type=int, default=50, help="rows to print (0 for all)")
+    runner.add_argument("--output", help="also write the result to this .csv file")
+    runner.add_argument("--chart-dir", help="render the analysis' chart into this directory")
+    runner.add_argument("--timing", action="store_true")
+    args, extra = parser.parse_known_args(argv)
+
+    if args.command == "list":
+        if extra:
+            parser.error(f"unrecognized arguments: {' '.join(extra)}")
+        for name, entry in sorted(ANALYSES.items()):
+            params = " ".join(f"[--{p.replace('_', '-')}]" for p in entry.params)
+            print(f"{name:<14} {entry.description}")
+            if params:
+                print(f"{'':<14} {params}")
+        return 0
+
+    params = _params(runner, args.name, extra)
+    workspace = Workspace(args.source, args.backend, args.cache_dir)
+    frame = run(args.name, workspace, **params)
+    finished = time.perf_counter()
+
+    shown = frame if args.rows <= 0 else frame.head(args.rows)
+    print(shown.to_string(index=False))
+    if len(shown) < len(frame):
+        print(f"... {len(frame) - len(shown)} more rows")
+    if args.output:
+        frame.to_csv(args.output, index=False)
+    if args.chart_dir:
+        entry = ANALYSES[args.name]
+        if entry.chart is None:
+            print(f"{args.name} has no chart", file=sys.stderr)
+        else:
+            from charts import emit_charts
+            emit_charts([entry.chart_spec(frame)], args.chart_dir)
+    if args.timing:
+        print(f"import {_imported - _started:.3f}s, first result {finished - _started:.3f}s",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
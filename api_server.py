@@ -0,0 +1,429 @@
+"""Local analytics HTTP API over the query backends.
+
+A small asyncio HTTP/1.1 server (standard library only, keep-alive) exposes
+the analyses as parameterized GET endpoints:
+
+    /health
+    /top-states?crop=RICE&n=5[&metric=production][&year=2015]
+    /districts?crop=RICE&state=West Bengal[&n=10][&metric=...][&year=...]
+    /trend?crop=RICE[,WHEAT][&state=Punjab][&metric=...]
+    /growth?crop=OILSEEDS[&level=state][&horizons=1,5][&windows=3][&metric=...]
+    /correlation?crops=RICE,WHEAT,MAIZE
+    /queries/q6?crop=MAIZE             (the templates behind q1..q9)
+
+`metric` is area, production or yield; production is the default. Queries
+run on a thread pool sized like the connection pool (`batch_runner.pooled_engine`
+for a database server, or the in-process SQLite/DuckDB backends). Results are
+returned as columnar JSON, `{"columns": [...], "data": {column: [values]}}`.
+Ask with `?format=arrow` or `Accept: application/vnd.apache.arrow.stream`
+to get an Arrow IPC stream instead. Bodies are gzip-compressed when the client
+accepts it.
+
+The ETag of a response is derived from the data version, the endpoint, its
+parameters and the format. `If-None-Match` gets a 304 without running any
+query. Encoded responses are kept in an LRU keyed by that ETag, so repeated
+dashboard requests never reach the backend until the data is reloaded.
+
+    python api_server.py --backend sqlite --port 8765
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from grouped_stats import pearson_from_sums, pearson_sums_sql
+from growth import LEVEL_KEYS, growth_template
+from query_templates import LEGACY, TEMPLATES, QueryTemplate
+
+METRIC_COLUMNS = {"area": "area_1000_ha", "production": "production_1000_t", "yield": "yield_kg_ha"}
+
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+GZIP_MIN_BYTES = 1024
+
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _required(params: dict, name: str) -> str:
+    if not params.get(name):
+        raise BadRequest(f"missing parameter: {name}")
+    return params[name]
+
+
+def _int(params: dict, name: str, default=None):
+    value = params.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+
+
+def _ints(params: dict, name: str, default: tuple) -> tuple:
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        return tuple(int(v) for v in value.split(","))
+    except ValueError:
+        raise BadRequest(f"{name} must be comma-separated integers") from None
+
+
+def _metric(params: dict) -> str:
+    name = params.get("metric", "production")
+    if name not in METRIC_COLUMNS:
+        raise BadRequest(f"metric must be one of {sorted(METRIC_COLUMNS)}")
+    return METRIC_COLUMNS[name]
+
+
+def _crops(params: dict, name: str = "crop") -> list:
+    return [c.strip().upper() for c in _required(params, name).split(",") if c.strip()]
+
+
+# ---- endpoint handlers: (backend, params) -> DataFrame, run on the executor
+
+def top_states(backend, params: dict) -> pd.DataFrame:
+    metric = _metric(params)
+    where, bound = ["f.crop = :crop"], {"crop": _crops(params)[0], "n": _int(params, "n", 5)}
+    if params.get("year"):
+        where.append("f.year = :year")
+        bound["year"] = _int(params, "year")
+    sql = f"""
+SELECT s.state_name, SUM(f.{metric}) AS total
+FROM fact_crop_yearly_long f
+JOIN dim_state s ON f.state_code = s.state_code
+WHERE {" AND ".join(where)}
+GROUP BY s.state_name
+ORDER BY total DESC
+LIMIT :n
+"""
+    return backend.run_sql(sql, bound)
+
+
+def districts(backend, params: dict) -> pd.DataFrame:
+    metric = _metric(params)
+    where = ["f.crop = :crop", "s.state_name = :state"]
+    bound = {"crop": _crops(params)[0], "state": _required(params, "state")}
+    if params.get("year"):
+        where.append("f.year = :year")
+        bound["year"] = _int(params, "year")
+    limit = ""
+    if params.get("n"):
+        limit = "LIMIT :n"
+        bound["n"] = _int(params, "n")
+    sql = f"""
+SELECT d.dist_name, SUM(f.{metric}) AS total
+FROM fact_crop_yearly_long f
+JOIN dim_district d ON f.dist_code = d.dist_code
+JOIN dim_state s ON d.state_code = s.state_code
+WHERE {" AND ".join(where)}
+GROUP BY d.dist_name
+ORDER BY total DESC
+{limit}
+"""
+    return backend.run_sql(sql, bound)
+
+
+def trend(backend, params: dict) -> pd.DataFrame:
+    metric = _metric(params)
+    join, where, bound = "", [], {}
+    if params.get("state"):
+        join = "JOIN dim_state s ON f.state_code = s.state_code"
+        where.append("s.state_name = :state")
+        bound["state"] = params["state"]
+    template = QueryTemplate("trend", f"""
+SELECT f.year, SUM(f.{metric}) AS total
+FROM fact_crop_yearly_long f
+{join}
+WHERE f.crop IN :crops{"".join(" AND " + w for w in where)}
+GROUP BY f.year
+ORDER BY f.year
+""")
+    return template.run(backend, crops=_crops(params), **bound)
+
+
+@lru_cache(maxsize=64)
+def _growth(level: str, metric: str, horizons: tuple, windows: tuple) -> QueryTemplate:
+    return growth_template(level, metric, horizons, windows)
+
+
+def growth(backend, params: dict) -> pd.DataFrame:
+    level = params.get("level", "state")
+    if level not in LEVEL_KEYS:
+        raise BadRequest(f"level must be one of {sorted(LEVEL_KEYS)}")
+    try:
+        template = _growth(level, _metric(params), _ints(params, "horizons", (1, 5)),
+                           _ints(params, "windows", (3,)))
+    except ValueError as exc:
+        raise BadRequest(str(exc)) from None
+    return template.run(backend, crops=_crops(params))
+
+
+def correlation(backend, params: dict) -> pd.DataFrame:
+    crops = _crops(params, "crops")
+    sql = pearson_sums_sql(
+        keys=["d.dist_name", "f.crop"],
+        x="f.area_1000_ha",
+        y="f.production_1000_t",
+        from_clause="fact_crop_yearly_long f\nJOIN dim_district d ON f.dist_code = d.dist_code",
+        where="f.crop IN :crops",
+    )
+    sums = QueryTemplate("correlation", sql).run(backend, crops=crops)
+    return pearson_from_sums(sums, ["dist_name", "crop"])
+
+
+def legacy_query(name: str):
+    template_name, defaults = LEGACY[name]
+    template = TEMPLATES[template_name]
+
+    def handler(backend, params: dict) -> pd.DataFrame:
+        bound = dict(defaults)
+        for key in template.parameters:
+            if key in params:
+                bound[key] = params[key].upper() if key == "crop" else _int(params, key)
+        return template.run(backend, **bound)
+    return handler
+
+
+ROUTES = {
+    "/top-states": top_states,
+    "/districts": districts,
+    "/trend": trend,
+    "/growth": growth,
+    "/correlation": correlation,
+    **{f"/queries/{name}": legacy_query(name) for name in LEGACY},
+}
+
+
+# ---- encoding
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_json(frame: pd.DataFrame) -> bytes:
+    data = {}
+    for col in frame.columns:
+        series = frame[col]
+        values = series.astype(object).where(series.notna(), None)
+        data[str(col)] = values.tolist()
+    payload = {"columns": [str(c) for c in frame.columns], "rows": len(frame), "data": data}
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+
+
+def encode_arrow(frame: pd.DataFrame) -> bytes:
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+# ---- server
+
+class AnalyticsServer:
+    """`version` is a fixed stamp or a callable (e.g. `lambda: schema.cache_version(engine)`).
+
+    A callable version is re-read at most every `version_ttl` seconds.
+    """
+
+    def __init__(self, backend, version, workers: int = 8, max_cached: int = 512,
+                 version_ttl: float = 1.0):
+        self.backend = backend
+        self.version = version
+        self.version_ttl = version_ttl
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agri-api")
+        self.max_cached = max_cached
+        self._responses = OrderedDict()
+        self._version_value = None
+        self._version_read = 0.0
+        self.stats = {"requests": 0, "not_modified": 0, "cache_hits": 0, "queries": 0, "errors": 0}
+
+    async def _current_version(self):
+        if not callable(self.version):
+            return self.version
+        now = time.monotonic()
+        if self._version_value is None or now - self._version_read > self.version_ttl:
+            loop = asyncio.get_running_loop()
+            self._version_value = await loop.run_in_executor(self.executor, self.version)
+            self._version_read = now
+        return self._version_value
+
+    def _cache_put(self, key, value) -> None:
+        self._responses[key] = value
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_cached:
+            self._responses.popitem(last=False)
+
+    async def respond(self, method: str, target: str, headers: dict) -> tuple:
+        """(status, headers, body) for one request."""
+        self.stats["requests"] += 1
+        if method not in ("GET", "HEAD"):
+            return self._error(405, f"{method} not allowed")
+        split = urlsplit(target)
+        path = unquote(split.path).rstrip("/") or "/"
+        params = {k: v[-1] for k, v in parse_qs(split.query).items()}
+        version = await self._current_version()
+
+        if path == "/health":
+            body = json.dumps({"status": "ok", "version": version, "stats": self.stats},
+                              default=str).encode()
+            return 200, {"Content-Type": "application/json", "Cache-Control": "no-cache"}, body
+
+        handler = ROUTES.get(path)
+        if handler is None:
+            return self._error(404, f"no endpoint {path}")
+
+        fmt = params.pop("format", None) or ("arrow" if ARROW_TYPE in headers.get("accept", "") else "json")
+        if fmt not in ("json", "arrow"):
+            return self._error(400, "format must be json or arrow")
+        stamp = json.dumps([version, path, sorted(params.items()), fmt], default=str)
+        etag = '"' + hashlib.sha256(stamp.encode()).hexdigest()[:20] + '"'
+        base_headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+        if etag in [t.strip() for t in headers.get("if-none-match", "").split(",")]:
+            self.stats["not_modified"] += 1
+            return 304, base_headers, b""
+
+        use_gzip = "gzip" in headers.get("accept-encoding", "")
+        cached = self._responses.get((etag, use_gzip))
+        if cached is not None:
+            self._responses.move_to_end((etag, use_gzip))
+            self.stats["cache_hits"] += 1
+            return 200, {**base_headers, **cached[0]}, cached[1]
+
+        loop = asyncio.get_running_loop()
+        try:
+            self.stats["queries"] += 1
+            frame = await loop.run_in_executor(self.executor, handler, self.backend, params)
+            body = await loop.run_in_executor(self.executor, encode_arrow if fmt == "arrow" else encode_json, frame)
+        except BadRequest as exc:
+            return self._error(400, str(exc))
+        except Exception as exc:  # surface backend failures to the client, keep serving
+            return self._error(500, f"{type(exc).__name__}: {exc}")
+
+        extra = {"Content-Type": ARROW_TYPE if fmt == "arrow" else "application/json"}
+        if use_gzip and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=5)
+            extra["Content-Encoding"] = "gzip"
+        self._cache_put((etag, use_gzip), (extra, body))
+        return 200, {**base_headers, **extra}, body
+
+    def _error(self, status: int, message: str) -> tuple:
+        self.stats["errors"] += 1
+        return status, {"Content-Type": "application/json"}, json.dumps({"error": message}).encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, http_version = lines[0].split(" ", 2)
+                except ValueError:
+                    status, headers, body = self._error(400, "malformed request line")
+                    writer.write(self._head(status, headers, len(body), False) + body)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0) or 0):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                status, out_headers, body = await self.respond(method, target, headers)
+                keep_alive = (http_version.strip() == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+                writer.write(self._head(status, out_headers, len(body), keep_alive))
+                if method != "HEAD" and status != 304:
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _head(status: int, headers: dict, length: int, keep_alive: bool) -> bytes:
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        lines.append(f"Content-Length: {length if status != 304 else 0}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle, host, port)
+
+    def serve_forever(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        async def _main():
+            server = await self.start(host, port)
+            print(f"serving on http://{host}:{port}")
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(_main())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown(wait=False)
+
+
+def build_server(backend_kind: str = "sqlite", source: str = "District_Level_Data.xlsx",
+                 workers: int = 8) -> AnalyticsServer:
+    """Server on the MySQL database ("mysql" or a SQLAlchemy URL) or an in-process stand-in."""
+    from backends import DEFAULT_MYSQL_URL, SQLAlchemyBackend, make_backend, star_schema_frames
+
+    if backend_kind not in ("sqlite", "duckdb"):
+        from batch_runner import pooled_engine
+        from schema import cache_version
+
+        url = DEFAULT_MYSQL_URL if backend_kind == "mysql" else backend_kind
+        engine = pooled_engine(url, size=workers)
+        return AnalyticsServer(SQLAlchemyBackend(engine), lambda: cache_version(engine), workers)
+
+    from data_cache import file_fingerprint, load_district_data
+    from reshape import build_star_schema
+
+    dim_state, dim_district, fact = build_star_schema(load_district_data(source))
+    backend = make_backend(backend_kind, star_schema_frames(dim_state, dim_district, fact))
+    return AnalyticsServer(backend, (backend_kind, file_fingerprint(source)), workers)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Local analytics API over the crop data")
+    parser.add_argument("--backend", default="sqlite", help="sqlite, duckdb, mysql or a SQLAlchemy URL")
+    parser.add_argument("--source", default="District_Level_Data.xlsx")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+    build_server(args.backend, args.source, args.workers).serve_forever(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Concurrent execution of independent analysis queries.
+
+The analyses are declared as named jobs and run on a bounded thread pool.
+Against a server, that pool sits on a SQLAlchemy connection pool of the same
+size (see `pooled_engine`), so a batch takes about as long as its slowest
+query instead of the sum of all of them. The DataFrames are collected for
+rendering after the batch finishes.
+
+Timeouts stop the query where the backend allows it: the embedded backends
+abort it in-process (`backends.statement_deadline`), and MySQL ends it
+server-side through max_execution_time. On any other server a timed-out query
+is only reported; it keeps its worker thread and connection until it returns.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from sqlalchemy import create_engine, event
+
+from backends import statement_deadline
+
+
+def pooled_engine(url: str, size: int = 4, statement_timeout: float = None):
+    """Engine with exactly `size` pooled connections.
+
+    On MySQL, `statement_timeout` (seconds) is also enforced server-side
+    through max_execution_time, so abandoned queries stop using the server.
+    """
+    engine = create_engine(url, pool_size=size, max_overflow=0, pool_pre_ping=True)
+    if statement_timeout and engine.dialect.name == "mysql":
+        @event.listens_for(engine, "connect")
+        def _limit(dbapi_conn, _record):
+            cursor = dbapi_conn.cursor()
+            cursor.execute(f"SET SESSION max_execution_time = {int(statement_timeout * 1000)}")
+            cursor.close()
+    return engine
+
+
+@dataclass
+class BatchResult:
+    frames: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+    seconds: dict = field(default_factory=dict)
+    wall_seconds: float = 0.0
+
+    def raise_for_errors(self) -> None:
+        if self.errors:
+            name, exc = next(iter(self.errors.items()))
+            raise RuntimeError(f"{len(self.errors)} of the batch queries failed; first was {name}") from exc
+
+    def summary(self) -> str:
+        slowest = max(self.seconds.values(), default=0.0)
+        return (f"{len(self.frames)} ok, {len(self.errors)} failed in {self.wall_seconds:.2f}s "
+                f"(slowest query {slowest:.2f}s, sum {sum(self.seconds.values()):.2f}s)")
+
+
+def run_batch(backend, jobs: dict, max_workers: int = 4, timeout: float = None) -> BatchResult:
+    """Run `jobs` ({name: sql} or {name: (sql, params)}) concurrently on `backend`.
+
+    At most `max_workers` queries are in flight at once. A query that runs
+    longer than `timeout` seconds (measured from when it starts, not from when
+    it was queued) is recorded as a TimeoutError, and the batch does not wait
+    for it. SQLite and DuckDB queries are also aborted at that point (see the
+    module docstring for servers).
+    """
+    result = BatchResult()
+    started = {}
+
+    def _run(name, sql, params):
+        started[name] = time.monotonic()
+        try:
+            with statement_deadline(timeout):
+                frame = backend.run_sql(sql, params)
+        except Exception as exc:
+            if timeout and time.monotonic() - started[name] >= timeout:
+                raise TimeoutError(f"{name} exceeded {timeout}s") from exc
+            raise
+        result.seconds[name] = time.monotonic() - started[name]
+        return frame
+
+    batch_start = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agri-sql")
+    pending = {}
+    for name, job in jobs.items():
+        sql, params = job if isinstance(job, tuple) else (job, None)
+        pending[pool.submit(_run, name, sql, params)] = name
+
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=0.05 if timeout else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result.frames[name] = future.result()
+                except Exception as exc:
+                    result.errors[name] = exc
+            if timeout:
+                now = time.monotonic()
+                for future, name in list(pending.items()):
+                    if name in started and now - started[name] > timeout:
+                        future.cancel()
+                        del pending[future]
+                        result.errors[name] = TimeoutError(f"{name} exceeded {timeout}s")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    result.wall_seconds = time.monotonic() - batch_start
+    return result
@@ -0,0 +1,268 @@
+"""Stage-by-stage benchmark of the pipeline on synthetic data.
+
+The stages timed are:
+
+* ingest: parse the generated file;
+* reshape: `build_star_schema`;
+* load: `load_star_schema` into a SQLite file;
+* query: every named query on the in-process SQLite and DuckDB backends;
+* aggregate: `enrich_fact` plus `CropAggregates` at every level;
+* partitioned: reshape + aggregate again, split by state over `--processes`
+  worker processes (partitioned.py);
+* render: a representative set of charts, drawn headlessly;
+* startup (with `--startup`): importing `agri.cli`, and one `agri run` from a
+  fresh interpreter, cold and again with its result cached;
+* api (with `--api`): a burst of distinct, uncached API requests (top states,
+  districts, trend and q6 for every crop) against the SQLite stand-in, all in
+  flight at once like a dashboard refresh. The stage is the wall time per
+  request, so 0.005s means 200 requests per second.
+
+Each stage keeps its best time over `--repeat` runs. The results are written
+as JSON. Given `--baseline`, the run fails (exit status 1) when a stage is
+slower than its baseline time by more than `--threshold` (a fraction) and by
+more than `--min-seconds`, so timer noise on tiny stages does not count. The
+startup and api stages also have absolute budgets (`--import-budget`,
+`--first-result-budget`, `--api-request-budget`) and fail the run when they
+exceed them.
+
+    python benchmark.py --scale 10x --output bench-10x.json --baseline bench-main-10x.json
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from sqlalchemy import create_engine
+
+from agri.cli import FIRST_RESULT_BUDGET, IMPORT_BUDGET
+from backends import make_backend, star_schema_frames
+from bulk_loader import load_star_schema
+from charts import ChartSpec, render_charts
+from fact_views import LEVELS, CropAggregates, enrich_fact
+from grouped_stats import Q4_PEARSON_SUMS
+from partitioned import build_partitioned
+from queries import QUERIES
+from reshape import METRICS, SQL_NAMES, build_star_schema
+from synthetic_data import CROPS, SCALES, generate_scale, read_dataset, write_dataset
+
+# SQL names back to the EDA names used by fact_views (metrics keep their SQL names)
+EDA_NAMES = {sql: name for name, sql in SQL_NAMES.items() if name not in METRICS}
+
+HERE = Path(__file__).resolve().parent
+STARTUP_ANALYSIS = ["q6", "--crop", "GROUNDNUT"]
+_IMPORT_PROBE = "import time; t = time.perf_counter(); import agri.cli; print(time.perf_counter() - t)"
+API_TARGETS = ["/top-states?crop={crop}&n=5", "/districts?crop={crop}&state={state}&n=10",
+               "/trend?crop={crop}", "/queries/q6?crop={crop}"]
+
+
+class Timings:
+    def __init__(self):
+        self.best = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        self.best[name] = min(seconds, self.best.get(name, float("inf")))
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+
+def _chart_specs(agg: CropAggregates) -> list:
+    return [
+        ChartSpec("rice_top7_states", "bar", agg.top_n("RICE", "state", n=7),
+                  x="State Name", y="Production_1000_t", options={"rotation": 45}),
+        ChartSpec("sugarcane_trend", "line", agg.trend("SUGARCANE"), x="Year", y="Production_1000_t"),
+        ChartSpec("rice_area_vs_production", "scatter",
+                  agg.top_n("RICE", "district", ["Production_1000_t", "Area_1000_ha"]),
+                  x="Area_1000_ha", y="Production_1000_t"),
+        ChartSpec("rice_wheat_by_state", "bar", agg.by_crop(["RICE", "WHEAT"]).reset_index(),
+                  x="State Name", y=["RICE", "WHEAT"]),
+    ]
+
+
+def run_once(path: Path, work_dir: Path, timings: Timings, backends: list, processes: int = None,
+             api: bool = False) -> dict:
+    with timings.stage("ingest"):
+        df = read_dataset(path)
+
+    with timings.stage("reshape"):
+        dim_state, dim_district, fact = build_star_schema(df)
+
+    db_path = work_dir / "bench.db"
+    db_path.unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{db_path}")
+    with timings.stage("load"):
+        load_star_schema(engine, dim_state, dim_district, fact)
+    engine.dispose()
+
+    queries = dict(QUERIES, q4=Q4_PEARSON_SUMS)
+    frames = star_schema_frames(dim_state, dim_district, fact)
+    for kind in backends:
+        with timings.stage(f"backend_setup.{kind}"):
+            backend = make_backend(kind, frames)
+        for name, sql in queries.items():
+            with timings.stage(f"query.{kind}.{name}"):
+                backend.run_sql(sql)
+
+    if api:
+        run_api(frames, timings)
+
+    with timings.stage("aggregate"):
+        enriched = enrich_fact(fact.rename(columns=EDA_NAMES), dim_state.rename(columns=EDA_NAMES),
+                               dim_district.rename(columns=EDA_NAMES))
+        agg = CropAggregates(enriched)
+        for level in LEVELS:
+            agg.totals(level)
+
+    with timings.stage("partitioned"):
+        build_partitioned(df, processes)
+
+    with timings.stage("render"):
+        render_charts(_chart_specs(agg), work_dir / "charts")
+
+    return {"wide_rows": len(df), "wide_columns": df.shape[1], "fact_rows": len(fact)}
+
+
+def run_api(frames: dict, timings: Timings, workers: int = 8) -> None:
+    """Time a burst of uncached API requests on the SQLite stand-in (setup not included)."""
+    from api_server import AnalyticsServer
+
+    server = AnalyticsServer(make_backend("sqlite", frames), "bench", workers=workers, max_cached=0)
+    state = quote(str(frames["dim_state"]["state_name"].iloc[0]))
+    targets = [t.format(crop=quote(crop), state=state) for crop in CROPS for t in API_TARGETS]
+
+    async def burst():
+        return await asyncio.gather(*(server.respond("GET", target, {}) for target in targets))
+
+    start = time.perf_counter()
+    responses = asyncio.run(burst())
+    timings.record("api.request", (time.perf_counter() - start) / len(targets))
+    server.executor.shutdown()
+    failed = [(target, body[:200]) for target, (status, _, body) in zip(targets, responses) if status != 200]
+    if failed:
+        raise RuntimeError(f"{len(failed)} API requests failed, e.g. {failed[0]}")
+
+
+def run_startup(path: Path, work_dir: Path, timings: Timings) -> None:
+    """Time a one-question run the way a user sees it: each step in a fresh interpreter."""
+    probe = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=HERE, check=True,
+                           capture_output=True, text=True)
+    timings.record("startup.import", float(probe.stdout.strip().splitlines()[-1]))
+
+    results_dir = work_dir / "startup-results"
+    shutil.rmtree(results_dir, ignore_errors=True)
+    command = [sys.executable, "-m", "agri", "run", *STARTUP_ANALYSIS, "--source", str(path),
+               "--backend", "sqlite", "--cache-dir", str(results_dir)]
+    for stage in ("startup.first_result.cold", "startup.first_result.cached"):
+        with timings.stage(stage):
+            subprocess.run(command, cwd=HERE, check=True, capture_output=True)
+
+
+def over_budget(stages: dict, budgets: dict) -> dict:
+    """{stage: (budget_s, current_s)} for stages slower than their absolute budget."""
+    return {name: (budget, stages[name]) for name, budget in budgets.items()
+            if name in stages and stages[name] > budget}
+
+
+def compare(stages: dict, baseline: dict, threshold: float = 0.25, min_seconds: float = 0.01) -> dict:
+    """{stage: (baseline_s, current_s)} for stages that regressed beyond the threshold."""
+    regressions = {}
+    for name, seconds in stages.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if seconds > before * (1 + threshold) and seconds - before > min_seconds:
+            regressions[name] = (before, seconds)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1x")
+    parser.add_argument("--format", choices=("parquet", "csv", "xlsx"), default="parquet")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", default="sqlite,duckdb",
+                        help="comma-separated in-process backends; duckdb is skipped if not installed")
+    parser.add_argument("--output", help="results JSON (default .agri_cache/bench/results-<scale>.json)")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-seconds", type=float, default=0.01)
+    parser.add_argument("--processes", type=int, help="workers for the partitioned stage (default: all cores)")
+    parser.add_argument("--startup", action="store_true",
+                        help="also time importing agri.cli and one agri run")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET, help="seconds")
+    parser.add_argument("--first-result-budget", type=float, default=FIRST_RESULT_BUDGET,
+                        help="seconds for a cached agri run, interpreter start included")
+    parser.add_argument("--api", action="store_true", help="also time uncached API requests on SQLite")
+    parser.add_argument("--api-request-budget", type=float, default=0.01,
+                        help="seconds of wall time per uncached API request (0.01 = 100 requests/s)")
+    args = parser.parse_args(argv)
+
+    backends = [b for b in args.backends.split(",") if b]
+    if "duckdb" in backends and importlib.util.find_spec("duckdb") is None:
+        print("duckdb is not installed; skipping its queries")
+        backends.remove("duckdb")
+
+    data_path = Path(".agri_cache/bench") / f"synthetic_{args.scale}.{args.format}"
+    if not data_path.exists():
+        write_dataset(generate_scale(args.scale), data_path)
+
+    timings = Timings()
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(args.repeat):
+            shape = run_once(data_path, Path(tmp), timings, backends, args.processes, args.api)
+            if args.startup:
+                run_startup(data_path, Path(tmp), timings)
+
+    results = {
+        "scale": args.scale,
+        "format": args.format,
+        "repeat": args.repeat,
+        "shape": shape,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "stages": {name: round(seconds, 6) for name, seconds in timings.best.items()},
+    }
+    output = Path(args.output or f".agri_cache/bench/results-{args.scale}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    for name, seconds in results["stages"].items():
+        print(f"{name:<32} {seconds:10.4f}s")
+    print("wrote", output)
+
+    status = 0
+    budgets = {"startup.import": args.import_budget, "startup.first_result.cached": args.first_result_budget,
+               "api.request": args.api_request_budget}
+    for name, (budget, seconds) in over_budget(results["stages"], budgets).items():
+        print(f"OVER BUDGET {name}: {seconds:.4f}s > {budget:.4f}s")
+        status = 1
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("scale") != args.scale:
+            print(f"warning: baseline scale {baseline.get('scale')} differs from {args.scale}")
+        regressions = compare(results["stages"], baseline["stages"], args.threshold, args.min_seconds)
+        for name, (before, after) in regressions.items():
+            print(f"REGRESSION {name}: {before:.4f}s -> {after:.4f}s (+{(after / before - 1):.0%})")
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Idempotent bulk loader for the star schema.
+
+Rows are written with one parameterized upsert per table, sent chunk by chunk
+as executemany batches, so re-running a load replaces rows instead of
+duplicating them:
+dim_state on state_code, dim_district on dist_code and fact_crop_yearly on
+(dist_code, year, crop_id). The tables come from schema.py, and crop names are
+mapped to their dim_crop ids on the way in. The dimension tables are loaded
+concurrently before the fact table is streamed in. MySQL and SQLite (as a local
+stand-in) are supported; MySQL can optionally use LOAD DATA LOCAL INFILE.
+"""
+import csv
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+from sqlalchemy import text
+
+from compact import widen_metrics
+from rollups import refresh_rollups
+from schema import (bump_data_version, create_schema, crop_ids, dim_district_table,
+                    dim_state_table, fact_table)
+
+
+@dataclass
+class LoadReport:
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self) -> str:
+        return f"{self.table}: {self.rows} rows in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+
+
+def _upsert(engine, table):
+    """One parameterized upsert for `table`, executed with a list of row dicts.
+
+    The statement text does not depend on the rows, so it is compiled once and
+    each chunk goes out as a single executemany; no chunk size can run into
+    SQLite's bound-parameter limit either.
+    """
+    dialect = engine.dialect.name
+    non_key = [c.name for c in table.columns if not c.primary_key]
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in non_key})
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[c.name for c in table.primary_key],
+            set_={c: stmt.excluded[c] for c in non_key},
+        )
+    raise ValueError(f"upsert is not supported for the {dialect!r} dialect")
+
+
+def _column_values(series: pd.Series) -> list:
+    # tolist() hands back Python scalars; only columns with gaps need the object round trip
+    if series.dtype.kind in "biuf" and not series.isna().any():
+        return series.to_numpy().tolist()
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _records(frame: pd.DataFrame, table) -> list:
+    columns = [c.name for c in table.columns]
+    values = [_column_values(frame[c]) for c in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _load_chunked(engine, table, frame: pd.DataFrame, chunk_size: int) -> LoadReport:
+    start = time.perf_counter()
+    stmt = _upsert(engine, table)
+    with engine.begin() as conn:
+        for lo in range(0, len(frame), chunk_size):
+            conn.execute(stmt, _records(frame.iloc[lo:lo + chunk_size], table))
+    return LoadReport(table.name, len(frame), time.perf_counter() - start)
+
+
+def _load_infile(engine, table, frame: pd.DataFrame) -> LoadReport:
+    # MySQL only; needs allow_local_infile=True on the connection.
+    # REPLACE keeps the load idempotent on the primary key.
+    start = time.perf_counter()
+    columns = [c.name for c in table.columns]
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as fh:
+            frame[columns].to_csv(fh, index=False, header=False, na_rep="\\N", quoting=csv.QUOTE_MINIMAL)
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"LOAD DATA LOCAL INFILE :path REPLACE INTO TABLE {table.name} "
+                f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(columns)})"
+            ), {"path": path})
+    finally:
+        os.unlink(path)
+    return LoadReport(table.name, len(frame), time.perf_counter() - start)
+
+
+def load_table(engine, table, frame: pd.DataFrame, chunk_size: int = 5000,
+               bulk_file: bool = False) -> LoadReport:
+    # Compact float32 metrics are stored as float64 at the source precision
+    frame = widen_metrics(frame)
+    if bulk_file and engine.dialect.name == "mysql":
+        return _load_infile(engine, table, frame)
+    return _load_chunked(engine, table, frame, chunk_size)
+
+
+def load_star_schema(engine, dim_state: pd.DataFrame, dim_district: pd.DataFrame,
+                     fact: pd.DataFrame, chunk_size: int = 5000, bulk_file: bool = False) -> list:
+    """Upsert both dimensions (concurrently), then the fact table, then the rollups.
+
+    Frames use the SQL column names (state_code, dist_code, crop, ...).
+    Returns one LoadReport per table, plus one for the rollup refresh.
+    """
+    create_schema(engine)
+    jobs = [(dim_state_table, dim_state), (dim_district_table, dim_district)]
+    # SQLite allows a single writer, so the dimensions go one after the other there
+    workers = 1 if engine.dialect.name == "sqlite" else len(jobs)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(load_table, engine, t, f, chunk_size, bulk_file) for t, f in jobs]
+        reports = [f.result() for f in futures]
+    ids = crop_ids(engine, fact["crop"].unique())
+    fact = fact.assign(crop_id=fact["crop"].map(ids)).drop(columns="crop")
+    reports.append(load_table(engine, fact_table, fact, chunk_size, bulk_file))
+
+    # Recompute only the rollup rows whose (state, year, crop) was just written
+    start = time.perf_counter()
+    keys = fact[["state_code", "year", "crop_id"]].drop_duplicates()
+    refresh_rollups(engine, keys.itertuples(index=False, name=None))
+    reports.append(LoadReport("rollups", len(keys), time.perf_counter() - start))
+
+    with engine.begin() as conn:
+        bump_data_version(conn)
+    return reports
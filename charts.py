@@ -0,0 +1,170 @@
+"""Chart specs and a headless, parallel rendering stage.
+
+The analysis scripts describe each chart as a `ChartSpec` (the data, the chart
+kind and its labels) instead of drawing it inline. `render_charts` draws the
+specs to PNG/SVG with the non-interactive Agg backend, spread across a process
+pool, and closes each figure once it is saved so memory stays bounded.
+`show_charts` draws the same specs interactively, one window at a time.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+KINDS = ("bar", "line", "pie", "scatter", "panels")
+
+
+@dataclass
+class ChartSpec:
+    """One chart: `kind` is bar, line, pie, scatter or panels.
+
+    `y` may be a list of columns for multi-series bar/line charts. `panels`
+    holds sub-specs laid out side by side in one figure. Less common settings
+    (colors, markers, rotation, legend title, ...) go in `options`.
+    """
+    name: str
+    kind: str
+    data: pd.DataFrame = None
+    x: str = None
+    y: object = None
+    title: str = ""
+    xlabel: str = None
+    ylabel: str = None
+    figsize: tuple = (10, 6)
+    options: dict = field(default_factory=dict)
+    panels: list = None
+
+    def __post_init__(self):
+        if self.kind not in KINDS:
+            raise ValueError(f"unknown chart kind {self.kind!r}; expected one of {KINDS}")
+
+
+def _series(spec):
+    return spec.y if isinstance(spec.y, (list, tuple)) else [spec.y]
+
+
+def _draw(ax, spec: ChartSpec) -> None:
+    opts = spec.options
+    data = spec.data
+    if spec.kind == "bar" and len(_series(spec)) == 1:
+        ax.bar(data[spec.x], data[spec.y], color=opts.get("color"))
+    elif spec.kind == "bar":
+        data.set_index(spec.x)[list(spec.y)].plot(kind="bar", stacked=opts.get("stacked", False), ax=ax)
+    elif spec.kind == "line":
+        ys = _series(spec)
+        colors = opts.get("colors", [opts.get("color")] * len(ys))
+        markers = opts.get("markers", [opts.get("marker", "o")] * len(ys))
+        labels = opts.get("labels", ys)
+        for y, color, marker, label in zip(ys, colors, markers, labels):
+            ax.plot(data[spec.x], data[y], marker=marker, color=color, label=label)
+    elif spec.kind == "pie":
+        ax.pie(data[spec.y], labels=data[spec.x], autopct=opts.get("autopct"),
+               startangle=opts.get("startangle", 0))
+    elif spec.kind == "scatter":
+        ax.scatter(data[spec.x], data[spec.y], alpha=opts.get("alpha", 0.5), color=opts.get("color"))
+        if "annotate" in opts:
+            dx, dy = opts.get("offset", (0, 0))
+            for px, py, label in zip(data[spec.x], data[spec.y], data[opts["annotate"]]):
+                ax.text(px + dx, py + dy, label, fontsize=opts.get("fontsize", 8))
+
+    ax.set_title(spec.title)
+    if spec.xlabel is not None:
+        ax.set_xlabel(spec.xlabel)
+    if spec.ylabel is not None:
+        ax.set_ylabel(spec.ylabel)
+    if "rotation" in opts:
+        for label in ax.get_xticklabels():
+            label.set_rotation(opts["rotation"])
+            label.set_horizontalalignment(opts.get("ha", "center"))
+    if opts.get("legend") or "legend_title" in opts:
+        ax.legend(title=opts.get("legend_title"))
+    if opts.get("grid"):
+        ax.grid(True, linestyle="--", alpha=0.6)
+
+
+def draw_chart(spec: ChartSpec):
+    """Build the matplotlib figure for `spec` and return it (still open)."""
+    import matplotlib.pyplot as plt
+
+    if spec.kind == "panels":
+        fig, axes = plt.subplots(1, len(spec.panels), figsize=spec.figsize)
+        for ax, panel in zip(axes, spec.panels):
+            _draw(ax, panel)
+    else:
+        fig, ax = plt.subplots(figsize=spec.figsize)
+        _draw(ax, spec)
+    fig.tight_layout()
+    return fig
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_chart(spec: ChartSpec, out_dir, fmt: str = "png", dpi: int = 100) -> str:
+    import matplotlib.pyplot as plt
+
+    path = Path(out_dir) / f"{spec.name}.{fmt}"
+    fig = draw_chart(spec)
+    try:
+        fig.savefig(path, format=fmt, dpi=dpi)
+    finally:
+        plt.close(fig)
+    return str(path)
+
+
+def _render_timed(spec: ChartSpec, out_dir, fmt: str, dpi: int) -> tuple:
+    wall, cpu = time.perf_counter(), time.process_time()
+    path = render_chart(spec, out_dir, fmt, dpi)
+    return path, time.perf_counter() - wall, time.process_time() - cpu, os.getpid()
+
+
+def render_charts(specs, out_dir, fmt: str = "png", processes: int = None, dpi: int = 100,
+                  tracer=None) -> list:
+    """Render every spec to `out_dir` in a process pool; returns the file paths.
+
+    With an instrumentation `Tracer`, each chart is recorded as a span measured
+    in its worker process.
+    """
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    specs = list(specs)
+    names = [s.name for s in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("chart names must be unique, they are used as file names")
+
+    def _record(future, name):
+        if future.exception() is None:
+            _, wall, cpu, pid = future.result()
+            tracer.record(f"chart:{name}", tracer.now_us() - wall * 1e6, wall, cpu, tid=pid)
+
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_init_worker) as pool:
+        futures = []
+        for spec in specs:
+            future = pool.submit(_render_timed, spec, out_dir, fmt, dpi)
+            if tracer is not None:
+                future.add_done_callback(lambda f, name=spec.name: _record(f, name))
+            futures.append(future)
+        return [f.result()[0] for f in futures]
+
+
+def show_charts(specs) -> None:
+    """Interactive fallback: draw and show the specs one after another."""
+    import matplotlib.pyplot as plt
+
+    for spec in specs:
+        draw_chart(spec)
+        plt.show()
+        plt.close("all")
+
+
+def emit_charts(specs, out_dir=None, fmt: str = "png", tracer=None) -> None:
+    """Render headlessly to `out_dir` when given, otherwise show interactively."""
+    if out_dir:
+        for path in render_charts(specs, out_dir, fmt, tracer=tracer):
+            print("wrote", path)
+    else:
+        show_charts(specs)
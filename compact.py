@@ -0,0 +1,151 @@
+"""Compact in-memory representation of the fact table, plus a memory report.
+
+Layout of a compact fact frame:
+
+* crop, state and district names are categoricals;
+* district/state codes and years are int16 (int32 if a value does not fit);
+* area, production and yield are float32.
+
+NaN policy: a NaN metric means "not reported" (a blank cell in the workbook
+or a value that is not a number). It is never filled with 0, so sums skip it
+and means are not dragged down. A reported 0 stays 0. float32 keeps about 7
+significant digits, which is well within the 2-decimal precision of the
+source data and of the SQL FLOAT columns the tables are stored in. That holds
+for the stored values, not for what a sum makes of them: 123.45 is stored as
+123.449997, and a total of such values prints as 51528.480244 instead of
+51528.48. Sums and means therefore go through `widen` first, which restores
+float64 at the source's 2 decimals, so totals match the float64 table. Only
+float32 values are rounded; float64 input is passed through unchanged, so a
+raw workbook frame keeps values finer than 2 decimals. Frames handed to a SQL
+backend or database go through `widen_metrics`, so SUM/AVG there and the API's
+JSON never see float32 noise either.
+
+`MemoryProfiler` records the peak and steady-state bytes of each pipeline
+stage with tracemalloc. NumPy and pandas buffers are included.
+"""
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+CODE_COLUMNS = {"Dist Code", "State Code", "Year", "dist_code", "state_code", "year", "crop_id"}
+NAME_COLUMNS = {"Crop", "State Name", "Dist Name", "crop", "state_name", "dist_name"}
+
+# Decimal places of the workbook's area, production and yield values
+SOURCE_DECIMALS = 2
+
+
+def code_dtype(values) -> np.dtype:
+    """int16 when every value fits, otherwise int32."""
+    values = np.asarray(values)
+    if values.size == 0:
+        return np.dtype(np.int16)
+    info = np.iinfo(np.int16)
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    return np.dtype(np.int16 if info.min <= lo and hi <= info.max else np.int32)
+
+
+def compact_fact(fact: pd.DataFrame) -> pd.DataFrame:
+    """Return `fact` with the compact dtypes described in the module docstring."""
+    out = {}
+    for col in fact.columns:
+        series = fact[col]
+        if col in CODE_COLUMNS:
+            dtype = code_dtype(series.to_numpy(dtype="float64", na_value=np.nan))
+            # Missing codes need the nullable integer type
+            out[col] = series.astype(dtype if series.notna().all() else f"Int{dtype.itemsize * 8}")
+        elif col in NAME_COLUMNS:
+            out[col] = series.astype("category")
+        elif pd.api.types.is_float_dtype(series):
+            out[col] = series.astype(np.float32)
+        else:
+            out[col] = series
+    return pd.DataFrame(out, index=fact.index)
+
+
+def _widen_series(series: pd.Series, decimals: int) -> pd.Series:
+    if series.dtype == np.float32:
+        return series.astype("float64").round(decimals)
+    return series.astype("float64")
+
+
+def widen(values, decimals: int = SOURCE_DECIMALS):
+    """Metrics as float64 ready to be summed or averaged.
+
+    float32 values are rounded back to the source precision; float64 values
+    are returned as they are.
+    """
+    if isinstance(values, pd.DataFrame):
+        return values.apply(_widen_series, decimals=decimals)
+    if isinstance(values, pd.Series):
+        return _widen_series(values, decimals)
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        return np.round(values.astype(np.float64), decimals)
+    return values.astype(np.float64, copy=False)
+
+
+def widen_metrics(frame: pd.DataFrame, decimals: int = SOURCE_DECIMALS) -> pd.DataFrame:
+    """`frame` with its float32 columns widened (see `widen`); every other column untouched."""
+    narrow = [c for c in frame.columns if frame[c].dtype == np.float32]
+    if not narrow:
+        return frame
+    return frame.assign(**{c: widen(frame[c], decimals) for c in narrow})
+
+
+def frame_bytes(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(deep=True).sum())
+
+
+class MemoryProfiler:
+    """Per-stage peak/steady-state memory, measured with tracemalloc.
+
+    Use `with profiler.stage("reshape"): ...` around each step, then print
+    `profiler.report()`. When disabled, stages are no-ops (tracemalloc slows
+    allocation-heavy code noticeably). Peaks are taken through
+    `instrumentation.PeakWatch`, so stages and an active memory-tracking
+    `Tracer` do not reset each other's peaks.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = bool(enabled)
+        self.stages = []
+        self._started = False
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        from instrumentation import PeakWatch
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        watch = PeakWatch()
+        try:
+            yield
+        finally:
+            steady, peak = watch.close()
+            before = watch.base
+            self.stages.append({
+                "stage": name,
+                "peak_bytes": peak,
+                "steady_bytes": steady,
+                "delta_bytes": steady - before,
+            })
+
+    def stop(self) -> None:
+        """Stop tracemalloc if this profiler started it and nothing else is measuring."""
+        from instrumentation import watches_open
+
+        if self._started and tracemalloc.is_tracing() and not watches_open():
+            tracemalloc.stop()
+        self._started = False
+
+    def report(self) -> pd.DataFrame:
+        report = pd.DataFrame(self.stages, columns=["stage", "peak_bytes", "steady_bytes", "delta_bytes"])
+        for col in ("peak_bytes", "steady_bytes", "delta_bytes"):
+            report[col.replace("_bytes", "_mb")] = (report[col] / 2**20).round(1)
+        return report
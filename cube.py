@@ -0,0 +1,254 @@
+"""Dense district x crop x year x metric cube.
+
+The data has a fixed, small set of dimensions: about 300 districts, 29 crops,
+52 years and 3 metrics. It fits in a dense float32 array of a few MB, where
+NaN means "not reported" (the NaN policy of compact.py). The common questions
+are slices and axis reductions over that array:
+
+* state totals come from a precomputed state x district membership matrix
+  (one matrix product);
+* the national trend is a sum over the district axis;
+* a district drill-down is a plain slice.
+
+The year axis covers every year from the first to the last, so a gap in the
+data is a NaN slice rather than a missing row.
+
+`CropCube` has the same `totals`/`top_n`/`trend`/`by_crop` interface as
+`fact_views.CropAggregates`, so the EDA can use either one. `save`/`load` keep
+the values in an .npy file that is opened as an `np.memmap`, with the
+coordinates in JSON. A cube too large for RAM (e.g. the 100x synthetic data)
+can then be sliced straight from disk.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from compact import widen
+from fact_views import LEVELS, METRICS, CropAggregates
+from reshape import ID_COLUMNS, METRICS as WIDE_METRICS, SQL_NAMES, parse_crop_columns
+
+
+def _year_axis(year: np.ndarray) -> tuple:
+    """(every year from first to last, position of each input year on that axis)."""
+    if not len(year):
+        return np.array([], dtype=np.int64), year
+    years = np.arange(year.min(), year.max() + 1)
+    return years, year - years[0]
+
+
+class CropCube(CropAggregates):
+    """values[district, crop, year, metric]; districts are (Dist Code, State Code) pairs.
+
+    Only `totals` is reimplemented; the CropAggregates views slice its result.
+    """
+
+    def __init__(self, values: np.ndarray, districts, crops, years, metrics,
+                 state_names: dict, dist_names):
+        self.values = values
+        self.districts = np.asarray(districts, dtype=np.int64).reshape(-1, 2)
+        self.crops = list(crops)
+        self.years = np.asarray(years, dtype=np.int64)
+        self.cube_metrics = list(metrics)
+        self.metrics = [m for m in METRICS if m in self.cube_metrics]
+        self.state_names = {int(k): v for k, v in state_names.items()}
+        self.dist_names = np.asarray(dist_names, dtype=object)
+        self.dist_state = self.districts[:, 1]
+        self.states = np.unique(self.dist_state)
+
+        self._crop_pos = {c: i for i, c in enumerate(self.crops)}
+        self._metric_pos = {m: i for i, m in enumerate(self.cube_metrics)}
+        self._membership = None
+        self._reduced = {}
+        self._totals = {}
+
+    # ---- construction
+    @classmethod
+    def from_fact(cls, fact: pd.DataFrame, dim_state: pd.DataFrame, dim_district: pd.DataFrame,
+                  metrics: list = None):
+        """Cube from the long fact table (EDA column names, as in Eda_agri.py)."""
+        metrics = metrics or [c for c in fact.columns
+                              if c not in ID_COLUMNS + ["Crop", "State Name", "Dist Name"]]
+        pairs = fact[["Dist Code", "State Code"]].to_numpy(dtype=np.int64)
+        districts, d_idx = np.unique(pairs, axis=0, return_inverse=True)
+        years, y_idx = _year_axis(fact["Year"].to_numpy(dtype=np.int64))
+        crop = fact["Crop"].astype("category")
+
+        values = np.full((len(districts), len(crop.cat.categories), len(years), len(metrics)),
+                         np.nan, dtype=np.float32)
+        values[d_idx.reshape(-1), crop.cat.codes.to_numpy(), y_idx] = (
+            fact[metrics].to_numpy(dtype=np.float32, na_value=np.nan))
+
+        state_names = dim_state.drop_duplicates("State Code").set_index("State Code")["State Name"]
+        dist_names = (dim_district.drop_duplicates(["Dist Code", "State Code"])
+                      .set_index(["Dist Code", "State Code"])["Dist Name"])
+        names = dist_names.reindex(pd.MultiIndex.from_arrays(districts.T)).to_numpy()
+        return cls(values, districts, list(crop.cat.categories), years, metrics,
+                   state_names.to_dict(), names)
+
+    @classmethod
+    def from_wide(cls, df: pd.DataFrame, crop_columns: dict = None):
+        """Cube straight from the wide workbook frame, without building the long table."""
+        if crop_columns is None:
+            crop_columns = parse_crop_columns(df.columns)
+        df = df[df[ID_COLUMNS].notna().all(axis=1)]
+        if df.duplicated(ID_COLUMNS).any():
+            raise ValueError("rows share a (Dist Code, Year, State Code) key")
+
+        pairs = df[["Dist Code", "State Code"]].to_numpy(dtype=np.int64)
+        districts, d_idx = np.unique(pairs, axis=0, return_inverse=True)
+        d_idx = d_idx.reshape(-1)
+        years, y_idx = _year_axis(df["Year"].to_numpy(dtype=np.int64))
+        crops = sorted(crop_columns)
+
+        values = np.full((len(districts), len(crops), len(years), len(WIDE_METRICS)), np.nan, dtype=np.float32)
+        for m, metric in enumerate(WIDE_METRICS):
+            for c, crop in enumerate(crops):
+                col = crop_columns[crop].get(metric)
+                if col is not None:
+                    values[d_idx, c, y_idx, m] = pd.to_numeric(df[col], errors="coerce").to_numpy(
+                        dtype="float64", na_value=np.nan)
+
+        state_names = df.drop_duplicates("State Code").set_index("State Code")["State Name"].to_dict()
+        first = np.unique(d_idx, return_index=True)[1]
+        dist_names = np.empty(len(districts), dtype=object)
+        dist_names[d_idx[first]] = df["Dist Name"].to_numpy()[first]
+        return cls(values, districts, crops, years, [SQL_NAMES[m] for m in WIDE_METRICS],
+                   state_names, dist_names)
+
+    # ---- coordinates and slicing
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    @property
+    def density(self) -> float:
+        """Share of (district, crop, year) cells with at least one reported metric."""
+        return float(self.present.mean()) if self.values.size else 0.0
+
+    @property
+    def present(self) -> np.ndarray:
+        return ~np.isnan(self.values).all(axis=3)
+
+    @property
+    def membership(self) -> np.ndarray:
+        """states x districts 0/1 matrix; `membership @ x` sums x over each state's districts."""
+        if self._membership is None:
+            self._membership = (self.states[:, None] == self.dist_state[None, :]).astype(np.float64)
+        return self._membership
+
+    def _crop_index(self, crop):
+        if isinstance(crop, (list, tuple)):
+            return [self._crop_pos[c] for c in crop]
+        return self._crop_pos[crop]
+
+    def _year_index(self, year):
+        # The year axis is contiguous, so a year's position is its offset from the first
+        years = np.asarray(year)
+        if not np.isin(years, self.years).all():
+            missing = sorted(set(np.atleast_1d(years).tolist()) - set(self.years.tolist()))
+            raise KeyError(f"years {missing} are outside the cube's {int(self.years[0])}-{int(self.years[-1])}")
+        return years - self.years[0]
+
+    def sel(self, crop=None, metric=None, year=None, state=None) -> np.ndarray:
+        """values for the given labels; None keeps the whole axis. `state` is a State Name.
+
+        An unknown crop, metric or state, or a year outside `years`, raises KeyError.
+        """
+        index = [None] * 4
+        if state is not None:
+            codes = [code for code, name in self.state_names.items() if name == state]
+            if not codes:
+                raise KeyError(state)
+            index[0] = np.flatnonzero(np.isin(self.dist_state, codes))
+        if crop is not None:
+            index[1] = self._crop_index(crop)
+        if year is not None:
+            index[2] = self._year_index(year)
+        if metric is not None:
+            index[3] = self._metric_pos[metric]
+        # Take axes one at a time (last first) so list selectors do not broadcast together
+        out = self.values
+        for axis in reversed(range(4)):
+            if index[axis] is not None:
+                out = np.take(out, index[axis], axis=axis)
+        return out
+
+    # ---- reductions
+    def reduce(self, level: str) -> tuple:
+        """(sums, counts) over the additive metrics for a fact_views level.
+
+        sums has the level's axes plus crop (and year) plus metric; counts is
+        the number of reported cells behind each sum (0 = no such group).
+        """
+        if level not in self._reduced:
+            metric_idx = [self._metric_pos[m] for m in self.metrics]
+            filled = np.nan_to_num(widen(self.values[..., metric_idx]), nan=0.0)
+            present = self.present.astype(np.int64)
+            if level == "district":
+                out = filled.sum(axis=2), present.sum(axis=2)
+            elif level == "year":
+                out = filled.sum(axis=0), present.sum(axis=0)
+            else:
+                n_districts = len(self.districts)
+                by_state = (self.membership @ filled.reshape(n_districts, -1)).reshape(
+                    (len(self.states),) + filled.shape[1:])
+                counts = (self.membership @ present.reshape(n_districts, -1)).reshape(
+                    (len(self.states),) + present.shape[1:])
+                out = (by_state, counts) if level == "state_year" else (by_state.sum(axis=2), counts.sum(axis=2))
+            self._reduced[level] = out
+        return self._reduced[level]
+
+    def totals(self, level: str) -> pd.DataFrame:
+        """Same frame as CropAggregates.totals, built from the array reductions."""
+        if level not in self._totals:
+            sums, counts = self.reduce(level)
+            hit = np.nonzero(counts > 0)
+            state_names = np.array([self.state_names.get(int(c)) for c in self.states], dtype=object)
+            crop_names = np.asarray(self.crops, dtype=object)
+            if level == "state":
+                s, c = hit
+                levels = [state_names[s]]
+            elif level == "district":
+                d, c = hit
+                levels = [np.array([self.state_names.get(int(x)) for x in self.dist_state[d]], dtype=object),
+                          self.dist_names[d]]
+            elif level == "year":
+                c, y = hit
+                levels = [self.years[y]]
+            else:
+                s, c, y = hit
+                levels = [state_names[s], self.years[y]]
+            index = pd.MultiIndex.from_arrays([crop_names[c]] + levels, names=["Crop"] + LEVELS[level])
+            self._totals[level] = pd.DataFrame(sums[hit], index=index, columns=self.metrics).sort_index()
+        return self._totals[level]
+
+    # ---- persistence
+    def save(self, directory) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        out = np.lib.format.open_memmap(directory / "values.npy", mode="w+",
+                                        dtype=self.values.dtype, shape=self.values.shape)
+        out[:] = self.values
+        out.flush()
+        del out
+        coords = {
+            "districts": self.districts.tolist(),
+            "crops": self.crops,
+            "years": self.years.tolist(),
+            "metrics": self.cube_metrics,
+            "state_names": {str(k): v for k, v in self.state_names.items()},
+            "dist_names": [None if pd.isna(n) else str(n) for n in self.dist_names],
+        }
+        (directory / "coords.json").write_text(json.dumps(coords))
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap_mode: str = "r"):
+        """Reopen a saved cube; the values stay on disk as a memory map."""
+        directory = Path(directory)
+        coords = json.loads((directory / "coords.json").read_text())
+        values = np.load(directory / "values.npy", mmap_mode=mmap_mode)
+        return cls(values, coords["districts"], coords["crops"], coords["years"], coords["metrics"],
+                   coords["state_names"], coords["dist_names"])
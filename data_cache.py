@@ -0,0 +1,54 @@
+"""Columnar on-disk cache for the district-level workbook.
+
+The first load parses the Excel file once and writes it as an uncompressed
+Arrow IPC (Feather v2) file named after a fingerprint of the workbook bytes.
+Later loads memory-map that file, so only a changed workbook is re-parsed.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+DEFAULT_SOURCE = "District_Level_Data.xlsx"
+DEFAULT_CACHE_DIR = ".agri_cache"
+
+
+def file_fingerprint(path, chunk_size: int = 1 << 20) -> str:
+    """Content hash of `path`; changes whenever the workbook bytes change."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def cache_path_for(source, cache_dir=DEFAULT_CACHE_DIR) -> Path:
+    source = Path(source)
+    return Path(cache_dir) / f"{source.stem}-{file_fingerprint(source)}.arrow"
+
+
+def _write_cache(df: pd.DataFrame, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(".arrow.tmp")
+    # Uncompressed so the file can be memory-mapped without a decode step
+    feather.write_feather(df, tmp, compression="uncompressed")
+    os.replace(tmp, target)
+    # Drop caches left behind by older versions of the same workbook
+    for stale in target.parent.glob(f"{target.name.rsplit('-', 1)[0]}-*.arrow"):
+        if stale != target:
+            stale.unlink(missing_ok=True)
+
+
+def load_district_data(source=DEFAULT_SOURCE, cache_dir=DEFAULT_CACHE_DIR,
+                       refresh: bool = False) -> pd.DataFrame:
+    """Return the wide district-level frame, parsing Excel only on a cache miss."""
+    target = cache_path_for(source, cache_dir)
+    if target.exists() and not refresh:
+        table = feather.read_table(target, memory_map=True)
+        return table.to_pandas()
+
+    df = pd.read_excel(source)
+    _write_cache(df, target)
+    return df
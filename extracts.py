@@ -0,0 +1,187 @@
+"""Dashboard-ready Parquet extracts.
+
+`write_extracts` writes one version of the extracts to its own directory under
+`out_dir`:
+
+* `fact/`: the long fact table with state and district names attached, as a
+  Hive-partitioned dataset (`crop=RICE/decade=1990/...`). String columns are
+  dictionary-encoded and files are zstd-compressed;
+* `kpi_crop_year.parquet`: national area, production, yield from totals,
+  area-weighted mean yield (`metrics.derived_metrics`) and reporting
+  district/state counts per crop and year;
+* `state_summary.parquet`: the same per state, plus the state's share of
+  national production;
+* `manifest.json`: for every partition file, its crop, decade, row count and
+  min/max of year and the metrics; row counts for the summary tables.
+
+A refresh filtered on a crop or a year range then opens only the matching
+files (`read_fact`), and the summary tables are small enough to read whole.
+`out_dir/CURRENT` names the live version. It is replaced in one `os.replace`
+once a version is complete, so readers that go through `current_extract` see
+either the old or the new extracts, never a mix. The version before the live
+one is kept for readers that resolved it just before the switch; older ones
+are removed.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import unquote
+
+import pandas as pd
+
+from metrics import derived_metrics
+
+METRIC_COLUMNS = ["area_1000_ha", "production_1000_t", "yield_kg_ha"]
+POINTER = "CURRENT"
+
+
+def _enriched(dim_state, dim_district, fact) -> pd.DataFrame:
+    fact = fact.rename(columns=str.lower)
+    dim_state = dim_state.rename(columns=str.lower).drop_duplicates("state_code")
+    dim_district = dim_district.rename(columns=str.lower).drop_duplicates(["dist_code", "state_code"])
+    out = (fact.merge(dim_state, on="state_code", how="left")
+               .merge(dim_district, on=["dist_code", "state_code"], how="left"))
+    out["crop"] = out["crop"].astype(str)
+    out["decade"] = (out["year"] // 10 * 10).astype("int16")
+    for col in ("state_name", "dist_name"):
+        out[col] = out[col].astype("category")
+    return out
+
+
+def kpi_tables(enriched: pd.DataFrame) -> tuple:
+    """(kpi_crop_year, state_summary) from the enriched fact frame."""
+    kpi = derived_metrics(enriched, ["crop", "year"]).drop(columns="production_share")
+    counts = (enriched.groupby(["crop", "year"], observed=True)
+              .agg(n_districts=("dist_code", "nunique"), n_states=("state_code", "nunique"))
+              .reset_index())
+    kpi = kpi.merge(counts, on=["crop", "year"], how="left")
+
+    keys = ["crop", "state_code", "state_name", "year"]
+    state = (derived_metrics(enriched, keys, share_within=["crop", "year"])
+             .rename(columns={"production_share": "share_of_national_production"}))
+    counts = (enriched.groupby(keys, observed=True)
+              .agg(n_districts=("dist_code", "nunique"))
+              .reset_index())
+    state = state.merge(counts, on=keys, how="left")
+    return kpi, state
+
+
+def _partition_entry(path: Path, root: Path) -> dict:
+    import pyarrow.parquet as pq
+
+    meta = pq.ParquetFile(path).metadata
+    entry = {"path": path.relative_to(root).as_posix(), "rows": meta.num_rows}
+    for part in path.relative_to(root).parent.parts:
+        key, _, value = part.partition("=")
+        entry[key] = unquote(value)
+    entry["decade"] = int(entry["decade"])
+    names = [meta.schema.column(i).name for i in range(meta.num_columns)]
+    for col in ["year"] + METRIC_COLUMNS:
+        if col not in names:
+            continue
+        i = names.index(col)
+        lows, highs = [], []
+        for rg in range(meta.num_row_groups):
+            stats = meta.row_group(rg).column(i).statistics
+            if stats is not None and stats.has_min_max:
+                lows.append(stats.min)
+                highs.append(stats.max)
+        entry[f"{col}_min"] = min(lows) if lows else None
+        entry[f"{col}_max"] = max(highs) if highs else None
+    return entry
+
+
+def write_extracts(dim_state, dim_district, fact, out_dir, compression: str = "zstd") -> dict:
+    """Write a new version of the extracts under `out_dir` and make it current; returns the manifest."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    version = "v" + datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    scratch = out_dir / version
+    scratch.mkdir()
+
+    enriched = _enriched(dim_state, dim_district, fact)
+    table = pa.Table.from_pandas(enriched, preserve_index=False)
+    partitioning = ds.partitioning(pa.schema([("crop", pa.string()), ("decade", pa.int16())]), flavor="hive")
+    options = ds.ParquetFileFormat().make_write_options(compression=compression, use_dictionary=True)
+    ds.write_dataset(table, scratch / "fact", format="parquet", partitioning=partitioning,
+                     file_options=options, basename_template="part-{i}.parquet")
+
+    kpi, state = kpi_tables(enriched)
+    kpi.to_parquet(scratch / "kpi_crop_year.parquet", index=False, compression=compression)
+    state.to_parquet(scratch / "state_summary.parquet", index=False, compression=compression)
+
+    partitions = [_partition_entry(p, scratch / "fact") for p in (scratch / "fact").rglob("*.parquet")]
+    manifest = {
+        "version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "fact_rows": len(enriched),
+        "partitioning": ["crop", "decade"],
+        "partitions": sorted(partitions, key=lambda e: (e["crop"], e["decade"], e["path"])),
+        "tables": {"kpi_crop_year": len(kpi), "state_summary": len(state)},
+    }
+    (scratch / "manifest.json").write_text(json.dumps(manifest, indent=1, default=str))
+
+    # Point readers at the finished version, then drop all but it and its predecessor
+    previous = _pointer(out_dir)
+    pointer = out_dir / f"{POINTER}.{os.getpid()}.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, out_dir / POINTER)
+    for path in out_dir.iterdir():
+        if path.is_dir() and path.name.startswith("v") and path.name not in (version, previous):
+            shutil.rmtree(path, ignore_errors=True)
+    return manifest
+
+
+def _pointer(out_dir: Path):
+    try:
+        return (out_dir / POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def current_extract(out_dir) -> Path:
+    """Directory of the live extracts version under `out_dir`."""
+    out_dir = Path(out_dir)
+    version = _pointer(out_dir)
+    if version is None:
+        raise FileNotFoundError(f"no extracts under {out_dir}")
+    return out_dir / version
+
+
+def prune(manifest: dict, crops=None, years=None) -> list:
+    """Manifest entries that can hold rows for `crops` and the inclusive (first, last) `years`."""
+    wanted = None if crops is None else {c.upper() for c in crops}
+    out = []
+    for entry in manifest["partitions"]:
+        if wanted is not None and entry["crop"] not in wanted:
+            continue
+        if years is not None:
+            first, last = years
+            if entry.get("year_max") is not None and entry["year_max"] < first:
+                continue
+            if entry.get("year_min") is not None and entry["year_min"] > last:
+                continue
+        out.append(entry)
+    return out
+
+
+def read_fact(out_dir, crops=None, years=None, columns=None) -> pd.DataFrame:
+    """Read only the partitions the manifest says can match, then filter the rows."""
+    import pyarrow.dataset as ds
+
+    out_dir = current_extract(out_dir)
+    manifest = json.loads((out_dir / "manifest.json").read_text())
+    files = [str(out_dir / "fact" / e["path"]) for e in prune(manifest, crops, years)]
+    if not files:
+        return pd.DataFrame(columns=columns)
+    dataset = ds.dataset(files, format="parquet", partitioning="hive",
+                         partition_base_dir=str(out_dir / "fact"))
+    condition = None
+    if years is not None:
+        condition = (ds.field("year") >= years[0]) & (ds.field("year") <= years[1])
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
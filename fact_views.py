@@ -0,0 +1,99 @@
+"""Enriched fact frame and precomputed per-crop aggregates for the EDA.
+
+`enrich_fact` attaches state and district names to the long fact table once,
+with the crop as a categorical. `CropAggregates` runs one grouped aggregation
+over all crops per grouping level and caches it. Each per-crop chart then
+slices that result (`top_n`, `trend`, `by_crop`) instead of re-merging and
+re-grouping the whole fact table.
+"""
+import pandas as pd
+
+from compact import widen
+
+# Additive metrics only; summing yields across districts is meaningless
+METRICS = ["Area_1000_ha", "Production_1000_t"]
+
+# Grouping columns per level; the first column after "Crop" is what `state=`
+# slices on for the two state-scoped levels.
+LEVELS = {
+    "state": ["State Name"],
+    "district": ["State Name", "Dist Name"],
+    "year": ["Year"],
+    "state_year": ["State Name", "Year"],
+}
+
+
+def enrich_fact(fact: pd.DataFrame, dim_state: pd.DataFrame, dim_district: pd.DataFrame) -> pd.DataFrame:
+    """Fact rows plus State Name and Dist Name, with Crop as a categorical."""
+    state_names = dim_state.drop_duplicates("State Code").set_index("State Code")["State Name"]
+    dist_names = (dim_district.drop_duplicates(["Dist Code", "State Code"])
+                  .set_index(["Dist Code", "State Code"])["Dist Name"])
+    dist_keys = pd.MultiIndex.from_frame(fact[["Dist Code", "State Code"]])
+    return fact.assign(
+        Crop=fact["Crop"].astype("category"),
+        **{
+            "State Name": fact["State Code"].map(state_names).astype("category"),
+            "Dist Name": pd.Categorical(dist_names.reindex(dist_keys).to_numpy()),
+        },
+    )
+
+
+class CropAggregates:
+    """Per-level totals of the metrics for every crop, computed once and sliced."""
+
+    def __init__(self, enriched: pd.DataFrame, metrics: list = None):
+        self.fact = enriched
+        self.metrics = metrics or [m for m in METRICS if m in enriched.columns]
+        self._totals = {}
+
+    @classmethod
+    def from_totals(cls, totals: dict, metrics: list = None) -> "CropAggregates":
+        """Views over per-level totals computed elsewhere (e.g. merged state partitions)."""
+        aggregates = cls(pd.DataFrame(), metrics or list(METRICS))
+        aggregates._totals = dict(totals)
+        return aggregates
+
+    def totals(self, level: str) -> pd.DataFrame:
+        """Sums indexed by (Crop, *level columns), sorted so crop lookups are slices."""
+        if level not in self._totals:
+            grouper = [self.fact[k] for k in ["Crop"] + LEVELS[level]]
+            self._totals[level] = (widen(self.fact[self.metrics])
+                                   .groupby(grouper, observed=True).sum().sort_index())
+        return self._totals[level]
+
+    def _slice(self, crop, level: str, state: str = None) -> pd.DataFrame:
+        totals = self.totals(level)
+        if isinstance(crop, (list, tuple)):
+            part = totals.loc[list(crop)]
+            part = part.groupby(level=LEVELS[level], observed=True).sum()
+        else:
+            part = totals.xs(crop, level="Crop")
+        if state is not None:
+            part = part.xs(state, level="State Name")
+        return part
+
+    def top_n(self, crop, level: str = "state", metric="Production_1000_t",
+              n: int = None, state: str = None) -> pd.DataFrame:
+        """Largest `metric` totals for `crop` (a name or a list summed together).
+
+        `metric` may be a list; rows are ranked by its first entry. `state`
+        restricts the district and state_year levels to one state, e.g.
+        top_n("RICE", "district", state="West Bengal"). `n=None` keeps all rows.
+        """
+        metrics = [metric] if isinstance(metric, str) else list(metric)
+        part = self._slice(crop, level, state)[metrics]
+        ranked = part.reset_index().sort_values(metrics[0], ascending=False)
+        return ranked.head(n) if n is not None else ranked
+
+    def trend(self, crop, metric: str = "Production_1000_t", last: int = None) -> pd.DataFrame:
+        """National yearly totals for `crop`, oldest first, optionally only the last N years."""
+        yearly = self._slice(crop, "year")[[metric]].reset_index().sort_values("Year")
+        return yearly.tail(last) if last is not None else yearly
+
+    def by_crop(self, crops: list, level: str = "state", metric: str = "Production_1000_t") -> pd.DataFrame:
+        """`metric` per level value with one column per crop (missing combinations as 0)."""
+        part = self.totals(level).loc[list(crops), metric]
+        part.index = part.index.remove_unused_levels()
+        wide = part.unstack("Crop").fillna(0)
+        wide.columns = wide.columns.astype(str)
+        return wide
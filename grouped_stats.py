@@ -0,0 +1,89 @@
+"""Grouped Pearson correlation from grouped sums.
+
+For every group we need n, Σx, Σy, Σxy, Σx² and Σy² over the rows where both
+values are present, plus the guards the per-group `.corr()` loop in q4 used:
+the group has at least 3 rows, and x and y each have more than one distinct
+value. Those come from a single vectorized groupby on the client, or from one
+GROUP BY in the database (`pearson_sums_sql`), so only one row per group
+crosses the wire. `pearson_from_sums` then turns the sums into r.
+"""
+import numpy as np
+import pandas as pd
+
+SUM_COLUMNS = ["n_rows", "nunique_x", "nunique_y", "n", "sx", "sy", "sxy", "sxx", "syy"]
+
+
+def pearson_from_sums(sums: pd.DataFrame, keys: list, min_rows: int = 3) -> pd.DataFrame:
+    """r per group from the SUM_COLUMNS; groups failing the guards are dropped."""
+    n, sx, sy = sums["n"].astype(float), sums["sx"].astype(float), sums["sy"].astype(float)
+    cov = n * sums["sxy"] - sx * sy
+    var_x = n * sums["sxx"] - sx * sx
+    var_y = n * sums["syy"] - sy * sy
+    valid = ((sums["n_rows"] >= min_rows) & (sums["nunique_x"] > 1) & (sums["nunique_y"] > 1)
+             & (n >= 2) & (var_x > 0) & (var_y > 0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = (cov / np.sqrt(var_x * var_y)).clip(-1.0, 1.0)
+    out = sums.loc[valid, keys].copy()
+    out["pearson_corr"] = r[valid].to_numpy()
+    return out.sort_values("pearson_corr", ascending=False).reset_index(drop=True)
+
+
+def grouped_sums(df: pd.DataFrame, keys: list, x: str, y: str) -> pd.DataFrame:
+    grouped = df.groupby(keys, sort=False, observed=True)
+    counts = pd.DataFrame({
+        "n_rows": grouped.size(),
+        "nunique_x": grouped[x].nunique(),
+        "nunique_y": grouped[y].nunique(),
+    })
+
+    # Moments over complete (x, y) pairs only, matching pairwise-complete .corr()
+    pair = df[x].notna() & df[y].notna()
+    xs = df.loc[pair, x].astype("float64")
+    ys = df.loc[pair, y].astype("float64")
+    moments = pd.DataFrame({"n": 1, "sx": xs, "sy": ys, "sxy": xs * ys, "sxx": xs * xs, "syy": ys * ys})
+    moments[keys] = df.loc[pair, keys]
+    moments = moments.groupby(keys, sort=False, observed=True).sum()
+
+    sums = counts.join(moments, how="left").fillna({c: 0 for c in moments.columns})
+    return sums.reset_index()[keys + SUM_COLUMNS]
+
+
+def grouped_pearson(df: pd.DataFrame, keys: list, x: str, y: str, min_rows: int = 3) -> pd.DataFrame:
+    """Pearson r of x vs y for every group of `keys`, sorted by r descending."""
+    return pearson_from_sums(grouped_sums(df, keys, x, y), keys, min_rows)
+
+
+def pearson_sums_sql(keys: list, x: str, y: str, from_clause: str, where: str = "") -> str:
+    """SQL returning SUM_COLUMNS per group, for `pearson_from_sums` on the client.
+
+    `keys`, `x` and `y` are column expressions valid in `from_clause`; keys are
+    returned under their bare column names.
+    """
+    both = f"{x} IS NOT NULL AND {y} IS NOT NULL"
+    key_select = ",\n    ".join(f"{k} AS {k.split('.')[-1]}" for k in keys)
+    return f"""
+SELECT
+    {key_select},
+    COUNT(*) AS n_rows,
+    COUNT(DISTINCT {x}) AS nunique_x,
+    COUNT(DISTINCT {y}) AS nunique_y,
+    SUM(CASE WHEN {both} THEN 1 ELSE 0 END) AS n,
+    SUM(CASE WHEN {both} THEN {x} END) AS sx,
+    SUM(CASE WHEN {both} THEN {y} END) AS sy,
+    SUM(CASE WHEN {both} THEN {x} * {y} END) AS sxy,
+    SUM(CASE WHEN {both} THEN {x} * {x} END) AS sxx,
+    SUM(CASE WHEN {both} THEN {y} * {y} END) AS syy
+FROM {from_clause}
+{f"WHERE {where}" if where else ""}
+GROUP BY {", ".join(keys)};
+"""
+
+
+# q4 pushed down: one row per (district, crop) instead of every fact row
+Q4_PEARSON_SUMS = pearson_sums_sql(
+    keys=["d.dist_name", "f.crop"],
+    x="f.area_1000_ha",
+    y="f.production_1000_t",
+    from_clause="fact_crop_yearly_long f\nJOIN dim_district d ON f.dist_code = d.dist_code",
+    where="f.crop IN ('RICE', 'WHEAT', 'MAIZE')",
+)
@@ -0,0 +1,165 @@
+"""Year-over-year change, N-year change, CAGR and rolling means for many horizons.
+
+q2 and q3 compute a 5-year change by self-joining the fact table on
+`year = max_year` and `year = max_year - 5`. Each extra horizon costs another
+pair of scans. Here every horizon comes from one pass over the data sorted by
+year, computed either on the client (`growth_table`, `growth_by`) or in SQL
+(`growth_template`).
+
+The shifts are by calendar year, not by row. Missing years are gaps on a
+dense year axis client-side; in SQL they fall outside a `RANGE BETWEEN n
+PRECEDING AND n PRECEDING` frame. A value therefore never gets compared
+with the wrong year. The base of an N-year comparison is the value N years
+earlier. When the base is missing the result is NULL/NaN. When the base is 0
+the percentage change is also NULL/NaN, as `NULLIF(base, 0)` does in q3. CAGR
+needs a positive base and a non-negative end value. Rolling means average the
+reported values in the trailing window, as AVG does.
+
+Output columns per horizon n: `change_{n}`, `pct_change_{n}` and `cagr_{n}`;
+per window w: `rolling_mean_{w}`.
+"""
+import numpy as np
+import pandas as pd
+
+from compact import widen
+from query_templates import QueryTemplate
+
+# Grouping keys per level (in addition to crop), on SQL column names
+LEVEL_KEYS = {
+    "district": ["dist_code"],
+    "state": ["state_code"],
+    "country": [],
+}
+
+
+def _check_spans(horizons, windows) -> tuple:
+    horizons, windows = tuple(int(n) for n in horizons), tuple(int(w) for w in windows)
+    if any(n < 1 for n in horizons) or any(w < 1 for w in windows):
+        raise ValueError("horizons and windows must be positive numbers of years")
+    return horizons, windows
+
+
+def growth_table(frame: pd.DataFrame, keys: list, value: str, year: str = "year",
+                 horizons=(1, 5), windows=(3,)) -> pd.DataFrame:
+    """Growth columns for `value` per `keys` group; one row per input row, sorted by keys and year.
+
+    (keys, year) must be unique, e.g. the output of a groupby-sum.
+    """
+    horizons, windows = _check_spans(horizons, windows)
+    keys = list(keys)
+    frame = frame.sort_values(keys + [year]).reset_index(drop=True)
+    if frame.duplicated(keys + [year]).any():
+        raise ValueError(f"{keys + [year]} must be unique; aggregate first")
+
+    years = frame[year].to_numpy(dtype=np.int64)
+    if keys:
+        groups, _ = pd.MultiIndex.from_frame(frame[keys]).factorize()
+    else:
+        groups = np.zeros(len(frame), dtype=np.int64)
+    first = years.min() if len(years) else 0
+    cols = years - first
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    n_years = int(cols.max()) + 1 if len(cols) else 0
+
+    # groups x years grid; a year the group did not report stays NaN
+    grid = np.full((n_groups, n_years), np.nan)
+    grid[groups, cols] = frame[value].to_numpy(dtype="float64", na_value=np.nan)
+
+    out = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for n in horizons:
+            base = np.full_like(grid, np.nan)
+            if n < n_years:
+                base[:, n:] = grid[:, :-n]
+            change = grid - base
+            out[f"change_{n}"] = change
+            out[f"pct_change_{n}"] = np.where(base != 0, change / base * 100, np.nan)
+            out[f"cagr_{n}"] = np.where((base > 0) & (grid >= 0), ((grid / base) ** (1 / n) - 1) * 100, np.nan)
+        reported = ~np.isnan(grid)
+        sums = np.concatenate([np.zeros((n_groups, 1)), np.nancumsum(grid, axis=1)], axis=1)
+        counts = np.concatenate([np.zeros((n_groups, 1)), np.cumsum(reported, axis=1)], axis=1)
+        for w in windows:
+            start = np.maximum(np.arange(n_years) + 1 - w, 0)
+            total = sums[:, 1:] - sums[:, start]
+            count = counts[:, 1:] - counts[:, start]
+            out[f"rolling_mean_{w}"] = np.where(count > 0, total / np.where(count > 0, count, 1), np.nan)
+
+    return frame.assign(**{name: grid_values[groups, cols] for name, grid_values in out.items()})
+
+
+def growth_by(fact: pd.DataFrame, level: str = "state", metric: str = "Production_1000_t",
+              crops=None, horizons=(1, 5), windows=(3,)) -> pd.DataFrame:
+    """Sum `metric` per crop, `level` group and year, then add the growth columns.
+
+    `fact` uses the SQL column names (star-schema frames or query results).
+    Groups whose values are all missing sum to NaN, not 0, as SUM does in SQL.
+    """
+    keys = ["crop"] + LEVEL_KEYS[level]
+    if crops is not None:
+        fact = fact[fact["crop"].isin(list(crops))]
+    summed = (widen(fact[metric]).groupby([fact[k] for k in keys + ["year"]], observed=True)
+              .sum(min_count=1).reset_index())
+    summed["crop"] = summed["crop"].astype(str)
+    return growth_table(summed, keys, metric, horizons=horizons, windows=windows)
+
+
+def latest(growth: pd.DataFrame, by: str = "crop", year: str = "year") -> pd.DataFrame:
+    """Rows in each `by` group's latest year, the point q2/q3 report their change at."""
+    last = growth.groupby(by, observed=True)[year].transform("max")
+    return growth[growth[year] == last].reset_index(drop=True)
+
+
+def growth_sql(level: str = "state", metric: str = "production_1000_t",
+               horizons=(1, 5), windows=(3,)) -> str:
+    """SQL computing the growth columns in one windowed pass; `{crop_filter}` is left in."""
+    horizons, windows = _check_spans(horizons, windows)
+    keys = ["crop"] + LEVEL_KEYS[level]
+    key_list = ", ".join(keys)
+    partition = f"PARTITION BY {key_list} ORDER BY year"
+
+    framed = []
+    for n in horizons:
+        framed.append(f"MAX(value) OVER ({partition} RANGE BETWEEN {n} PRECEDING AND {n} PRECEDING) AS base_{n}")
+    for w in windows:
+        framed.append(f"AVG(value) OVER ({partition} RANGE BETWEEN {w - 1} PRECEDING AND CURRENT ROW)"
+                      f" AS rolling_mean_{w}")
+
+    final = []
+    for n in horizons:
+        final += [
+            f"value - base_{n} AS change_{n}",
+            f"(value - base_{n}) / NULLIF(base_{n}, 0) * 100 AS pct_change_{n}",
+            f"CASE WHEN base_{n} > 0 AND value >= 0 THEN (POWER(value / base_{n}, 1.0 / {n}) - 1) * 100 END"
+            f" AS cagr_{n}",
+        ]
+    final += [f"rolling_mean_{w}" for w in windows]
+
+    sep = ",\n    "
+    return f"""
+WITH base AS (
+    SELECT {", ".join("f." + k for k in keys)}, f.year, SUM(f.{metric}) AS value
+    FROM fact_crop_yearly_long f
+    WHERE {{crop_filter}}
+    GROUP BY {", ".join("f." + k for k in keys)}, f.year
+),
+framed AS (
+    SELECT {key_list}, year, value,
+    {sep.join(framed)}
+    FROM base
+)
+SELECT {key_list}, year, value,
+    {sep.join(final)}
+FROM framed
+ORDER BY {key_list}, year
+"""
+
+
+def growth_template(level: str = "state", metric: str = "production_1000_t",
+                    horizons=(1, 5), windows=(3,)) -> QueryTemplate:
+    """Batched template: `.run(backend, crops=[...])`, or crops=None for every crop.
+
+    CAGR uses POWER, which SQLite provides only when built with its math
+    functions; `growth_by` computes the same columns on the client.
+    """
+    return QueryTemplate(f"growth_{level}_{metric}", growth_sql(level, metric, horizons, windows),
+                         batched=True)
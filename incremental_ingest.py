@@ -0,0 +1,167 @@
+"""Incremental ingest: reshape and load only the workbook slices that changed.
+
+Each (Dist Code, Year) row of the wide workbook is one slice. Its content hash
+is compared with the hash recorded by the previous load (`ingest_slice_hash`).
+Only new or changed slices are reshaped and upserted. The fact rows of changed
+and removed slices are deleted first, so crops that were blanked out do not
+linger. The affected rollup keys are refreshed, and a row is appended to
+`load_manifest`. Publishing one more crop year therefore costs about one
+year of data, not a full rebuild.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from bulk_loader import load_table
+from compact import widen
+from reshape import build_star_schema
+from rollups import refresh_rollups
+from schema import (bump_data_version, create_schema, crop_ids, dim_district_table,
+                    dim_state_table, fact_table, load_manifest_table, slice_hash_table)
+
+SLICE_KEYS = ["Dist Code", "Year"]
+
+
+@dataclass
+class LoadManifest:
+    slices_new: int
+    slices_changed: int
+    slices_removed: int
+    fact_rows: int
+    seconds: float
+
+    def __str__(self) -> str:
+        return (f"{self.slices_new} new, {self.slices_changed} changed, {self.slices_removed} removed "
+                f"slices; {self.fact_rows} fact rows in {self.seconds:.2f}s")
+
+
+def _hashable(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` in sorted column order with dtype-independent values.
+
+    hash_pandas_object hashes the raw bytes, so 5 and 5.0, or a float32 and a
+    float64 123.45, would hash differently. Numeric columns become float64
+    (float32 rounded back to the source precision by `widen`), everything else
+    plain objects.
+    """
+    out = {}
+    for col in sorted(df.columns, key=str):
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            out[col] = widen(series)
+        else:
+            out[col] = series.astype(object)
+    return pd.DataFrame(out, index=df.index)
+
+
+def slice_hashes(df: pd.DataFrame) -> pd.DataFrame:
+    """dist_code, year and a signed 64-bit content hash for every wide row.
+
+    The hash depends on the values only, not on the dtypes they were read as.
+    """
+    hashes = pd.util.hash_pandas_object(_hashable(df), index=False).to_numpy().view("int64")
+    return pd.DataFrame({
+        "dist_code": df["Dist Code"].to_numpy(dtype="int64"),
+        "year": df["Year"].to_numpy(dtype="int64"),
+        "row_hash": hashes,
+    })
+
+
+def diff_slices(current: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+    """Outer-join current and previous hashes; adds a `status` column.
+
+    status is "new", "changed", "removed" or "same".
+    """
+    # Nullable ints: the outer join's gaps would otherwise turn the 64-bit
+    # hashes into float64 and round away their low bits
+    merged = current.astype({"row_hash": "Int64"}).merge(
+        previous.astype({"row_hash": "Int64"}), on=["dist_code", "year"], how="outer",
+        suffixes=("", "_prev"), indicator=True)
+    status = pd.Series("same", index=merged.index)
+    status[merged["_merge"] == "left_only"] = "new"
+    status[merged["_merge"] == "right_only"] = "removed"
+    both = merged["_merge"] == "both"
+    status[both & (merged["row_hash"] != merged["row_hash_prev"]).fillna(False)] = "changed"
+    return merged.drop(columns="_merge").assign(status=status)
+
+
+def incremental_ingest(engine, df: pd.DataFrame, source: str = None,
+                       source_fingerprint: str = None, chunk_size: int = 5000) -> LoadManifest:
+    """Bring the database in line with the wide frame `df`, touching only changed slices."""
+    start = time.perf_counter()
+    create_schema(engine)
+
+    df = df[df[SLICE_KEYS].notna().all(axis=1)]
+    with engine.connect() as conn:
+        previous = pd.read_sql(text("SELECT dist_code, year, row_hash FROM ingest_slice_hash"), conn)
+    previous = previous.astype("int64")
+    diff = diff_slices(slice_hashes(df), previous)
+    counts = diff["status"].value_counts()
+    touched = diff[diff["status"].isin(["new", "changed"])]
+    stale = diff[diff["status"].isin(["changed", "removed"])]
+
+    # Old rollup keys for the stale slices' years; refreshing a superset is harmless
+    old_keys = set()
+    if len(stale):
+        years = sorted({int(y) for y in stale["year"]})
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT DISTINCT state_code, year, crop_id FROM fact_crop_yearly WHERE year IN :years")
+                .bindparams(bindparam("years", expanding=True)),
+                {"years": years},
+            ).all()
+            old_keys = {tuple(r) for r in rows}
+            conn.execute(text("DELETE FROM fact_crop_yearly WHERE dist_code = :dist_code AND year = :year"),
+                         stale[["dist_code", "year"]].astype(int).to_dict("records"))
+
+    fact_rows = 0
+    new_keys = set()
+    if len(touched):
+        wanted = pd.MultiIndex.from_frame(touched[["dist_code", "year"]].astype(int))
+        in_slice = pd.MultiIndex.from_frame(df[SLICE_KEYS].astype(int)).isin(wanted)
+        dim_state, dim_district, fact = build_star_schema(df[in_slice])
+        load_table(engine, dim_state_table, dim_state, chunk_size)
+        load_table(engine, dim_district_table, dim_district, chunk_size)
+        ids = crop_ids(engine, fact["crop"].unique())
+        fact = fact.assign(crop_id=fact["crop"].map(ids).astype(int)).drop(columns="crop")
+        load_table(engine, fact_table, fact, chunk_size)
+        fact_rows = len(fact)
+        new_keys = set(fact[["state_code", "year", "crop_id"]].drop_duplicates()
+                       .itertuples(index=False, name=None))
+
+    if old_keys or new_keys:
+        refresh_rollups(engine, old_keys | new_keys)
+
+    manifest = LoadManifest(
+        slices_new=int(counts.get("new", 0)),
+        slices_changed=int(counts.get("changed", 0)),
+        slices_removed=int(counts.get("removed", 0)),
+        fact_rows=fact_rows,
+        seconds=time.perf_counter() - start,
+    )
+
+    with engine.begin() as conn:
+        removed = diff[diff["status"] == "removed"]
+        if len(removed):
+            conn.execute(text("DELETE FROM ingest_slice_hash WHERE dist_code = :dist_code AND year = :year"),
+                         removed[["dist_code", "year"]].astype(int).to_dict("records"))
+        if len(touched):
+            conn.execute(text("DELETE FROM ingest_slice_hash WHERE dist_code = :dist_code AND year = :year"),
+                         touched[["dist_code", "year"]].astype(int).to_dict("records"))
+            conn.execute(slice_hash_table.insert(),
+                         touched[["dist_code", "year", "row_hash"]].astype("int64").to_dict("records"))
+        conn.execute(load_manifest_table.insert(), {
+            "loaded_at": datetime.now(),
+            "source": source,
+            "source_fingerprint": source_fingerprint,
+            "slices_new": manifest.slices_new,
+            "slices_changed": manifest.slices_changed,
+            "slices_removed": manifest.slices_removed,
+            "fact_rows": manifest.fact_rows,
+            "seconds": manifest.seconds,
+        })
+        if len(touched) or len(stale):
+            bump_data_version(conn)
+    return manifest
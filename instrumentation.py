@@ -0,0 +1,268 @@
+"""Per-stage spans, slow-query capture and an opt-in cProfile hook.
+
+A `Tracer` records one span per pipeline stage (load, dimensions, reshape),
+per `run_sql` call and per chart. Each span holds its wall and CPU time, the
+rows going in and out, and the peak traced memory above the level at span
+start. Memory is measured only when tracemalloc is running, which the tracer
+starts when `track_memory` is set. `TracedBackend` wraps any backend. A query
+slower than `slow_sql_seconds` is logged along with its EXPLAIN plan.
+
+The results can be written as structured JSON, or as a Chrome trace that
+chrome://tracing or Perfetto can open. Setting `profile_stage` runs cProfile
+over that one span only and saves a .prof file next to the trace.
+
+Settings come from the environment (`Tracer.from_env`):
+
+* AGRI_TRACE: output path; tracing is off when unset;
+* AGRI_TRACE_FORMAT: "json" or "chrome";
+* AGRI_TRACE_MEMORY;
+* AGRI_SLOW_SQL_SECONDS;
+* AGRI_PROFILE_STAGE.
+
+Spans opened from worker threads nest per thread. tracemalloc keeps a single
+process-wide peak. Every measurement of it is a `PeakWatch`, which resets it
+under one module-wide lock and first folds it into every open watch, whichever
+thread, tracer or `compact.MemoryProfiler` opened it. A span's
+peak_delta_bytes is then never lost to a concurrent reset, but it includes
+whatever concurrent spans allocated while it was open.
+"""
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from result_cache import normalize_sql
+
+
+_peak_lock = threading.Lock()
+_peak_watches = set()
+
+
+class PeakWatch:
+    """tracemalloc's peak from now until `close()`, safe against resets elsewhere.
+
+    Opening a watch resets the process-wide peak; the peak reached so far is
+    folded into every other open watch first.
+    """
+    __slots__ = ("base", "peak")
+
+    def __init__(self):
+        with _peak_lock:
+            self.base, peak = tracemalloc.get_traced_memory()
+            for other in _peak_watches:
+                other.peak = max(other.peak, peak)
+            tracemalloc.reset_peak()
+            self.peak = self.base
+            _peak_watches.add(self)
+
+    def close(self) -> tuple:
+        """(current, peak) traced bytes; the peak covers everything since the watch opened."""
+        with _peak_lock:
+            current, peak = tracemalloc.get_traced_memory()
+            _peak_watches.discard(self)
+            self.peak = max(self.peak, peak)
+        return current, self.peak
+
+
+def watches_open() -> bool:
+    with _peak_lock:
+        return bool(_peak_watches)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "rows_in", "rows_out", "start_us", "wall_s", "cpu_s",
+                 "peak_delta_bytes", "tid")
+
+    def __init__(self, name: str, rows_in: int = None, attrs: dict = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.start_us = 0.0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_delta_bytes = None
+        self.tid = threading.get_ident()
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name, "start_us": round(self.start_us, 1), "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6), "rows_in": self.rows_in, "rows_out": self.rows_out,
+            "peak_delta_bytes": self.peak_delta_bytes, "tid": self.tid, **self.attrs,
+        }
+
+
+def _rows(value):
+    return len(value) if hasattr(value, "__len__") else None
+
+
+def explain_plan(backend, q: str, params: dict = None) -> list:
+    """EXPLAIN output for `q` on `backend` (unwrapping caches and tracers) as records."""
+    while hasattr(backend, "backend"):
+        backend = backend.backend
+    dialect = getattr(getattr(backend, "engine", None), "dialect", None)
+    kind = dialect.name if dialect is not None else getattr(backend, "name", "")
+    prefix = "EXPLAIN QUERY PLAN " if kind == "sqlite" else "EXPLAIN "
+    try:
+        return backend.run_sql(prefix + q, params).astype(str).to_dict("records")
+    except Exception as exc:  # a plan is diagnostics only; never fail the query over it
+        return [{"error": f"{type(exc).__name__}: {exc}"}]
+
+
+class Tracer:
+    def __init__(self, enabled: bool = True, track_memory: bool = False, slow_sql_seconds: float = 1.0,
+                 profile_stage: str = None, output: str = None, fmt: str = "json"):
+        self.enabled = bool(enabled)
+        self.track_memory = track_memory
+        self.slow_sql_seconds = slow_sql_seconds
+        self.profile_stage = profile_stage
+        self.output = output
+        self.fmt = fmt
+        self.spans = []
+        self.slow_queries = []
+        self.profile_path = None
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.enabled and track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_env(cls):
+        output = os.environ.get("AGRI_TRACE")
+        return cls(
+            enabled=bool(output),
+            track_memory=bool(os.environ.get("AGRI_TRACE_MEMORY")),
+            slow_sql_seconds=float(os.environ.get("AGRI_SLOW_SQL_SECONDS", "1.0")),
+            profile_stage=os.environ.get("AGRI_PROFILE_STAGE"),
+            output=output,
+            fmt=os.environ.get("AGRI_TRACE_FORMAT", "json"),
+        )
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, rows_in=None, **attrs):
+        """Time the block as span `name`; set `span.rows_out` inside it.
+
+        `rows_in` is a row count or anything with a length (e.g. a DataFrame).
+        """
+        if rows_in is not None and not isinstance(rows_in, int):
+            rows_in = _rows(rows_in)
+        span = Span(name, rows_in, attrs)
+        if not self.enabled:
+            yield span
+            return
+
+        watch = PeakWatch() if tracemalloc.is_tracing() else None
+        stack = self._stack()
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        stack.append(span)
+        span.start_us = (time.perf_counter() - self._origin) * 1e6
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield span
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            span.wall_s = time.perf_counter() - wall
+            span.cpu_s = time.process_time() - cpu
+            stack.pop()
+            if watch is not None:
+                _, peak = watch.close()
+                span.peak_delta_bytes = max(peak - watch.base, 0)
+            if profiler is not None:
+                self._save_profile(profiler, name)
+            with self._lock:
+                self.spans.append(span)
+
+    def record(self, name: str, start_us: float, wall_s: float, cpu_s: float, tid=None, **attrs) -> None:
+        """Add a span measured elsewhere (e.g. in a worker process)."""
+        if not self.enabled:
+            return
+        span = Span(name, attrs=attrs)
+        span.start_us, span.wall_s, span.cpu_s = start_us, wall_s, cpu_s
+        if tid is not None:
+            span.tid = tid
+        with self._lock:
+            self.spans.append(span)
+
+    def now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _save_profile(self, profiler, name: str) -> None:
+        base = Path(self.output).parent if self.output else Path(".")
+        self.profile_path = base / f"profile-{name.replace(' ', '_')}.prof"
+        profiler.dump_stats(self.profile_path)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+    def slow_query(self, sql: str, seconds: float, plan: list, name: str = None) -> None:
+        with self._lock:
+            self.slow_queries.append({"name": name, "seconds": round(seconds, 6),
+                                      "sql": normalize_sql(sql), "plan": plan})
+
+    def to_json(self) -> dict:
+        return {
+            "spans": [s.as_dict() for s in sorted(self.spans, key=lambda s: s.start_us)],
+            "slow_queries": self.slow_queries,
+            "profile": str(self.profile_path) if self.profile_path else None,
+        }
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = []
+        for s in self.spans:
+            args = {k: v for k, v in s.as_dict().items() if k not in ("name", "start_us", "wall_s", "tid")}
+            events.append({"name": s.name, "ph": "X", "ts": s.start_us, "dur": s.wall_s * 1e6,
+                           "pid": pid, "tid": s.tid, "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"slow_queries": self.slow_queries}}
+
+    def write(self, path=None, fmt: str = None) -> str:
+        """Write the trace to `path` (default: the configured output); returns the path."""
+        path = path or self.output
+        if not self.enabled or not path:
+            return None
+        payload = self.to_chrome_trace() if (fmt or self.fmt) == "chrome" else self.to_json()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(payload, indent=1, default=str))
+        return str(path)
+
+
+class TracedBackend:
+    """Backend wrapper that opens a span per `run_sql` and logs slow queries with their plan.
+
+    `names` ({name: sql} or {name: (sql, params)}, as passed to `run_batch`)
+    labels spans with the query name instead of the SQL text.
+    """
+
+    def __init__(self, backend, tracer: Tracer, names: dict = None):
+        self.backend = backend
+        self.tracer = tracer
+        self._names = {}
+        for name, job in (names or {}).items():
+            sql = job[0] if isinstance(job, tuple) else job
+            self._names[normalize_sql(sql)] = name
+
+    def __getattr__(self, attr):
+        return getattr(self.backend, attr)
+
+    def run_sql(self, q: str, params: dict = None):
+        name = self._names.get(normalize_sql(q))
+        label = f"sql:{name}" if name else "sql"
+        with self.tracer.span(label, query=name or normalize_sql(q)[:120]) as span:
+            result = self.backend.run_sql(q, params)
+            span.rows_out = len(result)
+        if self.tracer.enabled and span.wall_s >= self.tracer.slow_sql_seconds:
+            self.tracer.slow_query(q, span.wall_s, explain_plan(self.backend, q, params), name)
+        return result
@@ -0,0 +1,130 @@
+"""Derived ratio metrics at any grouping level: yield, output shares, weighted yield.
+
+Ratios are never averaged. Each group's totals are summed first and then
+divided, with masked array arithmetic instead of a Python call per row:
+
+* yield from totals: production / area, in kg/ha, both summed over the rows
+  where both are reported, so a district with production but no area does
+  not inflate it;
+* area-weighted mean yield: Σ(yield · area) / Σ(area), over the rows where
+  both are reported. This is what an "average yield" of several districts,
+  states or years means; a plain AVG gives a 1 ha district the same say as a
+  1000 ha one;
+* production share: a group's production over the total of its enclosing
+  group (the whole frame by default, i.e. the national total).
+
+Compact float32 inputs are widened back to float64 at the source precision
+(`compact.widen`) before anything is summed. A zero or missing denominator
+gives NaN, like NULLIF in the SQL. The same
+metrics can be pushed down to the database with `derived_metrics_sql`, so only
+one row per group comes back.
+"""
+import numpy as np
+import pandas as pd
+
+from compact import widen
+
+DERIVED_COLUMNS = ["yield_kg_ha", "yield_kg_ha_weighted", "production_share"]
+
+
+def safe_divide(numerator, denominator, scale: float = 1.0, fill: float = np.nan):
+    """numerator / denominator * scale, `fill` where the denominator is 0 or missing.
+
+    Series in, Series out (with the numerator's index); arrays otherwise.
+    """
+    num = np.asarray(numerator, dtype="float64")
+    den = np.asarray(denominator, dtype="float64")
+    out = np.full(np.broadcast(num, den).shape, fill, dtype="float64")
+    np.divide(num * scale, den, out=out, where=(den != 0) & ~np.isnan(den))
+    if isinstance(numerator, pd.Series):
+        return pd.Series(out, index=numerator.index, name=numerator.name)
+    return out
+
+
+def yield_kg_ha(production, area, fill: float = np.nan):
+    """Yield from totals: 1000 t / 1000 ha -> kg/ha."""
+    return safe_divide(production, area, scale=1000, fill=fill)
+
+
+def _keys(keys) -> list:
+    return [keys] if isinstance(keys, str) else list(keys)
+
+
+def weighted_mean(frame: pd.DataFrame, keys, weights: dict) -> pd.DataFrame:
+    """Weighted mean of each `value` column per group of `keys`.
+
+    `weights` maps value column -> weight column, e.g.
+    {"RICE YIELD (Kg per ha)": "RICE AREA (1000 ha)"}. Rows where either is
+    missing are left out of both sums. The result is indexed by `keys`, sorted.
+    """
+    parts = {}
+    for value, weight in weights.items():
+        v = widen(frame[value].to_numpy())
+        w = widen(frame[weight].to_numpy())
+        valid = ~np.isnan(v) & ~np.isnan(w)
+        parts[(value, "vw")] = np.where(valid, v * w, 0.0)
+        parts[(value, "w")] = np.where(valid, w, 0.0)
+    sums = (pd.DataFrame(parts, index=frame.index)
+            .groupby([frame[k] for k in _keys(keys)], observed=True, sort=True).sum())
+    return pd.DataFrame({value: safe_divide(sums[(value, "vw")], sums[(value, "w")]).to_numpy()
+                         for value in weights}, index=sums.index)
+
+
+def derived_metrics(frame: pd.DataFrame, keys, area: str = "area_1000_ha",
+                    production: str = "production_1000_t", yield_col: str = "yield_kg_ha",
+                    share_within=None) -> pd.DataFrame:
+    """Area and production totals plus DERIVED_COLUMNS per group of `keys`.
+
+    `share_within` lists the key columns whose groups the production share is
+    taken of, e.g. keys=["Year", "State Name"], share_within=["Year"] for each
+    state's share of that year's national output. Without a `yield_col` in the
+    frame, yield_kg_ha_weighted is left out. The area and production columns
+    total every reported value; yield_kg_ha pairs them row by row.
+    """
+    keys = _keys(keys)
+    grouper = [frame[k] for k in keys]
+    values = widen(frame[[area, production]])
+    paired = values.notna().all(axis=1)
+    values["paired_area"] = values[area].where(paired)
+    values["paired_production"] = values[production].where(paired)
+    totals = values.groupby(grouper, observed=True, sort=True).sum()
+    out = pd.DataFrame({area: totals[area], production: totals[production]})
+    out["yield_kg_ha"] = yield_kg_ha(totals["paired_production"], totals["paired_area"])
+    if yield_col in frame.columns:
+        out["yield_kg_ha_weighted"] = weighted_mean(frame, keys, {yield_col: area})[yield_col]
+    if share_within:
+        enclosing = totals[production].groupby(level=_keys(share_within), observed=True).transform("sum")
+    else:
+        enclosing = totals[production].sum()
+    out["production_share"] = safe_divide(totals[production], enclosing)
+    return out.reset_index()
+
+
+def derived_metrics_sql(keys: list, from_clause: str, where: str = "", share_within: list = None,
+                        alias: str = "f") -> str:
+    """SQL returning the area/production totals and DERIVED_COLUMNS per group.
+
+    `keys` and `share_within` are column expressions valid in `from_clause`;
+    keys come back under their bare column names. `alias` is the fact table's
+    alias there. The share uses SUM(...) OVER, so the backend needs window
+    functions (MySQL 8, SQLite 3.25+, DuckDB).
+    """
+    area, production, yld = (f"{alias}.area_1000_ha", f"{alias}.production_1000_t",
+                             f"{alias}.yield_kg_ha")
+    key_select = ",\n    ".join(f"{k} AS {k.split('.')[-1]}" for k in keys)
+    partition = f"PARTITION BY {', '.join(share_within)}" if share_within else ""
+    return f"""
+SELECT
+    {key_select},
+    SUM({area}) AS area_1000_ha,
+    SUM({production}) AS production_1000_t,
+    SUM(CASE WHEN {area} IS NOT NULL THEN {production} END) * 1000
+        / NULLIF(SUM(CASE WHEN {production} IS NOT NULL THEN {area} END), 0) AS yield_kg_ha,
+    SUM({yld} * {area})
+        / NULLIF(SUM(CASE WHEN {yld} IS NOT NULL THEN {area} END), 0) AS yield_kg_ha_weighted,
+    SUM({production}) / NULLIF(SUM(SUM({production})) OVER ({partition}), 0) AS production_share
+FROM {from_clause}
+{f"WHERE {where}" if where else ""}
+GROUP BY {", ".join(keys)}
+ORDER BY {", ".join(keys)};
+"""
@@ -0,0 +1,147 @@
+"""State-partitioned, multi-process reshape and aggregation.
+
+Every district belongs to exactly one state, so the wide frame splits by
+`State Code` into independent partitions:
+
+* the wide frame is sorted by state and written once as an uncompressed Arrow
+  IPC file in a scratch directory (/dev/shm when available). Each state is a
+  contiguous row range of it;
+* each worker memory-maps that file, takes a zero-copy slice of its states'
+  rows, runs `build_fact_table` and the per-level `CropAggregates` totals, and
+  writes the results back as Arrow IPC files. Nothing large is pickled, only
+  the file paths and row offsets;
+* the parent memory-maps the partial results and merges them in state-code
+  order, whatever order the workers finished in. The fact table is re-sorted
+  into `build_fact_table`'s key order, and the totals are re-aggregated per
+  level (summing across states for the national `year` level). The result
+  matches the single-process one, up to float rounding in the cross-state sums.
+
+Partitions are submitted largest first, so one big state does not finish last
+on an otherwise idle pool.
+
+    build = build_partitioned(df, processes=8)
+    build.fact                      # same rows as build_fact_table(df, compact=True)
+    build.aggregates.top_n("RICE")  # same views as CropAggregates
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from fact_views import LEVELS, CropAggregates, enrich_fact
+from reshape import ID_COLUMNS, METRICS, SQL_NAMES, build_fact_table, parse_crop_columns
+
+SHM_DIR = "/dev/shm"
+
+
+@dataclass
+class PartitionedBuild:
+    """The merged fact table and aggregates, plus one entry per state partition."""
+    fact: pd.DataFrame
+    aggregates: CropAggregates
+    partitions: list = field(default_factory=list)
+
+    def summary(self) -> str:
+        seconds = [p["seconds"] for p in self.partitions]
+        workers = len({p["pid"] for p in self.partitions})
+        return (f"{len(self.partitions)} states on {workers} processes, {len(self.fact)} fact rows, "
+                f"slowest state {max(seconds, default=0):.2f}s, sum {sum(seconds):.2f}s")
+
+
+def split_states(df: pd.DataFrame) -> tuple:
+    """(wide frame sorted by State Code, [(state_code, start, stop)]) with keyless rows dropped."""
+    df = df[df[ID_COLUMNS].notna().all(axis=1)]
+    df = df.sort_values("State Code", kind="stable").reset_index(drop=True)
+    codes = df["State Code"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=int)
+    stops = np.r_[starts[1:], len(codes)]
+    return df, [(codes[a].item(), int(a), int(b)) for a, b in zip(starts, stops)]
+
+
+def _scratch_root():
+    return SHM_DIR if os.path.isdir(SHM_DIR) and os.access(SHM_DIR, os.W_OK) else None
+
+
+def _build_partition(wide_path: str, out_dir: str, index: int, start: int, stop: int,
+                     crop_columns: dict, levels: tuple) -> dict:
+    """Reshape and aggregate rows [start, stop) of the wide file; results go to `out_dir`."""
+    wall = time.perf_counter()
+    part = feather.read_table(wide_path, memory_map=True).slice(start, stop - start).to_pandas()
+    fact = build_fact_table(part, crop_columns, compact=True)
+    out = Path(out_dir)
+    feather.write_feather(fact, out / f"fact-{index}.arrow", compression="uncompressed")
+
+    enriched = enrich_fact(fact.rename(columns={m: SQL_NAMES[m] for m in METRICS}),
+                           part[["State Code", "State Name"]].drop_duplicates(),
+                           part[["Dist Code", "Dist Name", "State Code"]].drop_duplicates())
+    aggregates = CropAggregates(enriched)
+    for level in levels:
+        # Names as plain strings: per-partition categoricals would not line up
+        totals = aggregates.totals(level).reset_index()
+        for col in ["Crop"] + LEVELS[level]:
+            if isinstance(totals[col].dtype, pd.CategoricalDtype):
+                totals[col] = totals[col].astype(str)
+        feather.write_feather(totals, out / f"totals-{level}-{index}.arrow", compression="uncompressed")
+    return {"rows": stop - start, "fact_rows": len(fact), "seconds": time.perf_counter() - wall,
+            "pid": os.getpid()}
+
+
+def _read(path: Path) -> pd.DataFrame:
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+def _merge_fact(parts: list) -> pd.DataFrame:
+    fact = pd.concat(parts, ignore_index=True)
+    order = np.lexsort([fact[c].to_numpy() for c in reversed(ID_COLUMNS)])
+    return fact.take(order).reset_index(drop=True)
+
+
+def _merge_totals(parts: list, level: str) -> pd.DataFrame:
+    keys = ["Crop"] + LEVELS[level]
+    merged = pd.concat(parts, ignore_index=True)
+    return merged.groupby(keys, sort=True).sum()
+
+
+def build_partitioned(df: pd.DataFrame, processes: int = None, scratch_dir=None,
+                      levels=tuple(LEVELS)) -> PartitionedBuild:
+    """Fact table and per-level totals of `df`, one state partition per task.
+
+    `processes=1` runs the partitions one after another in this process (same
+    code path, no pool). `scratch_dir` holds the Arrow files while the build
+    runs; it defaults to /dev/shm so they never touch the disk.
+    """
+    crop_columns = parse_crop_columns(df.columns)
+    wide, states = split_states(df)
+    if not states:
+        raise ValueError("no rows with a complete (Dist Code, Year, State Code) key")
+    processes = processes or os.cpu_count()
+    levels = tuple(levels)
+
+    with tempfile.TemporaryDirectory(prefix="agri-partitions-", dir=scratch_dir or _scratch_root()) as tmp:
+        wide_path = str(Path(tmp) / "wide.arrow")
+        feather.write_feather(wide, wide_path, compression="uncompressed")
+        del wide
+
+        tasks = sorted(range(len(states)), key=lambda i: states[i][2] - states[i][1], reverse=True)
+        args = {i: (wide_path, tmp, i, states[i][1], states[i][2], crop_columns, levels) for i in tasks}
+        if processes == 1 or len(states) <= 1:
+            stats = {i: _build_partition(*args[i]) for i in tasks}
+        else:
+            with ProcessPoolExecutor(max_workers=min(processes, len(states))) as pool:
+                futures = {i: pool.submit(_build_partition, *args[i]) for i in tasks}
+                stats = {i: future.result() for i, future in futures.items()}
+
+        # Merge in state order, independent of completion order
+        ordered = range(len(states))
+        fact = _merge_fact([_read(Path(tmp) / f"fact-{i}.arrow") for i in ordered])
+        totals = {level: _merge_totals([_read(Path(tmp) / f"totals-{level}-{i}.arrow") for i in ordered], level)
+                  for level in levels}
+
+    partitions = [{"state_code": states[i][0], **stats[i]} for i in range(len(states))]
+    return PartitionedBuild(fact, CropAggregates.from_totals(totals), partitions)
@@ -0,0 +1,243 @@
+"""SQL for the ten analyses in python_with_sql.py, keyed by name (q1..q10).
+
+The queries target the logical `fact_crop_yearly_long`, `dim_state` and
+`dim_district` tables, so they run unchanged against the physical schema in
+schema.py (where `fact_crop_yearly_long` is a view over `fact_crop_yearly`).
+"""
+
+QUERIES = {}
+
+# 1) Year-wise Trend of Rice Production Across States (Top 3 each year)
+QUERIES["q1"] = """
+WITH rice_prod AS (
+    SELECT 
+        f.year,
+        f.state_code,
+        s.state_name,
+        SUM(f.production_1000_t) AS total_rice_production
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    WHERE f.crop = 'RICE'
+    GROUP BY f.year, f.state_code, s.state_name
+),
+ranked AS (
+    SELECT 
+        year,
+        state_name,
+        total_rice_production,
+        RANK() OVER (PARTITION BY year ORDER BY total_rice_production DESC) AS rank_in_year
+    FROM rice_prod
+)
+SELECT year, state_name, total_rice_production
+FROM ranked
+WHERE rank_in_year <= 3
+ORDER BY year, rank_in_year, state_name;
+"""
+
+# 2) Top 5 Districts by Wheat Yield Increase Over the Last 5 Years
+QUERIES["q2"] = """
+WITH year_range AS (
+    SELECT MAX(year) AS max_year
+    FROM fact_crop_yearly_long
+    WHERE crop = 'WHEAT'
+),
+wheat_yield AS (
+    SELECT 
+        f.dist_code,
+        d.dist_name,
+        f.year,
+        f.yield_kg_ha
+    FROM fact_crop_yearly_long f
+    JOIN dim_district d ON f.dist_code = d.dist_code
+    WHERE f.crop = 'WHEAT'
+),
+compare AS (
+    SELECT 
+        w1.dist_code,
+        w1.dist_name,
+        ROUND((w1.yield_kg_ha - w2.yield_kg_ha), 2) AS yield_increase
+    FROM wheat_yield w1
+    JOIN wheat_yield w2 ON w1.dist_code = w2.dist_code
+    JOIN year_range yr ON 1=1
+    WHERE w1.year = yr.max_year
+      AND w2.year = yr.max_year - 5
+)
+SELECT dist_name, yield_increase
+FROM compare
+ORDER BY yield_increase DESC
+LIMIT 5;
+"""
+
+# 3) States with Highest Growth in Oilseed Production (5-Year Growth Rate)
+QUERIES["q3"] = """
+WITH year_range AS (
+    SELECT MAX(year) AS max_year
+    FROM fact_crop_yearly_long
+    WHERE crop = 'OILSEEDS'
+),
+oilseed_data AS (
+    SELECT 
+        f.state_code,
+        s.state_name,
+        f.year,
+        SUM(f.production_1000_t) AS total_production
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    WHERE f.crop = 'OILSEEDS'
+    GROUP BY f.state_code, s.state_name, f.year
+),
+compare AS (
+    SELECT 
+        o1.state_name,
+        o1.total_production AS latest_prod,
+        o2.total_production AS past_prod,
+        ROUND(((o1.total_production - o2.total_production) / NULLIF(o2.total_production,0)) * 100, 2) AS growth_rate
+    FROM oilseed_data o1
+    JOIN oilseed_data o2 ON o1.state_name = o2.state_name
+    JOIN year_range yr ON 1=1
+    WHERE o1.year = yr.max_year
+      AND o2.year = yr.max_year - 5
+)
+SELECT state_name, latest_prod, past_prod, growth_rate
+FROM compare
+ORDER BY growth_rate DESC
+LIMIT 5;
+"""
+
+# 4) District-wise Correlation Between Area and Production for RICE, WHEAT, MAIZE
+QUERIES["q4"] = """
+SELECT 
+    f.dist_code,
+    d.dist_name,
+    f.crop,
+    f.year,
+    f.area_1000_ha,
+    f.production_1000_t
+FROM fact_crop_yearly_long f
+JOIN dim_district d ON f.dist_code = d.dist_code
+WHERE f.crop IN ('RICE', 'WHEAT', 'MAIZE');
+"""
+
+# 5) Yearly Production of Cotton in Top 5 Cotton Producing States
+QUERIES["q5"] = """
+WITH total_cotton AS (
+    SELECT 
+        f.state_code,
+        s.state_name,
+        SUM(f.production_1000_t) AS total_cotton_production
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    WHERE f.crop = 'COTTON'
+    GROUP BY f.state_code, s.state_name
+    ORDER BY total_cotton_production DESC
+    LIMIT 5
+),
+cotton_yearly AS (
+    SELECT 
+        f.year,
+        f.state_code,
+        s.state_name,
+        SUM(f.production_1000_t) AS yearly_production
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    WHERE f.crop = 'COTTON'
+    GROUP BY f.year, f.state_code, s.state_name
+)
+SELECT 
+    c.year,
+    c.state_name,
+    c.yearly_production
+FROM cotton_yearly c
+JOIN total_cotton t ON c.state_code = t.state_code
+ORDER BY c.state_name, c.year;
+"""
+
+# 6) Districts with Highest Groundnut Production in Latest Year
+QUERIES["q6"] = """
+WITH latest_year AS (
+    SELECT MAX(year) AS max_year
+    FROM fact_crop_yearly_long
+    WHERE crop = 'GROUNDNUT'
+)
+SELECT 
+    d.dist_name,
+    SUM(f.production_1000_t) AS production_latest
+FROM fact_crop_yearly_long f
+JOIN dim_district d ON f.dist_code = d.dist_code
+JOIN latest_year y ON f.year = y.max_year
+WHERE f.crop = 'GROUNDNUT'
+GROUP BY d.dist_name
+ORDER BY production_latest DESC
+LIMIT 5;
+"""
+
+# 7) Annual Average Maize Yield Across All States
+QUERIES["q7"] = """
+SELECT 
+    f.year,
+    -- weighted by area: SUM(yield x area) / SUM(area) over districts reporting both
+    ROUND(SUM(f.yield_kg_ha * f.area_1000_ha)
+          / NULLIF(SUM(CASE WHEN f.yield_kg_ha IS NOT NULL THEN f.area_1000_ha END), 0), 2) AS avg_maize_yield
+FROM fact_crop_yearly_long f
+WHERE f.crop = 'MAIZE'
+GROUP BY f.year
+ORDER BY f.year;
+"""
+
+# 8) Total Area Cultivated for Oilseeds in Each State
+QUERIES["q8"] = """
+SELECT 
+    s.state_name,
+    ROUND(SUM(f.area_1000_ha), 2) AS total_oilseeds_area
+FROM fact_crop_yearly_long f
+JOIN dim_state s ON f.state_code = s.state_code
+WHERE f.crop = 'OILSEEDS'
+GROUP BY s.state_name
+ORDER BY total_oilseeds_area DESC;
+"""
+
+# 9) Districts with the Highest Rice Yield
+QUERIES["q9"] = """
+SELECT 
+    d.dist_name,
+    ROUND(MAX(f.yield_kg_ha), 2) AS max_rice_yield
+FROM fact_crop_yearly_long f
+JOIN dim_district d ON f.dist_code = d.dist_code
+WHERE f.crop = 'RICE'
+GROUP BY d.dist_name
+ORDER BY max_rice_yield DESC
+LIMIT 10;
+"""
+
+# 10) Compare Production of Wheat and Rice for Top 5 States Over 10 Years
+QUERIES["q10"] = """
+WITH top_states AS (
+    SELECT 
+        s.state_name,
+        SUM(f.production_1000_t) AS total_prod
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    WHERE f.crop IN ('WHEAT', 'RICE')
+    GROUP BY s.state_name
+    ORDER BY total_prod DESC
+    LIMIT 5
+),
+latest_10_years AS (
+    SELECT DISTINCT year
+    FROM fact_crop_yearly_long
+    ORDER BY year DESC
+    LIMIT 10
+)
+SELECT 
+    f.year,
+    s.state_name,
+    f.crop,
+    ROUND(SUM(f.production_1000_t), 2) AS production
+FROM fact_crop_yearly_long f
+JOIN dim_state s ON f.state_code = s.state_code
+JOIN top_states t ON t.state_name = s.state_name
+JOIN latest_10_years y ON f.year = y.year
+WHERE f.crop IN ('WHEAT', 'RICE')
+GROUP BY f.year, s.state_name, f.crop
+ORDER BY f.year, s.state_name, f.crop;
+"""
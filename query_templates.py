@@ -0,0 +1,399 @@
+"""Parameterized query templates: one crop per call, or every crop in one scan.
+
+q1..q10 in queries.py hard-code their crop. The templates here take the crop
+(and the N of top-N or the look-back years) as bound parameters. The SQL text
+stays the same from call to call, so the statement cache is reused:
+SQLAlchemy's compiled cache through `backends.SQLAlchemyBackend`, and
+sqlite3's per-connection statement cache. A different crop never needs a new
+statement.
+
+Each single-crop template also has a batched form. The batched form takes a
+list of crops, or None for all of them. It partitions its window functions
+and groupings by crop, so the results for every crop come back from one scan.
+Use `split_by_crop` to turn the batched frame into {crop: frame}.
+
+    sql, params = TEMPLATES["top_districts_latest"].render(crop="GROUNDNUT")
+    frame = backend.run_sql(sql, params)
+    by_crop = split_by_crop(BATCHED["top_districts_latest"].run(backend, crops=None))
+
+`LEGACY` maps each fixed query in queries.py to its template and parameters.
+Rendering `LEGACY["q6"]` returns the same rows as `QUERIES["q6"]`.
+"""
+import re
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+_LIST_PARAM = re.compile(r"\bIN\s+:(\w+)")
+
+
+@dataclass(frozen=True)
+class QueryTemplate:
+    """SQL with :name parameters; `defaults` fills the optional ones.
+
+    A list-valued parameter used as `IN :name` is expanded to
+    `IN (:name_0, :name_1, ...)`, which every backend understands. In batched
+    templates, `{crop_filter}` becomes `<alias>.crop IN :crops`, or 1=1 when
+    `crops` is None.
+    """
+    name: str
+    sql: str
+    defaults: dict = field(default_factory=dict)
+    batched: bool = False
+    crop_alias: str = "f"
+
+    @property
+    def parameters(self) -> set:
+        return set(re.findall(r"(?<![:\w]):(\w+)", self.sql)) | ({"crops"} if self.batched else set())
+
+    def render(self, **params) -> tuple:
+        """(sql, params) ready for `backend.run_sql`."""
+        params = {**self.defaults, **params}
+        sql = self.sql
+        if self.batched:
+            crops = params.pop("crops", None)
+            if crops is None:
+                sql = sql.replace("{crop_filter}", "1=1")
+            else:
+                sql = sql.replace("{crop_filter}", f"{self.crop_alias}.crop IN :crops")
+                params["crops"] = list(crops)
+        missing = self.parameters - set(params) - {"crops"}
+        if missing:
+            raise ValueError(f"{self.name}: missing parameters {sorted(missing)}")
+
+        def expand(match):
+            values = params.pop(match.group(1))
+            if not values:
+                raise ValueError(f"{self.name}: {match.group(1)} must not be empty")
+            names = [f"{match.group(1)}_{i}" for i in range(len(values))]
+            params.update(zip(names, values))
+            return "IN (" + ", ".join(f":{n}" for n in names) + ")"
+
+        sql = _LIST_PARAM.sub(lambda m: expand(m) if isinstance(params.get(m.group(1)), (list, tuple))
+                              else m.group(0), sql)
+        return sql, params
+
+    def run(self, backend, **params) -> pd.DataFrame:
+        sql, bound = self.render(**params)
+        return backend.run_sql(sql, bound)
+
+
+def split_by_crop(frame: pd.DataFrame) -> dict:
+    """{crop: rows} from a batched result, each with a fresh index and no crop column."""
+    return {crop: part.drop(columns="crop").reset_index(drop=True)
+            for crop, part in frame.groupby("crop", sort=True)}
+
+
+TEMPLATES = {}
+BATCHED = {}
+
+
+def _register(name: str, single: str, batched: str, **defaults) -> None:
+    TEMPLATES[name] = QueryTemplate(name, single, defaults)
+    BATCHED[name] = QueryTemplate(name, batched, defaults, batched=True)
+
+
+# ---- Top N states by production, each year (q1)
+_register("top_states_per_year", """
+WITH prod AS (
+    SELECT f.year, f.state_code, s.state_name, SUM(f.production_1000_t) AS total_production
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    WHERE f.crop = :crop
+    GROUP BY f.year, f.state_code, s.state_name
+),
+ranked AS (
+    SELECT year, state_name, total_production,
+           RANK() OVER (PARTITION BY year ORDER BY total_production DESC) AS rank_in_year
+    FROM prod
+)
+SELECT year, state_name, total_production
+FROM ranked
+WHERE rank_in_year <= :top_n
+ORDER BY year, rank_in_year, state_name
+""", """
+WITH prod AS (
+    SELECT f.crop, f.year, f.state_code, s.state_name, SUM(f.production_1000_t) AS total_production
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    WHERE {crop_filter}
+    GROUP BY f.crop, f.year, f.state_code, s.state_name
+),
+ranked AS (
+    SELECT crop, year, state_name, total_production,
+           RANK() OVER (PARTITION BY crop, year ORDER BY total_production DESC) AS rank_in_year
+    FROM prod
+)
+SELECT crop, year, state_name, total_production
+FROM ranked
+WHERE rank_in_year <= :top_n
+ORDER BY crop, year, rank_in_year, state_name
+""", top_n=3)
+
+# ---- Districts with the largest yield change over the last N years (q2)
+_register("district_yield_change", """
+WITH year_range AS (
+    SELECT MAX(year) AS max_year FROM fact_crop_yearly_long WHERE crop = :crop
+),
+yields AS (
+    SELECT f.dist_code, d.dist_name, f.year, f.yield_kg_ha
+    FROM fact_crop_yearly_long f
+    JOIN dim_district d ON f.dist_code = d.dist_code
+    WHERE f.crop = :crop
+)
+SELECT y1.dist_name, ROUND((y1.yield_kg_ha - y2.yield_kg_ha), 2) AS yield_increase
+FROM yields y1
+JOIN yields y2 ON y1.dist_code = y2.dist_code
+JOIN year_range yr ON 1=1
+WHERE y1.year = yr.max_year AND y2.year = yr.max_year - :years_back
+ORDER BY yield_increase DESC
+LIMIT :limit
+""", """
+WITH year_range AS (
+    SELECT f.crop, MAX(f.year) AS max_year
+    FROM fact_crop_yearly_long f
+    WHERE {crop_filter}
+    GROUP BY f.crop
+),
+yields AS (
+    SELECT f.crop, f.dist_code, d.dist_name, f.year, f.yield_kg_ha
+    FROM fact_crop_yearly_long f
+    JOIN dim_district d ON f.dist_code = d.dist_code
+    JOIN year_range yr ON f.crop = yr.crop
+    WHERE f.year IN (yr.max_year, yr.max_year - :years_back)
+),
+compare AS (
+    SELECT y1.crop, y1.dist_name, ROUND((y1.yield_kg_ha - y2.yield_kg_ha), 2) AS yield_increase
+    FROM yields y1
+    JOIN yields y2 ON y1.crop = y2.crop AND y1.dist_code = y2.dist_code
+    JOIN year_range yr ON y1.crop = yr.crop
+    WHERE y1.year = yr.max_year AND y2.year = yr.max_year - :years_back
+),
+ranked AS (
+    SELECT crop, dist_name, yield_increase,
+           ROW_NUMBER() OVER (PARTITION BY crop ORDER BY yield_increase DESC) AS rn
+    FROM compare
+    WHERE yield_increase IS NOT NULL
+)
+SELECT crop, dist_name, yield_increase
+FROM ranked
+WHERE rn <= :limit
+ORDER BY crop, rn
+""", years_back=5, limit=5)
+
+# ---- States with the highest production growth over the last N years (q3)
+_register("state_growth", """
+WITH year_range AS (
+    SELECT MAX(year) AS max_year FROM fact_crop_yearly_long WHERE crop = :crop
+),
+prod AS (
+    SELECT f.state_code, s.state_name, f.year, SUM(f.production_1000_t) AS total_production
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    WHERE f.crop = :crop
+    GROUP BY f.state_code, s.state_name, f.year
+)
+SELECT p1.state_name, p1.total_production AS latest_prod, p2.total_production AS past_prod,
+       ROUND(((p1.total_production - p2.total_production) / NULLIF(p2.total_production, 0)) * 100, 2)
+           AS growth_rate
+FROM prod p1
+JOIN prod p2 ON p1.state_name = p2.state_name
+JOIN year_range yr ON 1=1
+WHERE p1.year = yr.max_year AND p2.year = yr.max_year - :years_back
+ORDER BY growth_rate DESC
+LIMIT :limit
+""", """
+WITH year_range AS (
+    SELECT f.crop, MAX(f.year) AS max_year
+    FROM fact_crop_yearly_long f
+    WHERE {crop_filter}
+    GROUP BY f.crop
+),
+prod AS (
+    SELECT f.crop, f.state_code, s.state_name, f.year, SUM(f.production_1000_t) AS total_production
+    FROM fact_crop_yearly_long f
+    JOIN dim_state s ON f.state_code = s.state_code
+    JOIN year_range yr ON f.crop = yr.crop
+    WHERE f.year IN (yr.max_year, yr.max_year - :years_back)
+    GROUP BY f.crop, f.state_code, s.state_name, f.year
+),
+compare AS (
+    SELECT p1.crop, p1.state_name, p1.total_production AS latest_prod, p2.total_production AS past_prod,
+           ROUND(((p1.total_production - p2.total_production) / NULLIF(p2.total_production, 0)) * 100, 2)
+               AS growth_rate
+    FROM prod p1
+    JOIN prod p2 ON p1.crop = p2.crop AND p1.state_name = p2.state_name
+    JOIN year_range yr ON p1.crop = yr.crop
+    WHERE p1.year = yr.max_year AND p2.year = yr.max_year - :years_back
+),
+ranked AS (
+    SELECT compare.*, ROW_NUMBER() OVER (PARTITION BY crop ORDER BY growth_rate DESC) AS rn
+    FROM compare
+    WHERE growth_rate IS NOT NULL
+)
+SELECT crop, state_name, latest_prod, past_prod, growth_rate
+FROM ranked
+WHERE rn <= :limit
+ORDER BY crop, rn
+""", years_back=5, limit=5)
+
+# ---- Yearly production in the top N producing states (q5)
+_register("top_states_yearly", """
+WITH totals AS (
+    SELECT f.state_code, SUM(f.production_1000_t) AS total_production
+    FROM fact_crop_yearly_long f
+    WHERE f.crop = :crop
+    GROUP BY f.state_code
+    ORDER BY total_production DESC
+    LIMIT :top_n
+)
+SELECT f.year, s.state_name, SUM(f.production_1000_t) AS yearly_production
+FROM fact_crop_yearly_long f
+JOIN dim_state s ON f.state_code = s.state_code
+JOIN totals t ON f.state_code = t.state_code
+WHERE f.crop = :crop
+GROUP BY f.year, f.state_code, s.state_name
+ORDER BY s.state_name, f.year
+""", """
+WITH yearly AS (
+    SELECT f.crop, f.year, f.state_code, SUM(f.production_1000_t) AS yearly_production
+    FROM fact_crop_yearly_long f
+    WHERE {crop_filter}
+    GROUP BY f.crop, f.year, f.state_code
+),
+ranked AS (
+    SELECT crop, state_code,
+           ROW_NUMBER() OVER (PARTITION BY crop ORDER BY SUM(yearly_production) DESC) AS rn
+    FROM yearly
+    GROUP BY crop, state_code
+)
+SELECT y.crop, y.year, s.state_name, y.yearly_production
+FROM yearly y
+JOIN ranked r ON y.crop = r.crop AND y.state_code = r.state_code
+JOIN dim_state s ON y.state_code = s.state_code
+WHERE r.rn <= :top_n
+ORDER BY y.crop, s.state_name, y.year
+""", top_n=5)
+
+# ---- Top districts by production in the crop's latest year (q6)
+_register("top_districts_latest", """
+WITH latest_year AS (
+    SELECT MAX(year) AS max_year FROM fact_crop_yearly_long WHERE crop = :crop
+)
+SELECT d.dist_name, SUM(f.production_1000_t) AS production_latest
+FROM fact_crop_yearly_long f
+JOIN dim_district d ON f.dist_code = d.dist_code
+JOIN latest_year y ON f.year = y.max_year
+WHERE f.crop = :crop
+GROUP BY d.dist_name
+ORDER BY production_latest DESC
+LIMIT :limit
+""", """
+WITH latest_year AS (
+    SELECT f.crop, MAX(f.year) AS max_year
+    FROM fact_crop_yearly_long f
+    WHERE {crop_filter}
+    GROUP BY f.crop
+),
+latest AS (
+    SELECT f.crop, d.dist_name, SUM(f.production_1000_t) AS production_latest
+    FROM fact_crop_yearly_long f
+    JOIN dim_district d ON f.dist_code = d.dist_code
+    JOIN latest_year y ON f.crop = y.crop AND f.year = y.max_year
+    GROUP BY f.crop, d.dist_name
+),
+ranked AS (
+    SELECT crop, dist_name, production_latest,
+           ROW_NUMBER() OVER (PARTITION BY crop ORDER BY production_latest DESC) AS rn
+    FROM latest
+    WHERE production_latest IS NOT NULL
+)
+SELECT crop, dist_name, production_latest
+FROM ranked
+WHERE rn <= :limit
+ORDER BY crop, rn
+""", limit=5)
+
+# ---- Annual area-weighted average yield across all districts (q7)
+_register("yearly_avg_yield", """
+SELECT f.year,
+       ROUND(SUM(f.yield_kg_ha * f.area_1000_ha)
+             / NULLIF(SUM(CASE WHEN f.yield_kg_ha IS NOT NULL THEN f.area_1000_ha END), 0), 2) AS avg_yield
+FROM fact_crop_yearly_long f
+WHERE f.crop = :crop
+GROUP BY f.year
+ORDER BY f.year
+""", """
+SELECT f.crop, f.year,
+       ROUND(SUM(f.yield_kg_ha * f.area_1000_ha)
+             / NULLIF(SUM(CASE WHEN f.yield_kg_ha IS NOT NULL THEN f.area_1000_ha END), 0), 2) AS avg_yield
+FROM fact_crop_yearly_long f
+WHERE {crop_filter}
+GROUP BY f.crop, f.year
+ORDER BY f.crop, f.year
+""")
+
+# ---- Total cultivated area per state (q8)
+_register("state_area", """
+SELECT s.state_name, ROUND(SUM(f.area_1000_ha), 2) AS total_area
+FROM fact_crop_yearly_long f
+JOIN dim_state s ON f.state_code = s.state_code
+WHERE f.crop = :crop
+GROUP BY s.state_name
+ORDER BY total_area DESC
+""", """
+SELECT f.crop, s.state_name, ROUND(SUM(f.area_1000_ha), 2) AS total_area
+FROM fact_crop_yearly_long f
+JOIN dim_state s ON f.state_code = s.state_code
+WHERE {crop_filter}
+GROUP BY f.crop, s.state_name
+ORDER BY f.crop, total_area DESC
+""")
+
+# ---- Districts with the highest single-year yield (q9)
+_register("top_district_max_yield", """
+SELECT d.dist_name, ROUND(MAX(f.yield_kg_ha), 2) AS max_yield
+FROM fact_crop_yearly_long f
+JOIN dim_district d ON f.dist_code = d.dist_code
+WHERE f.crop = :crop
+GROUP BY d.dist_name
+ORDER BY max_yield DESC
+LIMIT :limit
+""", """
+WITH best AS (
+    SELECT f.crop, d.dist_name, ROUND(MAX(f.yield_kg_ha), 2) AS max_yield
+    FROM fact_crop_yearly_long f
+    JOIN dim_district d ON f.dist_code = d.dist_code
+    WHERE {crop_filter}
+    GROUP BY f.crop, d.dist_name
+),
+ranked AS (
+    SELECT crop, dist_name, max_yield,
+           ROW_NUMBER() OVER (PARTITION BY crop ORDER BY max_yield DESC) AS rn
+    FROM best
+    WHERE max_yield IS NOT NULL
+)
+SELECT crop, dist_name, max_yield
+FROM ranked
+WHERE rn <= :limit
+ORDER BY crop, rn
+""", limit=10)
+
+# Fixed queries in queries.py -> (template, parameters); column names differ
+# only in the crop-specific aliases (total_rice_production -> total_production)
+LEGACY = {
+    "q1": ("top_states_per_year", {"crop": "RICE"}),
+    "q2": ("district_yield_change", {"crop": "WHEAT"}),
+    "q3": ("state_growth", {"crop": "OILSEEDS"}),
+    "q5": ("top_states_yearly", {"crop": "COTTON"}),
+    "q6": ("top_districts_latest", {"crop": "GROUNDNUT"}),
+    "q7": ("yearly_avg_yield", {"crop": "MAIZE"}),
+    "q8": ("state_area", {"crop": "OILSEEDS"}),
+    "q9": ("top_district_max_yield", {"crop": "RICE"}),
+}
+
+
+def render_legacy(name: str, **overrides) -> tuple:
+    """(sql, params) of the template behind fixed query `name`, e.g. render_legacy("q6", crop="MAIZE")."""
+    template, params = LEGACY[name]
+    return TEMPLATES[template].render(**{**params, **overrides})
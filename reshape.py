@@ -0,0 +1,125 @@
+"""Wide-to-long reshape of the district-level workbook.
+
+Crop headers such as "RICE AREA (1000 ha)" are parsed once into a
+crop -> {metric: column} map, and the long fact table (one row per district,
+year and crop) is assembled directly from NumPy blocks. This replaces the
+melt + regex + pivot_table chain, which did per-cell string work and silently
+averaged duplicate keys.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from compact import code_dtype
+
+ID_COLUMNS = ["Dist Code", "Year", "State Code"]
+METRICS = ("AREA", "PRODUCTION", "YIELD")
+
+_HEADER_RE = re.compile(r"^(?P<crop>.+?)\s+(?P<metric>AREA|PRODUCTION|YIELD)\b")
+
+
+def parse_crop_columns(columns) -> dict:
+    """Map each crop name to {metric: column header}.
+
+    Columns that are not crop metrics (codes, `State Name`, `Dist Name`) are
+    skipped. Two headers resolving to the same crop and metric raise ValueError.
+    """
+    crops = {}
+    for col in columns:
+        if col in ID_COLUMNS:
+            continue
+        match = _HEADER_RE.match(str(col))
+        if match is None:
+            continue
+        crop, metric = match.group("crop").strip(), match.group("metric")
+        slots = crops.setdefault(crop, {})
+        if metric in slots:
+            raise ValueError(f"duplicate header for {crop} {metric}: {slots[metric]!r} and {col!r}")
+        slots[metric] = col
+    return crops
+
+
+def _check_unique_keys(df: pd.DataFrame) -> None:
+    dup = df.duplicated(ID_COLUMNS, keep=False)
+    if dup.any():
+        sample = df.loc[dup, ID_COLUMNS].drop_duplicates().head(5).to_dict("records")
+        raise ValueError(f"{int(dup.sum())} rows share a (Dist Code, Year, State Code) key, e.g. {sample}")
+
+
+def build_fact_table(df: pd.DataFrame, crop_columns: dict = None, compact: bool = False) -> pd.DataFrame:
+    """Reshape the wide frame into Dist Code/Year/State Code/Crop + AREA/PRODUCTION/YIELD.
+
+    Output matches the old `pivot_table` result: rows sorted by the key columns
+    and rows whose three metrics are all missing dropped. With `compact=True`
+    the table is built directly in the compact layout from compact.py
+    (categorical crop, int16 codes and years, float32 metrics), so no
+    full-width float64/object intermediate is ever allocated.
+    """
+    if crop_columns is None:
+        crop_columns = parse_crop_columns(df.columns)
+    df = df[df[ID_COLUMNS].notna().all(axis=1)]
+    _check_unique_keys(df)
+
+    # Sort the wide rows once; with crops in name order the long layout
+    # (row-major over district-year x crop) then comes out already sorted.
+    order = np.lexsort([df[c].to_numpy() for c in reversed(ID_COLUMNS)])
+    crops = sorted(crop_columns)
+    n_rows, n_crops = len(df), len(crops)
+
+    value_dtype = np.float32 if compact else np.float64
+    values = {}
+    for metric in METRICS:
+        block = np.full((n_rows, n_crops), np.nan, dtype=value_dtype)
+        for j, crop in enumerate(crops):
+            col = crop_columns[crop].get(metric)
+            if col is not None:
+                block[:, j] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)[order]
+        values[metric] = block.reshape(-1)
+
+    present = ~(np.isnan(values["AREA"]) & np.isnan(values["PRODUCTION"]) & np.isnan(values["YIELD"]))
+
+    long = {}
+    for c in ID_COLUMNS:
+        keys = df[c].to_numpy()[order]
+        if compact:
+            keys = keys.astype(code_dtype(keys))
+        long[c] = np.repeat(keys, n_crops)[present]
+    if compact:
+        crop_codes = np.tile(np.arange(n_crops, dtype=np.int16), n_rows)[present]
+        long["Crop"] = pd.Categorical.from_codes(crop_codes, categories=crops)
+    else:
+        long["Crop"] = np.tile(np.asarray(crops, dtype=object), n_rows)[present]
+    for metric in METRICS:
+        # Drop each full-size block as soon as its filtered copy exists
+        long[metric] = values.pop(metric)[present]
+    return pd.DataFrame(long)
+
+
+# Column names used by the SQL tables (see schema.py)
+SQL_NAMES = {
+    "State Code": "state_code",
+    "State Name": "state_name",
+    "Dist Code": "dist_code",
+    "Dist Name": "dist_name",
+    "Year": "year",
+    "Crop": "crop",
+    "AREA": "Area_1000_ha",
+    "PRODUCTION": "Production_1000_t",
+    "YIELD": "Yield_kg_ha",
+}
+
+
+def build_star_schema(df: pd.DataFrame, compact: bool = True) -> tuple:
+    """(dim_state, dim_district, fact) from the wide frame, with SQL column names.
+
+    With `compact=True` the fact metrics are float32; the SQL backends and the
+    bulk loader widen them back to float64 at the source precision
+    (`compact.widen_metrics`) before they are queried or stored.
+    """
+    dim_state = df[["State Code", "State Name"]].drop_duplicates()
+    dim_district = df[["Dist Code", "Dist Name", "State Code"]].drop_duplicates()
+    fact = build_fact_table(df, compact=compact)
+    return (dim_state.rename(columns=SQL_NAMES),
+            dim_district.rename(columns=SQL_NAMES),
+            fact.rename(columns=SQL_NAMES))
@@ -0,0 +1,117 @@
+"""Versioned two-tier result cache around a query backend.
+
+A result is keyed by the normalized SQL text, the bound parameters and a data
+version stamp. For a database this is `schema.cache_version`: the database URL,
+the random database_id written when its schema was created, and the
+data_version that every load bumps. So a reload invalidates old entries without
+any explicit purge, and another `--db`, or a deleted and recreated database,
+never picks up results cached for a different one from the shared disk tier.
+Results live in an in-memory LRU tier and an on-disk Arrow IPC tier. The disk
+tier is evicted oldest-first once it grows past its byte budget.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+DEFAULT_RESULT_DIR = ".agri_cache/results"
+
+
+def normalize_sql(q: str) -> str:
+    return re.sub(r"\s+", " ", q).strip().rstrip(";").strip()
+
+
+def cache_key(q: str, params: dict = None, version=None) -> str:
+    payload = json.dumps([normalize_sql(q), params or {}, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Wraps a backend's `run_sql` with memory and disk caching.
+
+    `version` is either a fixed stamp or a zero-argument callable returning the
+    current one (for example `lambda: schema.cache_version(engine)`).
+    """
+
+    def __init__(self, backend, version, cache_dir=DEFAULT_RESULT_DIR,
+                 max_entries: int = 64, max_disk_bytes: int = 256 * 1024 * 1024):
+        self.backend = backend
+        self.version = version
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                      "memory_evictions": 0, "disk_evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        return self.version() if callable(self.version) else self.version
+
+    def _remember(self, key: str, frame: pd.DataFrame) -> None:
+        with self._lock:
+            self._memory[key] = frame
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.stats["memory_evictions"] += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.arrow"
+
+    def _write_disk(self, key: str, frame: pd.DataFrame) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._disk_path(key)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        feather.write_feather(frame.reset_index(drop=True), tmp)
+        os.replace(tmp, path)
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        with self._lock:
+            files = sorted(self.cache_dir.glob("*.arrow"), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in files)
+            for path in files:
+                if total <= self.max_disk_bytes:
+                    break
+                total -= path.stat().st_size
+                path.unlink(missing_ok=True)
+                self.stats["disk_evictions"] += 1
+
+    def run_sql(self, q: str, params: dict = None) -> pd.DataFrame:
+        key = cache_key(q, params, self._current_version())
+
+        with self._lock:
+            frame = self._memory.get(key)
+            if frame is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return frame.copy()
+
+        path = self._disk_path(key)
+        if path.exists():
+            frame = feather.read_feather(path)
+            path.touch()  # mark as recently used for disk eviction
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            self._remember(key, frame)
+            return frame.copy()
+
+        frame = self.backend.run_sql(q, params)
+        with self._lock:
+            self.stats["misses"] += 1
+        self._remember(key, frame)
+        self._write_disk(key, frame)
+        return frame.copy()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            for path in self.cache_dir.glob("*.arrow"):
+                path.unlink(missing_ok=True)
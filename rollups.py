@@ -0,0 +1,314 @@
+"""Materialized state x year x crop and india x year x crop rollups.
+
+Each rollup row holds the area and production sums, the plain yield sum/count
+(so AVG(yield) can be reproduced exactly) and the area-weighted yield. The
+rollups are refreshed incrementally: only the (state_code, year, crop_id) keys
+touched by a load are recomputed from the fact table, and the national rollup
+is then rebuilt for the affected (year, crop_id) pairs from the state rollup.
+The touched keys go into keyed temporary tables, so each rollup row is matched
+by a primary-key lookup. When a load touches a large share of the rollup
+(`FULL_REFRESH_SHARE`, e.g. a reload of the whole workbook), one full rebuild
+is cheaper than deleting and re-inserting most rows key by key.
+
+`route(name)` returns SQL that answers q1, q3, q5, q7, q8 and q10 from the
+rollups (cost ~ states x years) and falls back to the fact-table SQL otherwise.
+"""
+from sqlalchemy import Column, Float, Integer, MetaData, SmallInteger, Table, text
+
+from queries import QUERIES
+
+metadata = MetaData()
+
+
+def _rollup_columns():
+    return [
+        Column("area_1000_ha", Float),
+        Column("production_1000_t", Float),
+        Column("yield_sum", Float),
+        Column("yield_count", Integer, nullable=False),
+        Column("weighted_yield_sum", Float),
+        Column("weight_area", Float),
+        Column("yield_kg_ha_weighted", Float),
+    ]
+
+
+state_rollup_table = Table(
+    "agg_state_year_crop", metadata,
+    Column("state_code", SmallInteger, primary_key=True, autoincrement=False),
+    Column("year", SmallInteger, primary_key=True, autoincrement=False),
+    Column("crop_id", SmallInteger, primary_key=True, autoincrement=False),
+    *_rollup_columns(),
+)
+
+india_rollup_table = Table(
+    "agg_india_year_crop", metadata,
+    Column("year", SmallInteger, primary_key=True, autoincrement=False),
+    Column("crop_id", SmallInteger, primary_key=True, autoincrement=False),
+    *_rollup_columns(),
+)
+
+# Touched keys as a share of the state rollup above which a full rebuild is used
+FULL_REFRESH_SHARE = 0.25
+
+_KEYS_TABLE = "tmp_rollup_keys"
+_PAIRS_TABLE = "tmp_rollup_pairs"
+
+_STATE_SELECT = """
+SELECT f.state_code, f.year, f.crop_id,
+       SUM(f.Area_1000_ha),
+       SUM(f.Production_1000_t),
+       SUM(f.Yield_kg_ha),
+       COUNT(f.Yield_kg_ha),
+       SUM(f.Yield_kg_ha * f.Area_1000_ha),
+       SUM(CASE WHEN f.Yield_kg_ha IS NOT NULL THEN f.Area_1000_ha END),
+       SUM(f.Yield_kg_ha * f.Area_1000_ha)
+           / NULLIF(SUM(CASE WHEN f.Yield_kg_ha IS NOT NULL THEN f.Area_1000_ha END), 0)
+FROM fact_crop_yearly f
+{join}
+GROUP BY f.state_code, f.year, f.crop_id
+"""
+
+_INDIA_SELECT = """
+SELECT r.year, r.crop_id,
+       SUM(r.area_1000_ha),
+       SUM(r.production_1000_t),
+       SUM(r.yield_sum),
+       SUM(r.yield_count),
+       SUM(r.weighted_yield_sum),
+       SUM(r.weight_area),
+       SUM(r.weighted_yield_sum) / NULLIF(SUM(r.weight_area), 0)
+FROM agg_state_year_crop r
+{join}
+GROUP BY r.year, r.crop_id
+"""
+
+_VALUE_COLUMNS = ("area_1000_ha, production_1000_t, yield_sum, yield_count, "
+                  "weighted_yield_sum, weight_area, yield_kg_ha_weighted")
+
+
+def create_rollups(engine) -> None:
+    metadata.create_all(engine)
+
+
+def refresh_rollups(engine, keys=None) -> None:
+    """Recompute the rollups for `keys`, or rebuild them fully when keys is None.
+
+    `keys` is an iterable of (state_code, year, crop_id) tuples, typically the
+    distinct keys of the fact rows just written. More than FULL_REFRESH_SHARE
+    of the existing state rollup rows (or an empty rollup) means a full rebuild.
+    """
+    create_rollups(engine)
+    if keys is not None:
+        keys = set(keys)
+    with engine.begin() as conn:
+        if keys is not None and keys:
+            existing = conn.execute(text("SELECT COUNT(*) FROM agg_state_year_crop")).scalar()
+            if len(keys) > FULL_REFRESH_SHARE * existing:
+                keys = None
+        if keys is None:
+            conn.execute(text("DELETE FROM agg_state_year_crop"))
+            conn.execute(text("DELETE FROM agg_india_year_crop"))
+            conn.execute(text(f"INSERT INTO agg_state_year_crop (state_code, year, crop_id, {_VALUE_COLUMNS}) "
+                              + _STATE_SELECT.format(join="")))
+            conn.execute(text(f"INSERT INTO agg_india_year_crop (year, crop_id, {_VALUE_COLUMNS}) "
+                              + _INDIA_SELECT.format(join="")))
+            return
+
+        rows = [{"state_code": int(s), "year": int(y), "crop_id": int(c)} for s, y, c in keys]
+        if not rows:
+            return
+        pairs = [{"year": y, "crop_id": c} for y, c in {(r["year"], r["crop_id"]) for r in rows}]
+        conn.execute(text(f"CREATE TEMPORARY TABLE {_KEYS_TABLE} "
+                          f"(state_code SMALLINT, year SMALLINT, crop_id SMALLINT, "
+                          f"PRIMARY KEY (state_code, year, crop_id))"))
+        conn.execute(text(f"CREATE TEMPORARY TABLE {_PAIRS_TABLE} "
+                          f"(year SMALLINT, crop_id SMALLINT, PRIMARY KEY (year, crop_id))"))
+        try:
+            conn.execute(text(f"INSERT INTO {_KEYS_TABLE} VALUES (:state_code, :year, :crop_id)"), rows)
+            conn.execute(text(f"INSERT INTO {_PAIRS_TABLE} VALUES (:year, :crop_id)"), pairs)
+            conn.execute(text(f"""
+                DELETE FROM agg_state_year_crop WHERE EXISTS (
+                    SELECT 1 FROM {_KEYS_TABLE} k
+                    WHERE k.state_code = agg_state_year_crop.state_code
+                      AND k.year = agg_state_year_crop.year
+                      AND k.crop_id = agg_state_year_crop.crop_id)
+            """))
+            conn.execute(text(
+                f"INSERT INTO agg_state_year_crop (state_code, year, crop_id, {_VALUE_COLUMNS}) "
+                + _STATE_SELECT.format(join=f"JOIN {_KEYS_TABLE} k ON k.state_code = f.state_code "
+                                            f"AND k.year = f.year AND k.crop_id = f.crop_id")
+            ))
+
+            # National rows for the touched (year, crop_id) pairs, rebuilt from the state rollup
+            conn.execute(text(f"""
+                DELETE FROM agg_india_year_crop WHERE EXISTS (
+                    SELECT 1 FROM {_PAIRS_TABLE} k
+                    WHERE k.year = agg_india_year_crop.year
+                      AND k.crop_id = agg_india_year_crop.crop_id)
+            """))
+            conn.execute(text(
+                f"INSERT INTO agg_india_year_crop (year, crop_id, {_VALUE_COLUMNS}) "
+                + _INDIA_SELECT.format(join=f"JOIN {_PAIRS_TABLE} k ON k.year = r.year AND k.crop_id = r.crop_id")
+            ))
+        finally:
+            conn.execute(text(f"DROP TABLE {_KEYS_TABLE}"))
+            conn.execute(text(f"DROP TABLE {_PAIRS_TABLE}"))
+
+
+# ---- Rollup-backed versions of the state/national analyses (same output columns)
+ROLLUP_QUERIES = {}
+
+ROLLUP_QUERIES["q1"] = """
+WITH rice_prod AS (
+    SELECT
+        r.year,
+        r.state_code,
+        s.state_name,
+        r.production_1000_t AS total_rice_production
+    FROM agg_state_year_crop r
+    JOIN dim_crop c ON c.crop_id = r.crop_id
+    JOIN dim_state s ON r.state_code = s.state_code
+    WHERE c.crop = 'RICE'
+),
+ranked AS (
+    SELECT
+        year,
+        state_name,
+        total_rice_production,
+        RANK() OVER (PARTITION BY year ORDER BY total_rice_production DESC) AS rank_in_year
+    FROM rice_prod
+)
+SELECT year, state_name, total_rice_production
+FROM ranked
+WHERE rank_in_year <= 3
+ORDER BY year, rank_in_year, state_name;
+"""
+
+ROLLUP_QUERIES["q3"] = """
+WITH year_range AS (
+    SELECT MAX(n.year) AS max_year
+    FROM agg_india_year_crop n
+    JOIN dim_crop c ON c.crop_id = n.crop_id
+    WHERE c.crop = 'OILSEEDS'
+),
+oilseed_data AS (
+    SELECT
+        r.state_code,
+        s.state_name,
+        r.year,
+        r.production_1000_t AS total_production
+    FROM agg_state_year_crop r
+    JOIN dim_crop c ON c.crop_id = r.crop_id
+    JOIN dim_state s ON r.state_code = s.state_code
+    WHERE c.crop = 'OILSEEDS'
+),
+compare AS (
+    SELECT
+        o1.state_name,
+        o1.total_production AS latest_prod,
+        o2.total_production AS past_prod,
+        ROUND(((o1.total_production - o2.total_production) / NULLIF(o2.total_production,0)) * 100, 2) AS growth_rate
+    FROM oilseed_data o1
+    JOIN oilseed_data o2 ON o1.state_name = o2.state_name
+    JOIN year_range yr ON 1=1
+    WHERE o1.year = yr.max_year
+      AND o2.year = yr.max_year - 5
+)
+SELECT state_name, latest_prod, past_prod, growth_rate
+FROM compare
+ORDER BY growth_rate DESC
+LIMIT 5;
+"""
+
+ROLLUP_QUERIES["q5"] = """
+WITH cotton_yearly AS (
+    SELECT
+        r.year,
+        r.state_code,
+        s.state_name,
+        r.production_1000_t AS yearly_production
+    FROM agg_state_year_crop r
+    JOIN dim_crop c ON c.crop_id = r.crop_id
+    JOIN dim_state s ON r.state_code = s.state_code
+    WHERE c.crop = 'COTTON'
+),
+total_cotton AS (
+    SELECT
+        state_code,
+        SUM(yearly_production) AS total_cotton_production
+    FROM cotton_yearly
+    GROUP BY state_code
+    ORDER BY total_cotton_production DESC
+    LIMIT 5
+)
+SELECT
+    c.year,
+    c.state_name,
+    c.yearly_production
+FROM cotton_yearly c
+JOIN total_cotton t ON c.state_code = t.state_code
+ORDER BY c.state_name, c.year;
+"""
+
+ROLLUP_QUERIES["q7"] = """
+SELECT
+    n.year,
+    ROUND(n.yield_kg_ha_weighted, 2) AS avg_maize_yield
+FROM agg_india_year_crop n
+JOIN dim_crop c ON c.crop_id = n.crop_id
+WHERE c.crop = 'MAIZE'
+ORDER BY n.year;
+"""
+
+ROLLUP_QUERIES["q8"] = """
+SELECT
+    s.state_name,
+    ROUND(SUM(r.area_1000_ha), 2) AS total_oilseeds_area
+FROM agg_state_year_crop r
+JOIN dim_crop c ON c.crop_id = r.crop_id
+JOIN dim_state s ON r.state_code = s.state_code
+WHERE c.crop = 'OILSEEDS'
+GROUP BY s.state_name
+ORDER BY total_oilseeds_area DESC;
+"""
+
+ROLLUP_QUERIES["q10"] = """
+WITH top_states AS (
+    SELECT
+        s.state_name,
+        SUM(r.production_1000_t) AS total_prod
+    FROM agg_state_year_crop r
+    JOIN dim_crop c ON c.crop_id = r.crop_id
+    JOIN dim_state s ON r.state_code = s.state_code
+    WHERE c.crop IN ('WHEAT', 'RICE')
+    GROUP BY s.state_name
+    ORDER BY total_prod DESC
+    LIMIT 5
+),
+latest_10_years AS (
+    SELECT DISTINCT year
+    FROM agg_india_year_crop
+    ORDER BY year DESC
+    LIMIT 10
+)
+SELECT
+    r.year,
+    s.state_name,
+    c.crop,
+    ROUND(SUM(r.production_1000_t), 2) AS production
+FROM agg_state_year_crop r
+JOIN dim_crop c ON c.crop_id = r.crop_id
+JOIN dim_state s ON r.state_code = s.state_code
+JOIN top_states t ON t.state_name = s.state_name
+JOIN latest_10_years y ON r.year = y.year
+WHERE c.crop IN ('WHEAT', 'RICE')
+GROUP BY r.year, s.state_name, c.crop
+ORDER BY r.year, s.state_name, c.crop;
+"""
+
+
+def route(name: str, use_rollups: bool = True) -> str:
+    """SQL for analysis `name`, answered from the rollups where one exists."""
+    if use_rollups and name in ROLLUP_QUERIES:
+        return ROLLUP_QUERIES[name]
+    return QUERIES[name]
@@ -0,0 +1,252 @@
+"""Physical schema for the agriculture database.
+
+Crops get small integer surrogate keys in `dim_crop`. The fact rows live in
+`fact_crop_yearly`, which uses narrow numeric types and composite indexes that
+match how q1..q10 read it: filter on crop, then group by year with state, or by
+district with year. `fact_crop_yearly_long` is a view that joins the crop name
+back in, so the existing SQL still runs without changes.
+
+`migrate_legacy_tables` converts a database that was loaded with the old
+`to_sql(..., if_exists="append")` calls. `check_index_usage` runs EXPLAIN for
+each query and reports the ones that still full-scan the fact table.
+"""
+import secrets
+
+from sqlalchemy import (BigInteger, Column, DateTime, Float, Index, Integer, MetaData,
+                        SmallInteger, String, Table, inspect, text)
+
+from rollups import refresh_rollups
+
+metadata = MetaData()
+
+dim_state_table = Table(
+    "dim_state", metadata,
+    Column("state_code", SmallInteger, primary_key=True, autoincrement=False),
+    Column("state_name", String(64), nullable=False),
+)
+
+dim_district_table = Table(
+    "dim_district", metadata,
+    Column("dist_code", SmallInteger, primary_key=True, autoincrement=False),
+    Column("dist_name", String(64), nullable=False),
+    Column("state_code", SmallInteger, nullable=False),
+    Index("ix_dim_district_state", "state_code"),
+)
+
+dim_crop_table = Table(
+    "dim_crop", metadata,
+    Column("crop_id", SmallInteger, primary_key=True, autoincrement=False),
+    Column("crop", String(64), nullable=False, unique=True),
+)
+
+fact_table = Table(
+    "fact_crop_yearly", metadata,
+    Column("dist_code", SmallInteger, primary_key=True, autoincrement=False),
+    Column("year", SmallInteger, primary_key=True, autoincrement=False),
+    Column("crop_id", SmallInteger, primary_key=True, autoincrement=False),
+    Column("state_code", SmallInteger, nullable=False),
+    Column("Area_1000_ha", Float),
+    Column("Production_1000_t", Float),
+    Column("Yield_kg_ha", Float),
+    # state x year rollups per crop (q1, q3, q5, q7, q8, q10)
+    Index("ix_fact_crop_year_state", "crop_id", "year", "state_code"),
+    # district drill-downs per crop (q2, q4, q6, q9)
+    Index("ix_fact_crop_dist_year", "crop_id", "dist_code", "year"),
+    # crop-independent year lookups (latest years in q10)
+    Index("ix_fact_year", "year"),
+)
+
+# Bookkeeping; data_version is bumped by every write so result caches can tell
+# whether the data changed since a result was computed. database_id is a random
+# stamp written when the schema is created, so a recreated database (whose
+# data_version starts over at 1) never matches results cached for the old one
+meta_table = Table(
+    "agri_meta", metadata,
+    Column("name", String(32), primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+
+# Incremental ingest bookkeeping: a content hash per (dist_code, year) slice of
+# the workbook as of the last load, and one manifest row per load
+slice_hash_table = Table(
+    "ingest_slice_hash", metadata,
+    Column("dist_code", SmallInteger, primary_key=True, autoincrement=False),
+    Column("year", SmallInteger, primary_key=True, autoincrement=False),
+    Column("row_hash", BigInteger, nullable=False),
+)
+
+load_manifest_table = Table(
+    "load_manifest", metadata,
+    Column("load_id", Integer, primary_key=True, autoincrement=True),
+    Column("loaded_at", DateTime, nullable=False),
+    Column("source", String(255)),
+    Column("source_fingerprint", String(64)),
+    Column("slices_new", Integer, nullable=False),
+    Column("slices_changed", Integer, nullable=False),
+    Column("slices_removed", Integer, nullable=False),
+    Column("fact_rows", Integer, nullable=False),
+    Column("seconds", Float),
+)
+
+FACT_VIEW = "fact_crop_yearly_long"
+
+# No table aliases, so EXPLAIN output names the physical tables
+FACT_VIEW_SQL = f"""
+CREATE VIEW {FACT_VIEW} AS
+SELECT
+    fact_crop_yearly.dist_code,
+    fact_crop_yearly.year,
+    fact_crop_yearly.state_code,
+    dim_crop.crop,
+    fact_crop_yearly.Area_1000_ha,
+    fact_crop_yearly.Production_1000_t,
+    fact_crop_yearly.Yield_kg_ha
+FROM fact_crop_yearly
+JOIN dim_crop ON dim_crop.crop_id = fact_crop_yearly.crop_id
+"""
+
+LEGACY_SUFFIX = "_legacy"
+
+
+def _is_base_table(engine, name: str) -> bool:
+    return name in inspect(engine).get_table_names()
+
+
+def create_schema(engine) -> None:
+    """Create the tables, indexes and the fact view if they do not exist yet."""
+    if _is_base_table(engine, FACT_VIEW):
+        raise RuntimeError(
+            f"{FACT_VIEW} is still a plain table; run schema.migrate_legacy_tables(engine) first"
+        )
+    for table in (dim_state_table, dim_district_table):
+        if _is_base_table(engine, table.name) and not inspect(engine).get_pk_constraint(table.name)["constrained_columns"]:
+            raise RuntimeError(
+                f"{table.name} has no primary key; run schema.migrate_legacy_tables(engine) first"
+            )
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        if FACT_VIEW not in inspect(conn).get_view_names():
+            conn.execute(text(FACT_VIEW_SQL))
+        if conn.execute(text("SELECT value FROM agri_meta WHERE name = 'database_id'")).scalar() is None:
+            conn.execute(meta_table.insert(), {"name": "database_id", "value": secrets.randbits(31)})
+
+
+def crop_ids(engine, crops) -> dict:
+    """Return {crop: crop_id}, inserting ids for crops not yet in dim_crop.
+
+    Existing ids are never renumbered, so reloads keep fact rows stable.
+    """
+    with engine.begin() as conn:
+        known = dict(conn.execute(text("SELECT crop, crop_id FROM dim_crop")).all())
+        next_id = max(known.values(), default=0) + 1
+        new = []
+        for crop in sorted(set(crops) - set(known)):
+            known[crop] = next_id
+            new.append({"crop_id": next_id, "crop": crop})
+            next_id += 1
+        if new:
+            conn.execute(dim_crop_table.insert(), new)
+    return known
+
+
+def bump_data_version(conn) -> None:
+    """Increment the data version; call inside the transaction that wrote the data."""
+    updated = conn.execute(text("UPDATE agri_meta SET value = value + 1 WHERE name = 'data_version'"))
+    if updated.rowcount == 0:
+        conn.execute(meta_table.insert(), {"name": "data_version", "value": 1})
+
+
+def data_version(engine) -> int:
+    with engine.connect() as conn:
+        value = conn.execute(text("SELECT value FROM agri_meta WHERE name = 'data_version'")).scalar()
+    return value or 0
+
+
+def cache_version(engine) -> tuple:
+    """(database URL, database_id, data_version): the result-cache stamp for `engine`.
+
+    The URL (without password) and the random database_id keep results of a
+    different or recreated database apart; data_version tracks reloads.
+    """
+    with engine.connect() as conn:
+        meta = dict(conn.execute(text("SELECT name, value FROM agri_meta "
+                                      "WHERE name IN ('database_id', 'data_version')")).all())
+    return (engine.url.render_as_string(hide_password=True), meta.get("database_id"),
+            meta.get("data_version", 0))
+
+
+def migrate_legacy_tables(engine) -> None:
+    """Move tables created by plain `to_sql` appends onto the keyed schema.
+
+    The old tables are renamed with a `_legacy` suffix and kept as a backup.
+    Duplicate rows left behind by repeated appends are collapsed, and the
+    rollups are rebuilt from the migrated fact table.
+    """
+    legacy = {}
+    with engine.begin() as conn:
+        for name in ("dim_state", "dim_district", FACT_VIEW):
+            if not _is_base_table(engine, name):
+                continue
+            if name != FACT_VIEW and inspect(engine).get_pk_constraint(name)["constrained_columns"]:
+                continue
+            conn.execute(text(f"ALTER TABLE {name} RENAME TO {name}{LEGACY_SUFFIX}"))
+            legacy[name] = name + LEGACY_SUFFIX
+
+    create_schema(engine)
+
+    if FACT_VIEW in legacy:
+        with engine.connect() as conn:
+            crops = [r[0] for r in conn.execute(text(f"SELECT DISTINCT crop FROM {legacy[FACT_VIEW]}"))]
+        crop_ids(engine, crops)
+
+    with engine.begin() as conn:
+        if "dim_state" in legacy:
+            conn.execute(text(f"""
+                INSERT INTO dim_state (state_code, state_name)
+                SELECT state_code, MAX(state_name) FROM {legacy['dim_state']}
+                GROUP BY state_code
+            """))
+        if "dim_district" in legacy:
+            conn.execute(text(f"""
+                INSERT INTO dim_district (dist_code, dist_name, state_code)
+                SELECT dist_code, MAX(dist_name), MAX(state_code) FROM {legacy['dim_district']}
+                GROUP BY dist_code
+            """))
+        if FACT_VIEW in legacy:
+            conn.execute(text(f"""
+                INSERT INTO fact_crop_yearly
+                    (dist_code, year, crop_id, state_code, Area_1000_ha, Production_1000_t, Yield_kg_ha)
+                SELECT l.dist_code, l.year, c.crop_id, MAX(l.state_code),
+                       MAX(l.Area_1000_ha), MAX(l.Production_1000_t), MAX(l.Yield_kg_ha)
+                FROM {legacy[FACT_VIEW]} l
+                JOIN dim_crop c ON c.crop = l.crop
+                GROUP BY l.dist_code, l.year, c.crop_id
+            """))
+        bump_data_version(conn)
+
+    refresh_rollups(engine)
+
+
+def _full_scans(engine, conn, sql: str) -> list:
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).mappings().all()
+        # "SCAN fact_crop_yearly" is a table scan; index scans read "USING ... INDEX"
+        return [r["detail"] for r in rows
+                if r["detail"].startswith("SCAN fact_crop_yearly") and "INDEX" not in r["detail"]]
+    if dialect == "mysql":
+        rows = conn.execute(text(f"EXPLAIN {sql}")).mappings().all()
+        return [f"{r['table']}: type=ALL rows={r['rows']}" for r in rows
+                if r["table"] == "fact_crop_yearly" and r["type"] == "ALL"]
+    raise ValueError(f"EXPLAIN check is not supported for the {dialect!r} dialect")
+
+
+def check_index_usage(engine, queries: dict) -> dict:
+    """EXPLAIN every query; return {name: [full-scan plan lines]} for offenders only."""
+    offenders = {}
+    with engine.connect() as conn:
+        for name, sql in queries.items():
+            scans = _full_scans(engine, conn, sql.strip().rstrip(";"))
+            if scans:
+                offenders[name] = scans
+    return offenders
@@ -0,0 +1,131 @@
+"""Synthetic district-level datasets shaped like District_Level_Data.xlsx.
+
+The generated frame has the workbook's layout. The columns are Dist Code,
+Year, State Code, State Name and Dist Name, followed by one
+"<CROP> AREA (1000 ha)", "<CROP> PRODUCTION (1000 tons)" and
+"<CROP> YIELD (Kg per ha)" column per crop. It uses the real crop and state
+names, so q1..q10 and the EDA slices return rows. Values follow a per-district
+base level with a yearly trend and noise. Crops a district does not grow are
+blank, and a small share of other cells are blank too. `SCALES` gives the
+1x/10x/100x shapes used by benchmark.py; 1x is about the size of the real
+workbook.
+
+    python synthetic_data.py --scale 10x --out .agri_cache/bench/synthetic_10x.parquet
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CROPS = [
+    "RICE", "WHEAT", "KHARIF SORGHUM", "RABI SORGHUM", "SORGHUM", "PEARL MILLET",
+    "MAIZE", "FINGER MILLET", "BARLEY", "CHICKPEA", "PIGEONPEA", "MINOR PULSES",
+    "GROUNDNUT", "SESAMUM", "RAPESEED AND MUSTARD", "SAFFLOWER", "CASTOR",
+    "LINSEED", "SUNFLOWER", "SOYABEAN", "OILSEEDS", "SUGARCANE", "COTTON",
+    "FRUITS", "VEGETABLES", "FRUITS AND VEGETABLES", "POTATOES", "ONION", "FODDER",
+]
+
+STATES = [
+    "Andhra Pradesh", "Assam", "Bihar", "Chhattisgarh", "Gujarat", "Haryana",
+    "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh",
+    "Maharashtra", "Orissa", "Punjab", "Rajasthan", "Tamil Nadu", "Telangana",
+    "Uttar Pradesh", "Uttarakhand", "West Bengal",
+]
+
+# (districts, years); crops default to all of CROPS
+SCALES = {
+    "1x": (311, 52),
+    "10x": (3110, 52),
+    "100x": (31100, 52),
+}
+
+FIRST_YEAR = 1966
+
+
+def generate_district_data(districts: int = 311, years: int = 52, crops: list = None,
+                           first_year: int = FIRST_YEAR, missing_rate: float = 0.05,
+                           seed: int = 0) -> pd.DataFrame:
+    """Wide frame with `districts` x `years` rows and three metric columns per crop."""
+    rng = np.random.default_rng(seed)
+    crops = list(CROPS if crops is None else crops)
+    n_rows = districts * years
+
+    dist_codes = np.arange(1, districts + 1)
+    state_of = rng.integers(0, len(STATES), size=districts)
+    year_values = np.arange(first_year, first_year + years)
+
+    columns = {
+        "Dist Code": np.repeat(dist_codes, years),
+        "Year": np.tile(year_values, districts),
+        "State Code": np.repeat(state_of + 1, years),
+        "State Name": np.asarray(STATES, dtype=object)[np.repeat(state_of, years)],
+        "Dist Name": np.repeat(np.array([f"District {c}" for c in dist_codes], dtype=object), years),
+    }
+
+    trend = np.tile(np.linspace(0.0, 1.0, years), districts)
+    for crop in crops:
+        grown = np.repeat(rng.random(districts) < 0.7, years)
+        base_area = np.repeat(rng.lognormal(3.0, 1.0, districts), years)
+        base_yield = np.repeat(rng.uniform(500, 3000, districts), years)
+
+        area = base_area * (1 + 0.3 * trend) * rng.normal(1.0, 0.1, n_rows).clip(0.5)
+        yield_kg_ha = base_yield * (1 + 0.8 * trend) * rng.normal(1.0, 0.15, n_rows).clip(0.3)
+        # 1000 ha * kg/ha = 1000 t
+        production = area * yield_kg_ha / 1000
+
+        blank = ~grown | (rng.random(n_rows) < missing_rate)
+        for values in (area, production, yield_kg_ha):
+            values[blank] = np.nan
+        columns[f"{crop} AREA (1000 ha)"] = area.round(2)
+        columns[f"{crop} PRODUCTION (1000 tons)"] = production.round(2)
+        columns[f"{crop} YIELD (Kg per ha)"] = yield_kg_ha.round(2)
+
+    return pd.DataFrame(columns)
+
+
+def generate_scale(scale: str, seed: int = 0) -> pd.DataFrame:
+    districts, years = SCALES[scale]
+    return generate_district_data(districts, years, seed=seed)
+
+
+def write_dataset(df: pd.DataFrame, path) -> Path:
+    """Write `df` as .xlsx, .csv or .parquet according to the suffix of `path`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = path.suffix.lower()
+    if suffix == ".xlsx":
+        df.to_excel(path, index=False)
+    elif suffix == ".csv":
+        df.to_csv(path, index=False)
+    elif suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        raise ValueError(f"unsupported output format: {path.suffix}")
+    return path
+
+
+def read_dataset(path) -> pd.DataFrame:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".xlsx":
+        return pd.read_excel(path)
+    if suffix == ".csv":
+        return pd.read_csv(path)
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    raise ValueError(f"unsupported input format: {suffix}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1x")
+    parser.add_argument("--out", required=True, help=".xlsx, .csv or .parquet path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generate_scale(args.scale, seed=args.seed)
+    print("wrote", write_dataset(df, args.out), df.shape)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import pytest
+
+from reshape import build_star_schema
+from synthetic_data import generate_district_data
+
+
+@pytest.fixture(scope="session")
+def district_data():
+    """A small synthetic workbook: 40 districts x 12 years, every crop."""
+    return generate_district_data(districts=40, years=12, seed=7)
+
+
+@pytest.fixture(scope="session")
+def star(district_data):
+    """(dim_state, dim_district, fact) with SQL column names, as loaded into the backends."""
+    return build_star_schema(district_data)
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """A file-backed SQLite engine; the loaders write from worker threads, so no :memory:."""
+    from sqlalchemy import create_engine
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'agri.db'}")
+    yield engine
+    engine.dispose()
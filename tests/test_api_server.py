@@ -0,0 +1,91 @@
+import asyncio
+import gzip
+import http.client
+import json
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from api_server import ARROW_TYPE, AnalyticsServer
+from backends import SQLiteBackend, star_schema_frames
+
+
+@pytest.fixture(scope="module")
+def api(star):
+    """(server, port) serving the test star schema from a background event loop."""
+    server = AnalyticsServer(SQLiteBackend(star_schema_frames(*star)), version="v1", workers=2)
+    loop = asyncio.new_event_loop()
+    listening = asyncio.run_coroutine_threadsafe(server.start(port=0), loop)
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    tcp = listening.result(5)
+    yield server, tcp.sockets[0].getsockname()[1]
+    loop.call_soon_threadsafe(tcp.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    server.executor.shutdown()
+
+
+def _get(port, path, **headers):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, response.read()
+    finally:
+        conn.close()
+
+
+def _frame(body: bytes) -> pd.DataFrame:
+    payload = json.loads(body)
+    return pd.DataFrame(payload["data"], columns=payload["columns"])
+
+
+def test_conditional_get_answers_304_without_a_query(api):
+    server, port = api
+    status, headers, body = _get(port, "/top-states?crop=RICE&n=3")
+    assert status == 200 and headers["content-type"] == "application/json"
+    assert len(_frame(body)) == 3
+
+    queries = server.stats["queries"]
+    status, again, body = _get(port, "/top-states?crop=RICE&n=3", **{"If-None-Match": headers["etag"]})
+    assert (status, body, again["etag"]) == (304, b"", headers["etag"])
+    assert server.stats["queries"] == queries
+
+    # Other parameters, another entity
+    _, other, _ = _get(port, "/top-states?crop=RICE&n=4")
+    assert other["etag"] != headers["etag"]
+
+
+def test_gzip_is_negotiated(api):
+    _, port = api
+    status, plain_headers, plain = _get(port, "/queries/q1")
+    status, headers, body = _get(port, "/queries/q1", **{"Accept-Encoding": "gzip, deflate"})
+
+    assert status == 200 and len(plain) >= 1024
+    assert "content-encoding" not in plain_headers
+    assert headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == plain
+    assert len(body) < len(plain)
+
+
+@pytest.mark.parametrize("ask", [{"headers": {"Accept": ARROW_TYPE}}, {"query": "&format=arrow"}])
+def test_arrow_responses_hold_the_json_rows(api, ask):
+    _, port = api
+    path = "/trend?crop=RICE,WHEAT"
+    _, json_headers, body = _get(port, path)
+    status, headers, stream = _get(port, path + ask.get("query", ""), **ask.get("headers", {}))
+
+    assert status == 200 and headers["content-type"] == ARROW_TYPE
+    assert headers["etag"] != json_headers["etag"]
+    table = pa.ipc.open_stream(stream).read_all().to_pandas()
+    pd.testing.assert_frame_equal(table, _frame(body), check_dtype=False)
+
+
+def test_bad_requests(api):
+    _, port = api
+    assert _get(port, "/top-states")[0] == 400
+    assert _get(port, "/top-states?crop=RICE&metric=volume")[0] == 400
+    assert _get(port, "/nowhere")[0] == 404
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backends import DuckDBBackend, SQLiteBackend, check_parity, star_schema_frames
+from queries import QUERIES
+
+
+def test_sqlite_and_duckdb_agree_on_every_query(star):
+    pytest.importorskip("duckdb")
+    frames = star_schema_frames(*star)
+    queries = {name: QUERIES[name] for name in (f"q{i}" for i in range(1, 11))}
+
+    assert check_parity(SQLiteBackend(frames), DuckDBBackend(frames=frames), queries) == {}
+
+
+def test_duckdb_reads_parquet_paths(star, tmp_path):
+    pytest.importorskip("duckdb")
+    paths = {}
+    for table, frame in star_schema_frames(*star).items():
+        paths[table] = tmp_path / f"it's {table}.parquet"
+        frame.to_parquet(paths[table], index=False)
+
+    backend = DuckDBBackend(parquet=paths)
+    counts = backend.run_sql("SELECT COUNT(*) AS n FROM fact_crop_yearly_long")
+    assert counts["n"].iloc[0] == len(star[2])
+
+
+def test_sqlite_crop_lookups_use_the_fact_index(star):
+    backend = SQLiteBackend(star_schema_frames(*star))
+    plan = backend.run_sql("EXPLAIN QUERY PLAN SELECT SUM(production_1000_t) FROM fact_crop_yearly_long "
+                           "WHERE crop = :crop AND year = :year", {"crop": "RICE", "year": 1970})
+    assert "USING INDEX ix_fact_crop_yearly_long_0" in " ".join(plan["detail"])
+
+
+def test_sqlite_threads_read_through_their_own_connections(star):
+    backend = SQLiteBackend(star_schema_frames(*star))
+    sql = "SELECT crop, SUM(area_1000_ha) AS area FROM fact_crop_yearly_long WHERE crop = :crop GROUP BY crop"
+    crops = [str(c) for c in star[2]["crop"].cat.categories] * 4
+    expected = {crop: backend.run_sql(sql, {"crop": crop})["area"].iloc[0] for crop in set(crops)}
+
+    def query(crop):
+        return crop, backend.run_sql(sql, {"crop": crop})["area"].iloc[0], id(backend._reader())
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(query, crops))
+    assert all(area == expected[crop] for crop, area, _ in results)
+    assert len({conn for _, _, conn in results}) > 1
@@ -0,0 +1,38 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from backends import DuckDBBackend, SQLiteBackend
+from batch_runner import run_batch
+
+# Runs for minutes unless it is interrupted
+ENDLESS = """
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000)
+SELECT SUM(i) AS total FROM n
+"""
+
+
+def _sql_threads() -> int:
+    return sum(t.name.startswith("agri-sql") for t in threading.enumerate())
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "duckdb"])
+def test_timed_out_query_is_aborted(kind):
+    frames = {"t": pd.DataFrame({"x": [1, 2, 3]})}
+    if kind == "duckdb":
+        pytest.importorskip("duckdb")
+        backend = DuckDBBackend(frames=frames)
+    else:
+        backend = SQLiteBackend(frames)
+
+    batch = run_batch(backend, {"slow": ENDLESS, "fast": "SELECT SUM(x) AS total FROM t"}, timeout=0.5)
+
+    assert batch.frames["fast"]["total"].iloc[0] == 6
+    assert isinstance(batch.errors["slow"], TimeoutError)
+    # The worker is freed as well, not just dropped from the batch
+    deadline = time.monotonic() + 5
+    while _sql_threads() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _sql_threads() == 0
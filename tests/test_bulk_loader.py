@@ -0,0 +1,51 @@
+import pandas as pd
+from sqlalchemy import text
+
+from bulk_loader import load_star_schema
+from schema import data_version
+
+TABLES = ("dim_state", "dim_district", "dim_crop", "fact_crop_yearly", "agg_state_year_crop",
+          "agg_india_year_crop")
+
+
+def _counts(engine) -> dict:
+    with engine.connect() as conn:
+        return {t: conn.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar() for t in TABLES}
+
+
+def _india(engine) -> pd.DataFrame:
+    with engine.connect() as conn:
+        return pd.read_sql(text("SELECT * FROM agg_india_year_crop ORDER BY year, crop_id"), conn)
+
+
+def test_reloading_the_same_data_is_idempotent(star, sqlite_engine):
+    load_star_schema(sqlite_engine, *star)
+    counts, rollup, version = _counts(sqlite_engine), _india(sqlite_engine), data_version(sqlite_engine)
+
+    load_star_schema(sqlite_engine, *star)
+
+    assert _counts(sqlite_engine) == counts
+    assert counts["fact_crop_yearly"] == len(star[2])
+    pd.testing.assert_frame_equal(_india(sqlite_engine), rollup, check_exact=False, rtol=1e-12)
+    assert data_version(sqlite_engine) == version + 1
+
+
+def test_changed_rows_are_updated_in_place(star, sqlite_engine):
+    dim_state, dim_district, fact = star
+    load_star_schema(sqlite_engine, dim_state, dim_district, fact)
+    row = fact.iloc[[0]].copy()
+    row["Production_1000_t"] = 12345.5
+    dim_state = dim_state.assign(state_name=dim_state["state_name"] + " (renamed)")
+
+    load_star_schema(sqlite_engine, dim_state, dim_district, row)
+
+    key = {"dist_code": int(row["dist_code"].iloc[0]), "year": int(row["year"].iloc[0]),
+           "crop": str(row["crop"].iloc[0])}
+    with sqlite_engine.connect() as conn:
+        production = conn.execute(text("SELECT Production_1000_t FROM fact_crop_yearly_long "
+                                       "WHERE dist_code = :dist_code AND year = :year AND crop = :crop"),
+                                  key).scalar()
+        names = conn.execute(text("SELECT state_name FROM dim_state")).scalars().all()
+    assert production == 12345.5
+    assert all(name.endswith(" (renamed)") for name in names)
+    assert _counts(sqlite_engine)["fact_crop_yearly"] == len(fact)
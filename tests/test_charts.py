@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from charts import ChartSpec, render_charts
+
+
+@pytest.fixture
+def specs():
+    data = pd.DataFrame({"state": ["A", "B", "C"], "rice": [3.0, 1.5, 2.0], "wheat": [1.0, 2.5, 0.5]})
+    return [
+        ChartSpec("bar", "bar", data, x="state", y="rice", title="Rice"),
+        ChartSpec("stacked", "bar", data, x="state", y=["rice", "wheat"], options={"stacked": True}),
+        ChartSpec("line", "line", data, x="state", y=["rice", "wheat"], options={"legend": True}),
+        ChartSpec("pie", "pie", data, x="state", y="rice"),
+        ChartSpec("scatter", "scatter", data, x="rice", y="wheat", options={"annotate": "state"}),
+        ChartSpec("panels", "panels", panels=[ChartSpec("left", "bar", data, x="state", y="rice"),
+                                              ChartSpec("right", "pie", data, x="state", y="wheat")]),
+    ]
+
+
+def test_render_writes_one_file_per_spec(specs, tmp_path):
+    paths = render_charts(specs, tmp_path / "charts", fmt="svg", processes=2)
+
+    assert paths == [str(tmp_path / "charts" / f"{s.name}.svg") for s in specs]
+    assert sorted(p.name for p in (tmp_path / "charts").iterdir()) == sorted(f"{s.name}.svg" for s in specs)
+    assert all((tmp_path / "charts" / f"{s.name}.svg").stat().st_size > 0 for s in specs)
+
+
+def test_chart_names_must_be_unique(specs, tmp_path):
+    with pytest.raises(ValueError, match="unique"):
+        render_charts(specs + specs[:1], tmp_path)
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError, match="unknown chart kind"):
+        ChartSpec("x", "histogram")
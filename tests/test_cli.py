@@ -0,0 +1,50 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from agri.cli import main
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("numpy", "pandas", "pyarrow", "sqlalchemy", "matplotlib")
+
+
+def _python(*args) -> str:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, check=True, capture_output=True,
+                          text=True).stdout
+
+
+@pytest.fixture(scope="module")
+def source(district_data, tmp_path_factory):
+    path = tmp_path_factory.mktemp("source") / "synthetic.parquet"
+    district_data.to_parquet(path, index=False)
+    return path
+
+
+def test_import_loads_only_the_standard_library():
+    loaded = _python("-c", f"import sys, agri.cli; print([m for m in {HEAVY!r} if m in sys.modules])")
+    assert loaded.strip() == "[]"
+
+
+def test_cached_run_repeats_the_cold_result(source, tmp_path):
+    # Wall-clock budgets are enforced by `benchmark.py --startup`, not here
+    command = ["-m", "agri", "run", "q6", "--crop", "GROUNDNUT", "--source", str(source),
+               "--backend", "sqlite", "--cache-dir", str(tmp_path / "results")]
+    cold = _python(*command)
+    cached = _python(*command)
+    assert cached == cold
+    assert "production_latest" in cached
+
+
+def test_run_passes_analysis_parameters(source, tmp_path, capsys):
+    output = tmp_path / "top.csv"
+    assert main(["run", "top_states", "--crop", "RICE", "--n", "3", "--source", str(source),
+                 "--output", str(output)]) == 0
+    assert "State Name" in capsys.readouterr().out
+    assert len(output.read_text().splitlines()) == 4
+
+
+def test_unknown_parameter_is_rejected(source):
+    with pytest.raises(SystemExit):
+        main(["run", "q6", "--source", str(source), "--no-such-option", "1"])
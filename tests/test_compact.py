@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from backends import DuckDBBackend, SQLiteBackend, star_schema_frames
+from bulk_loader import load_star_schema
+from compact import widen
+from cube import CropCube
+from fact_views import CropAggregates, enrich_fact
+from reshape import build_fact_table, build_star_schema
+
+
+def test_compact_totals_match_float64_source(district_data):
+    fact = build_fact_table(district_data, compact=True).rename(
+        columns={"AREA": "Area_1000_ha", "PRODUCTION": "Production_1000_t", "YIELD": "Yield_kg_ha"})
+    dim_state = district_data[["State Code", "State Name"]].drop_duplicates()
+    dim_district = district_data[["Dist Code", "Dist Name", "State Code"]].drop_duplicates()
+    expected = (district_data.groupby("State Name")["RICE PRODUCTION (1000 tons)"]
+                .sum(min_count=1).dropna().sort_index())
+
+    for aggregates in (CropAggregates(enrich_fact(fact, dim_state, dim_district)),
+                       CropCube.from_fact(fact, dim_state, dim_district)):
+        totals = aggregates.top_n("RICE").set_index("State Name")["Production_1000_t"].sort_index()
+        assert totals.index.astype(str).tolist() == expected.index.tolist()
+        # float32 storage, but the sums carry no float32 noise
+        np.testing.assert_allclose(totals.to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+
+def test_widen_rounds_float32_only():
+    assert widen(np.array([123.45], dtype=np.float32))[0] == 123.45
+    # float64 source values are not rounded to the workbook's 2 decimals
+    raw = pd.DataFrame({"area": [0.004, 1.23456]})
+    pd.testing.assert_frame_equal(widen(raw), raw)
+    np.testing.assert_array_equal(widen(raw["area"].to_numpy()), raw["area"].to_numpy())
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "duckdb", "duckdb-parquet"])
+def test_sql_backends_sum_compact_metrics_without_float32_noise(district_data, kind, tmp_path):
+    if kind.startswith("duckdb"):
+        pytest.importorskip("duckdb")
+    frames = star_schema_frames(*build_star_schema(district_data))
+    assert frames["fact_crop_yearly_long"]["Production_1000_t"].dtype == np.float32
+    if kind == "sqlite":
+        backend = SQLiteBackend(frames)
+    elif kind == "duckdb":
+        backend = DuckDBBackend(frames=frames)
+    else:
+        paths = {t: tmp_path / f"{t}.parquet" for t in frames}
+        for table, frame in frames.items():
+            frame.to_parquet(paths[table], index=False)
+        backend = DuckDBBackend(parquet=paths)
+
+    column = "RICE PRODUCTION (1000 tons)"
+    sums = backend.run_sql("SELECT state_code, SUM(production_1000_t) AS total FROM fact_crop_yearly_long "
+                           "WHERE crop = 'RICE' GROUP BY state_code ORDER BY state_code")
+    expected = district_data.groupby("State Code")[column].sum(min_count=1).dropna()
+    np.testing.assert_allclose(sums["total"].to_numpy(), expected.to_numpy(), rtol=1e-12)
+    # Every stored value is back at 2 decimals: 367.7, not 367.700001
+    values = backend.run_sql("SELECT production_1000_t AS v FROM fact_crop_yearly_long")["v"].dropna()
+    assert values.dtype == np.float64
+    np.testing.assert_array_equal(values.to_numpy(), values.round(2).to_numpy())
+
+
+def test_bulk_loader_stores_float64_at_source_precision(district_data, sqlite_engine):
+    load_star_schema(sqlite_engine, *build_star_schema(district_data))
+    with sqlite_engine.connect() as conn:
+        stored = pd.read_sql(text("SELECT Production_1000_t AS v FROM fact_crop_yearly "
+                                  "WHERE Production_1000_t IS NOT NULL"), conn)["v"]
+    np.testing.assert_array_equal(stored.to_numpy(), stored.round(2).to_numpy())
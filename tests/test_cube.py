@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from cube import CropCube
+from synthetic_data import FIRST_YEAR, generate_district_data
+
+
+@pytest.fixture(scope="module")
+def cube():
+    # 1966-1970
+    return CropCube.from_wide(generate_district_data(districts=6, years=5, crops=["RICE", "WHEAT"], seed=3))
+
+
+def test_sel_picks_years_by_label(cube):
+    first = cube.sel(crop="RICE", year=FIRST_YEAR)
+    np.testing.assert_array_equal(first, cube.values[:, 0, 0], strict=True)
+    both = cube.sel(crop="RICE", year=[FIRST_YEAR + 4, FIRST_YEAR + 1])
+    np.testing.assert_array_equal(both, cube.values[:, 0, [4, 1]], strict=True)
+
+
+@pytest.mark.parametrize("year", [FIRST_YEAR - 1, FIRST_YEAR + 5, [FIRST_YEAR, FIRST_YEAR + 9]])
+def test_sel_rejects_years_outside_the_cube(cube, year):
+    # FIRST_YEAR - 1 used to wrap around to the last year
+    with pytest.raises(KeyError, match="outside the cube's 1966-1970"):
+        cube.sel(year=year)
+
+
+def test_sel_rejects_unknown_labels(cube):
+    with pytest.raises(KeyError):
+        cube.sel(crop="MAIZE")
+    with pytest.raises(KeyError):
+        cube.sel(state="Atlantis")
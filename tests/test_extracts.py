@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from extracts import current_extract, prune, read_fact, write_extracts
+from metrics import derived_metrics
+
+
+@pytest.fixture(scope="module")
+def extracts(star, tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp("extracts")
+    return out_dir, write_extracts(*star, out_dir)
+
+
+def _fact(star):
+    fact = star[2].rename(columns=str.lower)
+    fact["crop"] = fact["crop"].astype(str)
+    return fact
+
+
+def _sorted(frame, columns):
+    return frame[columns].sort_values(["crop", "dist_code", "year"]).reset_index(drop=True)
+
+
+def test_manifest_matches_the_fact_table(star, extracts):
+    out_dir, manifest = extracts
+    fact = _fact(star)
+
+    assert json.loads((current_extract(out_dir) / "manifest.json").read_text()) == manifest
+    assert manifest["fact_rows"] == len(fact) == sum(e["rows"] for e in manifest["partitions"])
+    for entry in manifest["partitions"]:
+        rows = fact[(fact["crop"] == entry["crop"]) & (fact["year"] // 10 * 10 == entry["decade"])]
+        assert entry["rows"] == len(rows)
+        assert (entry["year_min"], entry["year_max"]) == (rows["year"].min(), rows["year"].max())
+        assert entry["production_1000_t_max"] == pytest.approx(rows["production_1000_t"].max(), rel=1e-6)
+
+
+def test_prune_keeps_only_matching_partitions(extracts):
+    _, manifest = extracts
+    decades = sorted({e["decade"] for e in manifest["partitions"]})
+    first = decades[-1]
+
+    kept = prune(manifest, crops=["rice"], years=(first, first + 9))
+    assert [(e["crop"], e["decade"]) for e in kept] == [("RICE", first)]
+    assert len(prune(manifest)) == len(manifest["partitions"])
+    assert prune(manifest, crops=["RICE"], years=(1000, 1001)) == []
+
+
+def test_read_fact_matches_the_filtered_fact(star, extracts):
+    out_dir, _ = extracts
+    fact = _fact(star)
+    years = (fact["year"].min() + 2, fact["year"].min() + 5)
+    columns = ["crop", "dist_code", "year", "production_1000_t"]
+
+    got = read_fact(out_dir, crops=["RICE", "WHEAT"], years=years, columns=columns)
+    want = fact[fact["crop"].isin(["RICE", "WHEAT"]) & fact["year"].between(*years)]
+    got["crop"] = got["crop"].astype(str)
+    pd.testing.assert_frame_equal(_sorted(got, columns), _sorted(want, columns), check_dtype=False)
+    assert read_fact(out_dir, crops=["RICE"], years=(1000, 1001), columns=columns).empty
+
+
+def test_kpi_tables_use_derived_metrics(star, extracts):
+    out_dir, _ = extracts
+    kpi = pd.read_parquet(current_extract(out_dir) / "kpi_crop_year.parquet")
+    fact = _fact(star)
+    expected = derived_metrics(fact, ["crop", "year"])
+
+    np.testing.assert_allclose(kpi["yield_kg_ha"], expected["yield_kg_ha"], rtol=1e-9)
+    np.testing.assert_allclose(kpi["yield_kg_ha_weighted"], expected["yield_kg_ha_weighted"], rtol=1e-9)
+    state = pd.read_parquet(current_extract(out_dir) / "state_summary.parquet")
+    shares = state.groupby(["crop", "year"])["share_of_national_production"].sum()
+    np.testing.assert_allclose(shares.dropna(), 1.0)
+
+
+def test_rewrite_swaps_the_pointer_and_keeps_one_previous_version(star, tmp_path):
+    versions = [write_extracts(*star, tmp_path)["version"] for _ in range(3)]
+
+    assert len(set(versions)) == 3
+    assert current_extract(tmp_path).name == versions[-1]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["CURRENT"] + versions[1:]
+    with pytest.raises(FileNotFoundError):
+        current_extract(tmp_path / "missing")
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backends import SQLiteBackend, star_schema_frames
+from grouped_stats import grouped_pearson, grouped_sums, pearson_from_sums, pearson_sums_sql
+
+KEYS = ["dist_code", "crop"]
+
+
+@pytest.fixture(scope="module")
+def fact(star):
+    fact = star[2].rename(columns=str.lower)
+    return fact.assign(crop=fact["crop"].astype(str),
+                       area_1000_ha=fact["area_1000_ha"].astype("float64"),
+                       production_1000_t=fact["production_1000_t"].astype("float64"))
+
+
+def _expected(fact: pd.DataFrame) -> pd.Series:
+    # The per-group .corr() loop q4 used to run, with its guards
+    rows = {}
+    for key, group in fact.groupby(KEYS):
+        x, y = group["area_1000_ha"], group["production_1000_t"]
+        if len(group) >= 3 and x.nunique() > 1 and y.nunique() > 1:
+            rows[key] = x.corr(y)
+    return pd.Series(rows).dropna().sort_index()
+
+
+def _by_key(frame: pd.DataFrame) -> pd.Series:
+    return frame.set_index(KEYS)["pearson_corr"].sort_index()
+
+
+def test_pearson_from_sums_matches_groupby_corr(fact):
+    expected = _expected(fact)
+    result = _by_key(grouped_pearson(fact, KEYS, "area_1000_ha", "production_1000_t"))
+
+    assert len(expected) > 100
+    np.testing.assert_array_equal(result.index.to_list(), expected.index.to_list())
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-7)
+
+
+def test_pearson_from_sums_on_sql_sums(fact, star):
+    backend = SQLiteBackend(star_schema_frames(*star))
+    sql = pearson_sums_sql(KEYS, "area_1000_ha", "production_1000_t", "fact_crop_yearly_long")
+    result = _by_key(pearson_from_sums(backend.run_sql(sql), KEYS))
+    expected = _by_key(pearson_from_sums(grouped_sums(fact, KEYS, "area_1000_ha", "production_1000_t"), KEYS))
+
+    np.testing.assert_array_equal(result.index.to_list(), expected.index.to_list())
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-6)
+
+
+def test_degenerate_groups_are_dropped():
+    sums = pd.DataFrame({
+        "g": ["short", "flat", "ok"],
+        "n_rows": [2, 5, 3], "nunique_x": [2, 1, 3], "nunique_y": [2, 4, 3],
+        "n": [2, 5, 3], "sx": [3.0, 5.0, 6.0], "sy": [3.0, 10.0, 6.0],
+        "sxy": [5.0, 10.0, 14.0], "sxx": [5.0, 5.0, 14.0], "syy": [5.0, 30.0, 14.0],
+    })
+    result = pearson_from_sums(sums, ["g"])
+    assert result["g"].tolist() == ["ok"]
+    assert result["pearson_corr"].iloc[0] == pytest.approx(1.0)
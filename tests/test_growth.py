@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backends import SQLiteBackend, star_schema_frames
+from growth import growth_by, growth_table, growth_template
+
+CROPS = ["RICE", "WHEAT", "SUGARCANE"]
+
+
+@pytest.fixture(scope="module")
+def backend(star):
+    return SQLiteBackend(star_schema_frames(*star))
+
+
+@pytest.mark.parametrize("level", ["state", "district", "country"])
+def test_growth_sql_matches_growth_by(star, backend, level):
+    horizons, windows = (1, 3), (3,)
+    sql = growth_template(level, horizons=horizons, windows=windows).run(backend, crops=CROPS)
+    client = growth_by(star[2].rename(columns=str.lower), level, "production_1000_t", crops=CROPS,
+                       horizons=horizons, windows=windows)
+    client = client.rename(columns={"production_1000_t": "value"})
+
+    assert len(sql) == len(client) > 0
+    pd.testing.assert_frame_equal(sql[client.columns.tolist()].reset_index(drop=True), client,
+                                  check_dtype=False, rtol=1e-5, atol=1e-3)
+
+
+def test_missing_years_are_gaps_not_neighbours():
+    frame = pd.DataFrame({"crop": "RICE", "year": [2000, 2001, 2003], "value": [10.0, 20.0, 40.0]})
+    out = growth_table(frame, ["crop"], "value", horizons=(1, 2), windows=(2,))
+
+    np.testing.assert_allclose(out["change_1"], [np.nan, 10.0, np.nan])
+    np.testing.assert_allclose(out["change_2"], [np.nan, np.nan, 20.0])
+    np.testing.assert_allclose(out["pct_change_2"], [np.nan, np.nan, 100.0])
+    np.testing.assert_allclose(out["rolling_mean_2"], [10.0, 15.0, 40.0])
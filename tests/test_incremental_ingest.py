@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from incremental_ingest import incremental_ingest, slice_hashes
+from synthetic_data import FIRST_YEAR, generate_district_data
+
+SNAPSHOTS = {
+    "fact": "SELECT dist_code, year, state_code, crop, Area_1000_ha, Production_1000_t, Yield_kg_ha "
+            "FROM fact_crop_yearly_long ORDER BY dist_code, year, crop",
+    "state_rollup": "SELECT r.state_code, r.year, c.crop, r.area_1000_ha, r.production_1000_t, r.yield_sum, "
+                    "r.yield_count, r.yield_kg_ha_weighted FROM agg_state_year_crop r "
+                    "JOIN dim_crop c ON c.crop_id = r.crop_id ORDER BY r.state_code, r.year, c.crop",
+    "india_rollup": "SELECT r.year, c.crop, r.area_1000_ha, r.production_1000_t, r.yield_count, "
+                    "r.yield_kg_ha_weighted FROM agg_india_year_crop r "
+                    "JOIN dim_crop c ON c.crop_id = r.crop_id ORDER BY r.year, c.crop",
+    "dim_state": "SELECT * FROM dim_state ORDER BY state_code",
+    "dim_district": "SELECT * FROM dim_district ORDER BY dist_code",
+}
+
+
+def _snapshot(engine) -> dict:
+    with engine.connect() as conn:
+        return {name: pd.read_sql(text(sql), conn) for name, sql in SNAPSHOTS.items()}
+
+
+def _published(district_data):
+    """The workbook a year later: one more year, a revised slice, a withdrawn one."""
+    new_year = generate_district_data(districts=40, years=1, first_year=FIRST_YEAR + 12, seed=7)
+    df = pd.concat([district_data, new_year], ignore_index=True)
+    revised = (df["Dist Code"] == 3) & (df["Year"] == FIRST_YEAR + 5)
+    df.loc[revised, "RICE PRODUCTION (1000 tons)"] = 999.25
+    df.loc[revised, "WHEAT AREA (1000 ha)"] = np.nan
+    return df[~((df["Dist Code"] == 8) & (df["Year"] == FIRST_YEAR + 2))].reset_index(drop=True)
+
+
+def test_incremental_load_matches_a_full_load(district_data, sqlite_engine, tmp_path):
+    incremental_ingest(sqlite_engine, district_data, source="v1")
+    published = _published(district_data)
+    manifest = incremental_ingest(sqlite_engine, published, source="v2")
+
+    assert (manifest.slices_new, manifest.slices_changed, manifest.slices_removed) == (40, 1, 1)
+    full = create_engine(f"sqlite:///{tmp_path / 'full.db'}")
+    incremental_ingest(full, published, source="v2")
+    expected = _snapshot(full)
+    for name, frame in _snapshot(sqlite_engine).items():
+        pd.testing.assert_frame_equal(frame, expected[name], check_exact=False, rtol=1e-12)
+    full.dispose()
+
+    with sqlite_engine.connect() as conn:
+        hashes = pd.read_sql(text("SELECT dist_code, year, row_hash FROM ingest_slice_hash "
+                                  "ORDER BY dist_code, year"), conn)
+        loads = pd.read_sql(text("SELECT source, slices_new, slices_changed, slices_removed "
+                                 "FROM load_manifest ORDER BY load_id"), conn)
+    current = slice_hashes(published).sort_values(["dist_code", "year"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(hashes, current, check_dtype=False)
+    assert loads.values.tolist() == [["v1", len(district_data), 0, 0], ["v2", 40, 1, 1]]
+
+
+def test_slice_hashes_ignore_dtypes(district_data):
+    metrics = [c for c in district_data.columns if "(" in c]
+    retyped = district_data.astype({"Dist Code": "float64", "Year": "int32", **{c: "float32" for c in metrics}})
+    pd.testing.assert_frame_equal(slice_hashes(retyped), slice_hashes(district_data))
+
+    changed = district_data.copy()
+    changed.loc[0, metrics[0]] = 1.5
+    assert (slice_hashes(changed)["row_hash"] != slice_hashes(district_data)["row_hash"]).sum() == 1
+
+
+def test_reloading_retyped_data_touches_nothing(district_data, sqlite_engine):
+    incremental_ingest(sqlite_engine, district_data)
+    manifest = incremental_ingest(sqlite_engine, district_data.astype({"Dist Code": "float64"}))
+    assert (manifest.slices_new, manifest.slices_changed, manifest.slices_removed, manifest.fact_rows) == (0, 0, 0, 0)
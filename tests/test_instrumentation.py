@@ -0,0 +1,87 @@
+import threading
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from compact import MemoryProfiler
+from instrumentation import Tracer
+
+MB = 2**20
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer(track_memory=True)
+    yield tracer
+    tracemalloc.stop()
+
+
+def test_concurrent_span_does_not_hide_the_peak(tracer):
+    allocated, measured = threading.Event(), threading.Event()
+
+    def worker():
+        with tracer.span("sql:big"):
+            block = np.ones(32 * MB // 8)
+            del block
+            allocated.set()
+            measured.wait(5)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    allocated.wait(5)
+    # Opening a span resets tracemalloc's peak while sql:big is still open
+    with tracer.span("sql:small"):
+        pass
+    measured.set()
+    thread.join()
+
+    spans = {span.name: span for span in tracer.spans}
+    assert spans["sql:big"].peak_delta_bytes >= 32 * MB
+    assert spans["sql:small"].peak_delta_bytes < MB
+
+
+def test_nested_spans_include_their_children(tracer):
+    with tracer.span("outer"):
+        with tracer.span("inner"):
+            block = np.ones(8 * MB // 8)
+            del block
+    spans = {span.name: span for span in tracer.spans}
+    assert spans["outer"].peak_delta_bytes >= spans["inner"].peak_delta_bytes >= 8 * MB
+
+
+def test_profiler_leaves_the_tracers_tracemalloc_running(tracer):
+    profiler = MemoryProfiler()
+    with profiler.stage("reshape"):
+        pass
+    profiler.stop()
+
+    assert tracemalloc.is_tracing()
+    with tracer.span("after"):
+        block = np.ones(4 * MB // 8)
+        del block
+    assert tracer.spans[-1].peak_delta_bytes >= 4 * MB
+
+
+def test_profiler_and_tracer_keep_each_others_peaks(tracer):
+    profiler = MemoryProfiler()
+    with profiler.stage("cube"):
+        with tracer.span("load"):
+            block = np.ones(16 * MB // 8)
+            del block
+        # A span opened after the allocation resets the shared peak
+        with tracer.span("charts"):
+            pass
+    stage = profiler.stages[0]
+    assert stage["peak_bytes"] - stage["steady_bytes"] >= 16 * MB
+    assert tracer.spans[0].peak_delta_bytes >= 16 * MB
+
+
+def test_profiler_stops_only_what_it_started():
+    assert not tracemalloc.is_tracing()
+    profiler = MemoryProfiler()
+    with profiler.stage("load"):
+        pass
+    assert tracemalloc.is_tracing()
+    profiler.stop()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backends import SQLiteBackend
+from metrics import derived_metrics, derived_metrics_sql, safe_divide, weighted_mean
+
+
+@pytest.fixture
+def districts():
+    return pd.DataFrame({
+        "state": ["A", "A", "A", "B", "B"],
+        "area_1000_ha": [10.0, 30.0, np.nan, 5.0, 0.0],
+        "production_1000_t": [20.0, 30.0, 4.0, 10.0, 0.0],
+        "yield_kg_ha": [2000.0, 1000.0, 1500.0, np.nan, 3000.0],
+    })
+
+
+def test_weighted_mean_is_area_weighted(districts):
+    result = weighted_mean(districts, "state", {"yield_kg_ha": "area_1000_ha"})
+
+    # A: (2000*10 + 1000*30) / (10 + 30); the row without an area is left out
+    assert result.loc["A", "yield_kg_ha"] == pytest.approx(1250.0)
+    # B: the only row with a yield has zero area
+    assert np.isnan(result.loc["B", "yield_kg_ha"])
+
+
+def test_safe_divide_fills_zero_and_missing_denominators():
+    out = safe_divide(pd.Series([1.0, 2.0, 3.0], index=[7, 8, 9]), [2.0, 0.0, np.nan], fill=-1.0)
+    assert out.index.tolist() == [7, 8, 9]
+    assert out.tolist() == [0.5, -1.0, -1.0]
+
+
+def test_derived_metrics_sql_matches_client(districts):
+    client = derived_metrics(districts, "state")
+    sql = SQLiteBackend({"f": districts}).run_sql(derived_metrics_sql(["f.state"], "f"))
+
+    # Yield from totals: only rows reporting both; the totals keep every reported value
+    assert client.loc[0, "yield_kg_ha"] == pytest.approx(50.0 / 40.0 * 1000)
+    assert client.loc[0, "production_1000_t"] == pytest.approx(54.0)
+    assert client.loc[1, "yield_kg_ha"] == pytest.approx(2000.0)
+    assert client.loc[0, "yield_kg_ha_weighted"] == pytest.approx(1250.0)
+    assert client["production_share"].sum() == pytest.approx(1.0)
+    pd.testing.assert_frame_equal(sql, client, check_dtype=False)
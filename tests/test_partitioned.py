@@ -0,0 +1,31 @@
+import pandas as pd
+
+from fact_views import LEVELS, CropAggregates, enrich_fact
+from partitioned import build_partitioned
+from reshape import METRICS, SQL_NAMES, build_star_schema
+
+
+def _flat(totals):
+    """Totals with the key levels as plain columns; the merged build keeps names as strings."""
+    flat = totals.reset_index()
+    return flat.astype({c: str for c in flat.columns if isinstance(flat[c].dtype, pd.CategoricalDtype)})
+
+
+def test_partitioned_build_matches_the_single_process_one(district_data, tmp_path):
+    build = build_partitioned(district_data, processes=2, scratch_dir=tmp_path)
+    dim_state, dim_district, fact = build_star_schema(district_data)
+
+    assert len(build.partitions) == district_data["State Code"].nunique()
+    assert sum(p["rows"] for p in build.partitions) == len(district_data)
+    pd.testing.assert_frame_equal(build.fact.rename(columns=SQL_NAMES), fact,
+                                  check_dtype=False, check_categorical=False)
+
+    names = {SQL_NAMES[m]: m for m in ("State Code", "State Name", "Dist Code", "Dist Name", "Year", "Crop")}
+    enriched = enrich_fact(fact.rename(columns=names), dim_state.rename(columns=names),
+                           dim_district.rename(columns=names))
+    expected = CropAggregates(enriched)
+    for level in LEVELS:
+        got, want = _flat(build.aggregates.totals(level)), _flat(expected.totals(level))
+        assert got.columns.tolist()[-2:] == [SQL_NAMES[m] for m in METRICS[:2]]
+        pd.testing.assert_frame_equal(got, want, check_exact=False, rtol=1e-12)
+    assert list(tmp_path.iterdir()) == []
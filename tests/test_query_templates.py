@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backends import SQLiteBackend, star_schema_frames
+from queries import QUERIES
+from query_templates import BATCHED, LEGACY, TEMPLATES, render_legacy, split_by_crop
+
+CROPS = ["RICE", "GROUNDNUT", "OILSEEDS"]
+
+
+@pytest.fixture(scope="module")
+def backend(star):
+    return SQLiteBackend(star_schema_frames(*star))
+
+
+def _assert_same_rows(left, right):
+    # Crop-specific aliases (total_rice_production -> total_production) aside
+    assert left.shape == right.shape
+    for a, b in zip(left.columns, right.columns):
+        if pd.api.types.is_numeric_dtype(left[a]):
+            np.testing.assert_allclose(left[a].to_numpy(dtype="float64"), right[b].to_numpy(dtype="float64"))
+        else:
+            assert left[a].tolist() == right[b].tolist()
+
+
+@pytest.mark.parametrize("name", sorted(LEGACY))
+def test_legacy_templates_return_the_fixed_queries(backend, name):
+    sql, params = render_legacy(name)
+    _assert_same_rows(backend.run_sql(sql, params), backend.run_sql(QUERIES[name]))
+
+
+@pytest.mark.parametrize("name", sorted(TEMPLATES))
+def test_batched_templates_match_one_call_per_crop(backend, name):
+    by_crop = split_by_crop(BATCHED[name].run(backend, crops=CROPS))
+    assert set(by_crop) <= set(CROPS)
+    for crop in CROPS:
+        single = TEMPLATES[name].run(backend, crop=crop)
+        batched = by_crop.get(crop, single.iloc[:0])
+        pd.testing.assert_frame_equal(batched, single, check_dtype=False)
+
+    everything = split_by_crop(BATCHED[name].run(backend, crops=None))
+    pd.testing.assert_frame_equal(everything["RICE"], by_crop["RICE"], check_dtype=False)
+
+
+def test_render_rejects_missing_and_empty_parameters():
+    with pytest.raises(ValueError, match="missing parameters"):
+        TEMPLATES["top_states_per_year"].render()
+    with pytest.raises(ValueError, match="must not be empty"):
+        BATCHED["top_states_per_year"].render(crops=[])
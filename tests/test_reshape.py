@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from reshape import ID_COLUMNS, build_fact_table
+
+
+def _legacy_fact(df):
+    """The old melt + regex + pivot_table chain from python_with_sql.py."""
+    value_vars = [c for c in df.columns if c not in ID_COLUMNS + ["State Name", "Dist Name"]]
+    long = df.melt(id_vars=ID_COLUMNS, value_vars=value_vars, var_name="Crop_Metric", value_name="Value")
+    long["Metric"] = long["Crop_Metric"].str.extract(r"(AREA|PRODUCTION|YIELD)", expand=False)
+    long["Crop"] = long["Crop_Metric"].str.replace(r"\s+(AREA|PRODUCTION|YIELD).*", "", regex=True)
+    return long.pivot_table(index=ID_COLUMNS + ["Crop"], columns="Metric", values="Value").reset_index()
+
+
+def test_fact_table_matches_legacy_pivot(district_data):
+    expected = _legacy_fact(district_data)
+    expected.columns.name = None
+
+    fact = build_fact_table(district_data)
+    pd.testing.assert_frame_equal(fact, expected, check_dtype=False)
+
+    compact = build_fact_table(district_data, compact=True)
+    assert len(compact) == len(expected)
+    np.testing.assert_allclose(compact["PRODUCTION"].to_numpy(dtype="float64"),
+                               expected["PRODUCTION"].to_numpy(), rtol=1e-6)
+
+
+def test_duplicate_keys_are_rejected(district_data):
+    doubled = pd.concat([district_data, district_data.iloc[[3]]], ignore_index=True)
+    with pytest.raises(ValueError, match="2 rows share a"):
+        build_fact_table(doubled)
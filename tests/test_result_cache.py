@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine
+
+from backends import SQLAlchemyBackend
+from bulk_loader import load_star_schema
+from result_cache import ResultCache
+from schema import cache_version
+
+COUNT = "SELECT COUNT(*) AS n FROM fact_crop_yearly"
+
+
+def _cached_count(path, star, rows, cache_dir):
+    """Load the first `rows` fact rows into a fresh database at `path`; count them through the cache."""
+    path.unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{path}")
+    dim_state, dim_district, fact = star
+    load_star_schema(engine, dim_state, dim_district, fact.head(rows))
+    cache = ResultCache(SQLAlchemyBackend(engine), lambda: cache_version(engine), cache_dir=cache_dir)
+    try:
+        return int(cache.run_sql(COUNT)["n"].iloc[0]), cache.stats, cache_version(engine)
+    finally:
+        engine.dispose()
+
+
+def test_databases_do_not_share_cached_results(star, tmp_path):
+    cache_dir = tmp_path / "results"
+    first, _, stamp_a = _cached_count(tmp_path / "a.db", star, 100, cache_dir)
+    other, stats, stamp_b = _cached_count(tmp_path / "b.db", star, 50, cache_dir)
+
+    assert (first, other) == (100, 50)
+    assert stats["misses"] == 1
+    assert stamp_a[2] == stamp_b[2] == 1
+
+
+def test_recreated_database_misses_the_disk_tier(star, tmp_path):
+    cache_dir = tmp_path / "results"
+    _, _, before = _cached_count(tmp_path / "a.db", star, 100, cache_dir)
+    # Same path and the data_version starts over at 1, but the database_id is new
+    count, stats, after = _cached_count(tmp_path / "a.db", star, 30, cache_dir)
+
+    assert count == 30
+    assert stats["disk_hits"] == 0
+    assert before[0] == after[0] and before[2] == after[2] and before[1] != after[1]
@@ -0,0 +1,89 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import create_engine, text
+
+import streaming_ingest
+from bulk_loader import load_star_schema
+from reshape import build_star_schema
+from streaming_ingest import DatabaseWriter, ParquetDatasetWriter, SliceGuard, stream_ingest
+
+KEYS = {"dim_state": ["state_code"], "dim_district": ["dist_code"],
+        "fact_crop_yearly_long": ["dist_code", "year", "crop"]}
+
+
+@pytest.fixture
+def wide_file(district_data, tmp_path):
+    path = tmp_path / "wide.parquet"
+    district_data.to_parquet(path, index=False)
+    return path
+
+
+def test_slice_guard_reports_only_repeats():
+    guard = SliceGuard()
+    assert guard.add([1, 2], [2000, 2000]) == []
+    # A larger code and earlier and later years grow the bitmap
+    assert guard.add([40, 1], [1990, 2010]) == []
+    assert guard.add([2, 40, 1], [2000, 1990, 2001]) == [(2, 2000), (40, 1990)]
+    assert guard.nbytes == 21 * 41
+
+
+def test_repeated_keys_across_chunks_are_rejected(district_data, tmp_path):
+    path = tmp_path / "repeated.csv"
+    pd.concat([district_data, district_data.head(3)]).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="repeat across chunks"):
+        stream_ingest(path, ParquetDatasetWriter(tmp_path / "out"), memory_limit_mb=1)
+
+
+def test_chunks_shrink_when_the_peak_overruns(wide_file, district_data, tmp_path, monkeypatch):
+    # Underestimate the cost per cell so the first chunk is far too large
+    monkeypatch.setattr(streaming_ingest, "BYTES_PER_CELL", 1)
+    report = stream_ingest(wide_file, ParquetDatasetWriter(tmp_path / "out"), memory_limit_mb=0.5)
+
+    assert report.resizes >= 1
+    assert report.rows_per_chunk < streaming_ingest.rows_per_chunk(len(district_data.columns), 0.5)
+    assert report.wide_rows == len(district_data)
+    fact = pq.read_table(tmp_path / "out" / "fact_crop_yearly_long.parquet").to_pandas()
+    assert len(fact) == report.fact_rows == len(build_star_schema(district_data)[2])
+
+
+def _sorted(frame, table):
+    frame = frame.rename(columns=str.lower)
+    frame = frame.astype({c: str for c in frame.columns if isinstance(frame[c].dtype, pd.CategoricalDtype)})
+    return frame.sort_values(KEYS[table]).reset_index(drop=True)
+
+
+def test_parquet_dataset_matches_the_batch_star_schema(wide_file, district_data, tmp_path):
+    report = stream_ingest(wide_file, ParquetDatasetWriter(tmp_path / "out"), memory_limit_mb=0.5)
+
+    assert report.chunks > 1
+    for table, expected in zip(KEYS, build_star_schema(district_data)):
+        streamed = pd.read_parquet(tmp_path / "out" / f"{table}.parquet")
+        pd.testing.assert_frame_equal(_sorted(streamed, table), _sorted(expected, table), check_dtype=False)
+
+
+def test_database_writer_matches_the_batch_load(wide_file, district_data, sqlite_engine, tmp_path):
+    report = stream_ingest(wide_file, DatabaseWriter(sqlite_engine), memory_limit_mb=2)
+    batch = create_engine(f"sqlite:///{tmp_path / 'batch.db'}")
+    load_star_schema(batch, *build_star_schema(district_data))
+
+    assert report.chunks > 1
+    queries = {table: f"SELECT * FROM {table}" for table in KEYS}
+    queries["rollup"] = ("SELECT c.crop, r.year, r.production_1000_t, r.yield_kg_ha_weighted "
+                         "FROM agg_india_year_crop r JOIN dim_crop c ON c.crop_id = r.crop_id")
+    keys = {**KEYS, "rollup": ["crop", "year"]}
+    for name, sql in queries.items():
+        with sqlite_engine.connect() as conn:
+            streamed = pd.read_sql(text(sql), conn).sort_values(keys[name]).reset_index(drop=True)
+        with batch.connect() as conn:
+            expected = pd.read_sql(text(sql), conn).sort_values(keys[name]).reset_index(drop=True)
+        pd.testing.assert_frame_equal(streamed, expected, check_exact=False, rtol=1e-12)
+    batch.dispose()
+
+
+def test_unmeasured_ingest_keeps_the_first_chunk_size(wide_file, district_data, tmp_path):
+    report = stream_ingest(wide_file, ParquetDatasetWriter(tmp_path / "out"), memory_limit_mb=0.5, measure=False)
+
+    assert (report.peak_bytes, report.resizes) == (0, 0)
+    assert report.rows_per_chunk == streaming_ingest.rows_per_chunk(len(district_data.columns), 0.5)
+    assert report.wide_rows == len(district_data)
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic_data import FIRST_YEAR, generate_district_data
+from year_index import INDEX_LEVELS, YearRangeIndex
+
+CROPS = ["RICE", "WHEAT", "MAIZE"]
+KEYS = {"india": [], "state": ["State Code"], "district": ["State Code", "Dist Code"]}
+
+
+def _wide(years=10, first_year=FIRST_YEAR):
+    return generate_district_data(districts=30, years=years, crops=CROPS, first_year=first_year, seed=11)
+
+
+def _column(crop, metric):
+    return f"{crop} PRODUCTION (1000 tons)" if metric == "Production_1000_t" else f"{crop} AREA (1000 ha)"
+
+
+def _brute_force(df, crop, start, end, level, metric):
+    """Per-key sum and count of reported cells, straight from the wide frame."""
+    rows = df[df["Year"].between(start, end)]
+    values = sum(rows[_column(c, metric)].notna().astype(int) for c in CROPS if c in crop)
+    totals = sum(rows[_column(c, metric)].fillna(0.0) for c in CROPS if c in crop)
+    grouped = pd.DataFrame({"total": totals, "reported": values})
+    if not KEYS[level]:
+        return grouped.sum().to_frame().T
+    out = grouped.groupby([rows[k] for k in KEYS[level]]).sum()
+    return out[out["reported"] > 0]
+
+
+def _windows(index, start, end, level, metric="Production_1000_t"):
+    out = index.window(CROPS, start, end, level=level, metric=metric)
+    return out.sort_values(KEYS[level] or ["level"]).reset_index(drop=True)
+
+
+def _assert_same(updated, built, start, end):
+    for level in INDEX_LEVELS:
+        for metric in updated.metrics:
+            pd.testing.assert_frame_equal(_windows(updated, start, end, level, metric),
+                                          _windows(built, start, end, level, metric),
+                                          check_exact=False, rtol=1e-9, atol=1e-6)
+
+
+def test_total_and_window_match_groupby():
+    df = _wide()
+    index = YearRangeIndex.build(df)
+    start, end = FIRST_YEAR + 2, FIRST_YEAR + 6
+
+    for level in INDEX_LEVELS:
+        for crop in ("RICE", ["RICE", "WHEAT"]):
+            crops = crop if isinstance(crop, list) else [crop]
+            expected = _brute_force(df, crops, start, end, level, "Production_1000_t")
+            window = index.window(crop, start, end, level=level)
+            if KEYS[level]:
+                window = window.set_index(KEYS[level]).sort_index()
+            np.testing.assert_allclose(window["Production_1000_t"], expected["total"], rtol=1e-9)
+            np.testing.assert_array_equal(window["reported"], expected["reported"])
+
+    by_state = _brute_force(df, ["WHEAT"], start, end, "state", "Area_1000_ha")
+    for code, row in by_state.iterrows():
+        assert index.total("WHEAT", start, end, state=code, metric="Area_1000_ha") == pytest.approx(row["total"])
+    one = df.loc[df["Dist Code"] == 3, ["Year", _column("RICE", "Production_1000_t")]].dropna()
+    assert index.total("RICE", district=3) == pytest.approx(one.iloc[:, 1].sum())
+
+
+def test_mean_divides_by_reported_cells():
+    df = _wide()
+    column = _column("RICE", "Production_1000_t")
+    reported = df.loc[df[column].notna(), "Dist Code"]
+    code = int(reported.iloc[0])
+    # Blank some years inside the span: they must not count towards the mean
+    df.loc[(df["Dist Code"] == code) & df["Year"].isin([FIRST_YEAR + 1, FIRST_YEAR + 4]), column] = np.nan
+    index = YearRangeIndex.build(df)
+
+    values = df.loc[(df["Dist Code"] == code) & df["Year"].between(FIRST_YEAR, FIRST_YEAR + 5), column]
+    assert index.mean("RICE", FIRST_YEAR, FIRST_YEAR + 5, district=code) == pytest.approx(values.mean())
+    state = int(df.loc[df["Dist Code"] == code, "State Code"].iloc[0])
+    cells = df.loc[df["State Code"] == state, column]
+    assert index.mean("RICE", state=state) == pytest.approx(cells.mean())
+    # Nothing reported in the span
+    assert np.isnan(index.mean("RICE", FIRST_YEAR - 5, FIRST_YEAR - 1, district=code))
+
+
+def test_update_matches_build_for_new_years():
+    old = _wide()
+    new = pd.concat([old, _wide(first_year=FIRST_YEAR + 10, years=2)], ignore_index=True)
+    # Same seed: the same districts in the same states, two years later
+    index = YearRangeIndex.build(old)
+    index.update(new)
+
+    assert index.last_update["rebuilt"] is False
+    assert index.years.tolist() == list(range(FIRST_YEAR, FIRST_YEAR + 12))
+    _assert_same(index, YearRangeIndex.build(new), FIRST_YEAR, FIRST_YEAR + 11)
+    _assert_same(index, YearRangeIndex.build(new), FIRST_YEAR + 9, FIRST_YEAR + 11)
+
+
+def test_update_matches_build_for_new_districts_and_states():
+    old = _wide()
+    extra = _wide().head(20).copy()
+    extra["Dist Code"] = np.repeat([101, 102], 10)
+    extra["Dist Name"] = np.repeat(["New District 101", "New District 102"], 10)
+    # 101 joins an existing state, 102 a state the index has never seen
+    extra["State Code"] = np.repeat([int(old["State Code"].iloc[0]), 99], 10)
+    extra["State Name"] = np.repeat([old["State Name"].iloc[0], "New State"], 10)
+    new = pd.concat([old, extra], ignore_index=True)
+
+    index = YearRangeIndex.build(old)
+    index.update(new)
+    built = YearRangeIndex.build(new)
+
+    assert index.states.tolist() == built.states.tolist()
+    assert index.total("RICE", state="New State") == pytest.approx(built.total("RICE", state=99), nan_ok=True)
+    _assert_same(index, built, FIRST_YEAR, FIRST_YEAR + 9)
+    _assert_same(index, built, FIRST_YEAR + 3, FIRST_YEAR + 5)
+
+
+def test_update_matches_build_for_removed_and_changed_rows():
+    old = _wide()
+    new = old[~((old["Dist Code"] == 5) & old["Year"].between(FIRST_YEAR + 3, FIRST_YEAR + 5))]
+    new = new[new["Dist Code"] != 7].copy()
+    new.loc[new["Dist Code"] == 9, _column("WHEAT", "Area_1000_ha")] += 1.25
+
+    index = YearRangeIndex.build(old)
+    stats = index.update(new)
+    built = YearRangeIndex.build(new)
+
+    assert stats["districts"] == 3
+    assert np.isnan(index.total("RICE", district=7))
+    for span in [(FIRST_YEAR, FIRST_YEAR + 9), (FIRST_YEAR + 3, FIRST_YEAR + 5), (FIRST_YEAR + 4, FIRST_YEAR + 4)]:
+        _assert_same(index, built, *span)
@@ -0,0 +1,356 @@
+"""Year-range prefix-sum index: totals and means over any [from, to] years in O(1).
+
+For every (district, crop) the index keeps the running sums of area and
+production along a contiguous year axis, with a leading zero:
+
+    sums[..., k, m] = metric m summed over the first k years
+
+so the total over years [a, b] is sums[b + 1] - sums[a], two lookups whatever
+the span. The matching running counts of reported cells tell "nothing reported"
+(NaN) apart from a reported 0. State and national prefixes are the sums of
+their districts' prefixes, since prefix sums are linear. The same two lookups
+then answer "RICE in Punjab, 2007-2016" or "SUGARCANE nationally, last 50
+years", and `window` ranks every state or district over a span in O(keys).
+
+The index is saved next to the data (.npy files, opened as memory maps, plus
+coordinates in JSON) together with the content hash of every (Dist Code, Year)
+workbook row, as in incremental_ingest.py. `update` re-derives the prefixes
+only for districts with new, changed or removed rows, and pushes the
+difference into their states and the national row. A new year extends the
+axis without touching the other districts.
+
+    index = open_year_index("District_Level_Data.xlsx", load_frame)
+    index.total("WHEAT", 2007, 2016, state="Uttar Pradesh")
+    index.window(["RICE", "WHEAT"], 2007, 2016, level="state").head(5)
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from compact import widen
+from cube import CropCube
+from fact_views import METRICS
+from incremental_ingest import diff_slices, slice_hashes
+from metrics import yield_kg_ha
+from reshape import ID_COLUMNS, parse_crop_columns
+
+DEFAULT_INDEX_DIR = ".agri_cache/year_index"
+INDEX_LEVELS = ("india", "state", "district")
+
+
+def _prefix(values: np.ndarray) -> tuple:
+    """(running sums, running counts) along axis 2 of values[key, crop, year, metric]."""
+    shape = values.shape[:2] + (1,) + values.shape[3:]
+    filled = np.nan_to_num(widen(values), nan=0.0)
+    reported = (~np.isnan(values)).astype(np.int32)
+    sums = np.concatenate([np.zeros(shape), np.cumsum(filled, axis=2)], axis=2)
+    counts = np.concatenate([np.zeros(shape, dtype=np.int32), np.cumsum(reported, axis=2, dtype=np.int32)], axis=2)
+    return sums, counts
+
+
+def _state_rollup(sums: np.ndarray, counts: np.ndarray, state_idx: np.ndarray, n_states: int) -> tuple:
+    state_sums = np.zeros((n_states,) + sums.shape[1:])
+    state_counts = np.zeros((n_states,) + counts.shape[1:], dtype=np.int32)
+    np.add.at(state_sums, state_idx, sums)
+    np.add.at(state_counts, state_idx, counts)
+    return state_sums, state_counts
+
+
+class YearRangeIndex:
+    """Prefix sums per level: sums[level][key, crop, year + 1, metric], counts likewise.
+
+    Keys are rows of `districts` ((Dist Code, State Code) pairs), of `states`
+    (sorted State Codes), or the single national row.
+    """
+
+    def __init__(self, sums: dict, counts: dict, districts, states, crops, years, metrics,
+                 state_names: dict, dist_names, slices: pd.DataFrame = None, fingerprint: str = None):
+        self.sums = dict(sums)
+        self.counts = dict(counts)
+        self.districts = np.asarray(districts, dtype=np.int64).reshape(-1, 2)
+        self.states = np.asarray(states, dtype=np.int64)
+        self.crops = list(crops)
+        self.years = np.asarray(years, dtype=np.int64)
+        self.metrics = list(metrics)
+        self.state_names = {int(k): v for k, v in state_names.items()}
+        self.dist_names = np.asarray(dist_names, dtype=object)
+        self.slices = slices if slices is not None else pd.DataFrame(columns=["dist_code", "year", "row_hash"])
+        self.fingerprint = fingerprint
+        self.last_update = None
+        self._lookups()
+
+    def _lookups(self) -> None:
+        self._crop_pos = {c: i for i, c in enumerate(self.crops)}
+        self._metric_pos = {m: i for i, m in enumerate(self.metrics)}
+        self._state_pos = {int(s): i for i, s in enumerate(self.states)}
+        self._state_codes = {name: code for code, name in self.state_names.items()}
+        self._district_pos = {(int(d), int(s)): i for i, (d, s) in enumerate(self.districts.tolist())}
+        self._district_by_code = {}
+        for (d, _), i in self._district_pos.items():
+            self._district_by_code.setdefault(d, []).append(i)
+
+    # ---- construction
+    @classmethod
+    def build(cls, df: pd.DataFrame, crop_columns: dict = None, fingerprint: str = None) -> "YearRangeIndex":
+        """Full build from the wide workbook frame."""
+        df = df[df[ID_COLUMNS].notna().all(axis=1)]
+        cube = CropCube.from_wide(df, crop_columns)
+        metric_idx = [cube.cube_metrics.index(m) for m in METRICS]
+        sums, counts = _prefix(cube.values[..., metric_idx])
+        states = np.unique(cube.districts[:, 1])
+        state_sums, state_counts = _state_rollup(sums, counts, np.searchsorted(states, cube.districts[:, 1]),
+                                                 len(states))
+        return cls(
+            {"india": sums.sum(axis=0, keepdims=True), "state": state_sums, "district": sums},
+            {"india": counts.sum(axis=0, keepdims=True, dtype=np.int32), "state": state_counts,
+             "district": counts},
+            cube.districts, states, cube.crops, cube.years, METRICS, cube.state_names, cube.dist_names,
+            slice_hashes(df), fingerprint,
+        )
+
+    def _writable(self) -> None:
+        for arrays in (self.sums, self.counts):
+            for level, array in arrays.items():
+                if isinstance(array, np.memmap) or not array.flags.writeable:
+                    arrays[level] = np.array(array)
+
+    def _extend_years(self, years: np.ndarray) -> None:
+        """Widen the year axis to cover `years`: zeros before, the last running value after."""
+        lo, hi = min(self.years[0], years[0]), max(self.years[-1], years[-1])
+        front, back = int(self.years[0] - lo), int(hi - self.years[-1])
+        if not front and not back:
+            return
+        for arrays in (self.sums, self.counts):
+            for level, array in arrays.items():
+                parts = [np.zeros(array.shape[:2] + (front,) + array.shape[3:], dtype=array.dtype), array,
+                         np.repeat(array[:, :, -1:], back, axis=2)]
+                arrays[level] = np.concatenate(parts, axis=2)
+        self.years = np.arange(lo, hi + 1)
+
+    def _add_keys(self, districts: np.ndarray, dist_names, state_names: dict) -> None:
+        """Append zero rows for districts and states the index has not seen yet."""
+        self.state_names.update({int(k): v for k, v in state_names.items()})
+        new = [i for i, (d, s) in enumerate(districts.tolist()) if (d, s) not in self._district_pos]
+        if new:
+            self.districts = np.vstack([self.districts, districts[new]])
+            self.dist_names = np.concatenate([self.dist_names, np.asarray(dist_names, dtype=object)[new]])
+            for arrays in (self.sums, self.counts):
+                rows = np.zeros((len(new),) + arrays["district"].shape[1:], dtype=arrays["district"].dtype)
+                arrays["district"] = np.concatenate([arrays["district"], rows])
+        states = np.union1d(self.states, self.districts[:, 1])
+        if len(states) != len(self.states):
+            # Keep states sorted so State Codes map to rows by searchsorted
+            old_rows = np.searchsorted(states, self.states)
+            for arrays in (self.sums, self.counts):
+                grown = np.zeros((len(states),) + arrays["state"].shape[1:], dtype=arrays["state"].dtype)
+                grown[old_rows] = arrays["state"]
+                arrays["state"] = grown
+            self.states = states
+        self._lookups()
+
+    def update(self, df: pd.DataFrame, fingerprint: str = None) -> dict:
+        """Bring the index in line with the wide frame `df`, redoing only touched districts."""
+        df = df[df[ID_COLUMNS].notna().all(axis=1)]
+        current = slice_hashes(df)
+        diff = diff_slices(current, self.slices.astype("int64"))
+        changed = diff[diff["status"] != "same"]
+        crop_columns = parse_crop_columns(df.columns)
+        self.fingerprint = fingerprint
+        if sorted(crop_columns) != self.crops:
+            # A new or dropped crop changes every key's shape; rebuild
+            self.__dict__.update(YearRangeIndex.build(df, crop_columns, fingerprint).__dict__)
+            self.last_update = {"slices": len(changed), "districts": len(self.districts), "rebuilt": True}
+            return self.last_update
+
+        codes = np.unique(changed["dist_code"].to_numpy(dtype=np.int64))
+        part = df[df["Dist Code"].isin(codes)]
+        self._writable()
+        cube = None
+        if len(part):
+            cube = CropCube.from_wide(part, crop_columns)
+            self._extend_years(cube.years)
+            self._add_keys(cube.districts, cube.dist_names, cube.state_names)
+
+        # Every index row of a touched Dist Code is redone; rows no longer in the data become zeros
+        rows = np.array([i for code in codes for i in self._district_by_code.get(int(code), [])], dtype=np.int64)
+        values = np.full((len(rows), len(self.crops), len(self.years), len(self.metrics)), np.nan, dtype=np.float32)
+        if cube is not None:
+            cube_pos = {(int(d), int(s)): i for i, (d, s) in enumerate(cube.districts.tolist())}
+            metric_idx = [cube.cube_metrics.index(m) for m in self.metrics]
+            offset = int(cube.years[0] - self.years[0])
+            for r, (d, s) in enumerate(self.districts[rows].tolist()):
+                i = cube_pos.get((d, s))
+                if i is not None:
+                    values[r, :, offset:offset + len(cube.years)] = cube.values[i][..., metric_idx]
+        sums, counts = _prefix(values)
+
+        # Prefix sums are linear: states and the nation move by the districts' difference
+        delta_sums = sums - self.sums["district"][rows]
+        delta_counts = counts - self.counts["district"][rows]
+        self.sums["district"][rows] = sums
+        self.counts["district"][rows] = counts
+        state_idx = np.searchsorted(self.states, self.districts[rows, 1])
+        np.add.at(self.sums["state"], state_idx, delta_sums)
+        np.add.at(self.counts["state"], state_idx, delta_counts)
+        self.sums["india"][0] += delta_sums.sum(axis=0)
+        self.counts["india"][0] += delta_counts.sum(axis=0, dtype=np.int32)
+
+        self.slices = current
+        self.last_update = {"slices": len(changed), "districts": len(rows), "rebuilt": False}
+        return self.last_update
+
+    # ---- queries
+    def _span(self, start, end) -> tuple:
+        """Prefix positions (lo, hi) for years [start, end], clipped to the year axis."""
+        first, last = int(self.years[0]), int(self.years[-1])
+        start = first if start is None else max(int(start), first)
+        end = last if end is None else min(int(end), last)
+        if start > end:
+            return 0, 0
+        return start - first, end - first + 1
+
+    def _crops(self, crop) -> list:
+        crops = crop if isinstance(crop, (list, tuple)) else [crop]
+        return [self._crop_pos[c] for c in crops]
+
+    def _key(self, state=None, district=None) -> tuple:
+        """(level, row) for a district (Dist Code), a state (name or code) or the nation."""
+        state_code = self._state_codes.get(state, state) if state is not None else None
+        if district is not None:
+            if state_code is not None:
+                return "district", self._district_pos[(int(district), int(state_code))]
+            rows = self._district_by_code[int(district)]
+            if len(rows) > 1:
+                raise ValueError(f"Dist Code {district} occurs in several states; pass state=")
+            return "district", rows[0]
+        if state_code is not None:
+            return "state", self._state_pos[int(state_code)]
+        return "india", 0
+
+    def _between(self, level: str, rows, crop, metric: str, lo: int, hi: int) -> tuple:
+        c, m = self._crops(crop), self._metric_pos[metric]
+        sums, counts = self.sums[level], self.counts[level]
+        total = (sums[rows, :, hi, m][..., c] - sums[rows, :, lo, m][..., c]).sum(axis=-1)
+        reported = (counts[rows, :, hi, m][..., c] - counts[rows, :, lo, m][..., c]).sum(axis=-1)
+        return np.where(reported > 0, total, np.nan), reported
+
+    def total(self, crop, start=None, end=None, state=None, district=None,
+              metric: str = "Production_1000_t") -> float:
+        """Sum of `metric` over years [start, end] (inclusive); NaN if nothing was reported.
+
+        `crop` may be a list (summed together). Open ends run to the first or
+        last year of the index.
+        """
+        level, row = self._key(state, district)
+        lo, hi = self._span(start, end)
+        return float(self._between(level, row, crop, metric, lo, hi)[0])
+
+    def mean(self, crop, start=None, end=None, state=None, district=None,
+             metric: str = "Production_1000_t") -> float:
+        """Mean of the reported `metric` values in years [start, end], like AVG over the fact rows.
+
+        The denominator is the number of reported cells, not the span length:
+        for one district and crop, the years with a value; for a state or the
+        nation, every reported (district, year) cell. NaN if nothing was reported.
+        """
+        level, row = self._key(state, district)
+        lo, hi = self._span(start, end)
+        total, reported = self._between(level, row, crop, metric, lo, hi)
+        return float(total / reported) if reported else float("nan")
+
+    def period_yield(self, crop, start=None, end=None, state=None, district=None) -> float:
+        """Yield over the period from its production and area totals, in kg/ha."""
+        production = self.total(crop, start, end, state, district, "Production_1000_t")
+        area = self.total(crop, start, end, state, district, "Area_1000_ha")
+        return float(yield_kg_ha(production, area))
+
+    def last_years(self, n: int) -> tuple:
+        """(start, end) of the last `n` years of the index."""
+        return int(self.years[-1]) - n + 1, int(self.years[-1])
+
+    def window(self, crop, start=None, end=None, level: str = "state",
+               metric: str = "Production_1000_t") -> pd.DataFrame:
+        """`metric` totals over years [start, end] for every key of `level`, largest first.
+
+        Keys with nothing reported in the span are left out.
+        """
+        if level not in INDEX_LEVELS:
+            raise ValueError(f"level must be one of {INDEX_LEVELS}")
+        lo, hi = self._span(start, end)
+        total, reported = self._between(level, slice(None), crop, metric, lo, hi)
+        if level == "india":
+            keys = pd.DataFrame({"level": ["India"]})
+        elif level == "state":
+            keys = pd.DataFrame({"State Code": self.states,
+                                 "State Name": [self.state_names.get(int(s)) for s in self.states]})
+        else:
+            keys = pd.DataFrame({"State Code": self.districts[:, 1],
+                                 "State Name": [self.state_names.get(int(s)) for s in self.districts[:, 1]],
+                                 "Dist Code": self.districts[:, 0], "Dist Name": self.dist_names})
+        out = keys.assign(**{metric: total, "reported": reported})
+        out = out[out["reported"] > 0]
+        return out.sort_values(metric, ascending=False, kind="stable").reset_index(drop=True)
+
+    # ---- persistence
+    def save(self, directory) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for level in INDEX_LEVELS:
+            for kind, arrays in (("sums", self.sums), ("counts", self.counts)):
+                # Replace rather than truncate: an older copy may still be memory-mapped
+                target = directory / f"{level}_{kind}.npy"
+                tmp = target.with_suffix(".npy.tmp")
+                with open(tmp, "wb") as fh:
+                    np.save(fh, arrays[level])
+                os.replace(tmp, target)
+        feather.write_feather(self.slices.reset_index(drop=True), directory / "slices.arrow")
+        coords = {
+            "districts": self.districts.tolist(),
+            "states": self.states.tolist(),
+            "crops": self.crops,
+            "years": self.years.tolist(),
+            "metrics": self.metrics,
+            "state_names": {str(k): v for k, v in self.state_names.items()},
+            "dist_names": [None if pd.isna(n) else str(n) for n in self.dist_names],
+            "fingerprint": self.fingerprint,
+        }
+        # Written last: a directory without coords.json is not a usable index
+        (directory / "coords.json").write_text(json.dumps(coords))
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap_mode: str = "r") -> "YearRangeIndex":
+        """Reopen a saved index; the prefix arrays stay on disk as memory maps."""
+        directory = Path(directory)
+        coords = json.loads((directory / "coords.json").read_text())
+        sums = {level: np.load(directory / f"{level}_sums.npy", mmap_mode=mmap_mode) for level in INDEX_LEVELS}
+        counts = {level: np.load(directory / f"{level}_counts.npy", mmap_mode=mmap_mode) for level in INDEX_LEVELS}
+        return cls(sums, counts, coords["districts"], coords["states"], coords["crops"], coords["years"],
+                   coords["metrics"], coords["state_names"], coords["dist_names"],
+                   feather.read_feather(directory / "slices.arrow"), coords["fingerprint"])
+
+
+def open_year_index(source, load_frame, directory=None) -> YearRangeIndex:
+    """Index for the workbook `source`, kept in `directory` (default per source under .agri_cache).
+
+    `load_frame()` returns the wide frame; it is only called when the saved
+    index is missing or the workbook changed since it was saved, and then only
+    the touched districts are recomputed.
+    """
+    from data_cache import file_fingerprint
+
+    directory = Path(directory or Path(DEFAULT_INDEX_DIR) / Path(source).stem)
+    fingerprint = file_fingerprint(source)
+    if (directory / "coords.json").exists():
+        index = YearRangeIndex.load(directory)
+        if index.fingerprint == fingerprint:
+            return index
+        index.update(load_frame(), fingerprint)
+    else:
+        index = YearRangeIndex.build(load_frame(), fingerprint=fingerprint)
+    index.save(directory)
+    return index